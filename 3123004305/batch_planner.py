@@ -0,0 +1,179 @@
+﻿"""Plan many students' task files in one process pool and write the results as JSON Lines."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from study_planner import StudyPlanner, describe_plan, load_tasks, prune_tasks, stream_tasks
+
+TASK_SUFFIXES = (".json", ".jsonl")
+DEFAULT_BUDGETS = (240,)
+
+Entry = tuple[Path, tuple[int, ...], "str | None"]
+Job = tuple[Path, tuple[int, ...], "str | None", bool, bool]
+
+
+def _parse_budgets(text: str) -> tuple[int, ...]:
+    budgets = tuple(int(part) for part in text.split(",") if part.strip())
+    if not budgets or min(budgets) <= 0:
+        raise ValueError(f"Invalid minute budgets: {text!r}")
+    return budgets
+
+
+def _parse_manifest_line(entry: str) -> tuple[str, str | None]:
+    """Split a manifest line into the path and the optional budget text.
+
+    A tab separates the path from the budgets, so the path may contain spaces.
+    Without a tab the line is split shell-style, and a path with spaces must be
+    quoted.
+    """
+
+    if "\t" in entry:
+        name, _, minutes = entry.partition("\t")
+        return name.strip(), minutes.strip() or None
+    parts = shlex.split(entry)
+    if len(parts) > 2:
+        raise ValueError(f"Expected a path and optional budgets, got {len(parts)} fields")
+    return parts[0], parts[1] if len(parts) == 2 else None
+
+
+def collect_jobs(source: Path, budgets: Sequence[int] = DEFAULT_BUDGETS) -> list[Entry]:
+    """Return `(task file, budgets, error)` entries from a directory or a manifest file.
+
+    A directory contributes every `.json`/`.jsonl` file below it with the default
+    `budgets`. Each manifest line is a path, optionally followed by comma-separated
+    minutes (see `_parse_manifest_line`); relative paths are resolved against the
+    manifest. A line that cannot be parsed keeps its place with the parse error
+    set, so it is reported as that entry's error record instead of aborting the batch.
+    """
+
+    budgets = tuple(budgets)
+    if source.is_dir():
+        files = sorted(p for p in source.rglob("*") if p.is_file() and p.suffix.lower() in TASK_SUFFIXES)
+        return [(path, budgets, None) for path in files]
+    jobs: list[Entry] = []
+    for number, line in enumerate(source.read_text(encoding="utf-8-sig").splitlines(), 1):
+        entry = line.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        try:
+            name, minutes = _parse_manifest_line(entry)
+            path = Path(name)
+            path = path if path.is_absolute() else source.parent / path
+            jobs.append((path, _parse_budgets(minutes) if minutes else budgets, None))
+        except ValueError as exc:
+            jobs.append((Path(entry), (), f"{source}:{number}: {type(exc).__name__}: {exc}"))
+    return jobs
+
+
+def plan_file(job: Job) -> list[dict]:
+    """Plan one task file for each of its budgets and return JSON-ready records.
+
+    Any error loading or planning the file becomes a single `error` record, so one
+    bad input never stops the batch. All budgets share one DP table; the plan text
+    is only rendered when `describe` is set.
+    """
+
+    path, budgets, error, describe, prune = job
+    if error is not None:
+        return [{"file": str(path), "error": error}]
+    try:
+        tasks = prune_tasks(stream_tasks(path), max(budgets)).tasks if prune else load_tasks(path)
+        plans = StudyPlanner(tasks).optimize_many(budgets) if tasks else {}
+        records = []
+        for minutes in budgets:
+            plan = plans[minutes].tasks if tasks else []
+            record = {
+                "file": str(path),
+                "minutes": minutes,
+                "score": sum(task.score() for task in plan),
+                "planned_minutes": sum(task.minutes for task in plan),
+                "tasks": [task.name for task in plan],
+            }
+            if describe:
+                record["description"] = describe_plan(plan, minutes)
+            records.append(record)
+        return records
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        return [{"file": str(path), "error": f"{type(exc).__name__}: {exc}"}]
+
+
+def plan_batch(
+    jobs: Sequence[Entry],
+    workers: int = 1,
+    chunksize: int | None = None,
+    describe: bool = False,
+    prune: bool = False,
+) -> Iterator[dict]:
+    """Yield the records of every job in input order, spreading files over `workers`.
+
+    Files are handed out in chunks (by default about four per worker) so that each
+    worker process pays the interpreter start-up once and the pool's per-task
+    overhead is amortized over many small files.
+    """
+
+    tasks = [(path, budgets, error, describe, prune) for path, budgets, error in jobs]
+    if workers <= 1:
+        for task in tasks:
+            yield from plan_file(task)
+        return
+    chunksize = chunksize or max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(workers) as executor:
+        for records in executor.map(plan_file, tasks, chunksize=chunksize):
+            yield from records
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="批量生成学习计划：一个进程池处理多名学生的任务文件")
+    parser.add_argument(
+        "source",
+        type=Path,
+        help="任务文件目录（.json/.jsonl），或每行“路径 [分钟,分钟...]”的清单文件（含空格的路径请加引号或用制表符分隔）",
+    )
+    parser.add_argument("--output", type=Path, help="输出 JSONL 文件，缺省打印到标准输出")
+    parser.add_argument(
+        "--minutes",
+        type=_parse_budgets,
+        default=DEFAULT_BUDGETS,
+        help="未在清单中指定时使用的分钟预算，可用逗号分隔多个（默认 240）",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="进程池大小（默认 CPU 核数，1 表示不启用进程池）",
+    )
+    parser.add_argument("--chunksize", type=int, help="每次分发给进程的文件数（默认按文件数与进程数自动选择）")
+    parser.add_argument("--describe", action="store_true", help="在结果中附带文字版计划说明")
+    parser.add_argument("--prune", action="store_true", help="求解前去掉超时、预算内放不下的多余重复及被支配的任务（最优得分不变）")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    args = parse_args(argv)
+    jobs = collect_jobs(args.source, args.minutes)
+    records = plan_batch(jobs, args.workers, args.chunksize, args.describe, args.prune)
+    handle = sys.stdout if args.output is None else args.output.open("w", encoding="utf-8")
+    written = failed = 0
+    try:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+            failed += "error" in record
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+    print(f"{len(jobs)} 个任务文件，写出 {written} 条记录，失败 {failed} 个", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
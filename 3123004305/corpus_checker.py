@@ -0,0 +1,244 @@
+﻿"""Corpus-scale plagiarism checks: score many documents in one process pool."""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from plagiarism_checker import (
+    DEFAULT_WINDOW,
+    PlagiarismError,
+    Shingles,
+    jaccard_similarity,
+    shingles_from_file,
+)
+from shingle_cache import ShingleCache
+
+DEFAULT_CHUNK_ROWS = 16
+DOCUMENT_SUFFIXES = (".txt",)
+
+_ROWS: Sequence[Shingles] = ()
+_COLUMNS: Sequence[Shingles] = ()
+_TRIANGLE = False
+
+
+@dataclass(frozen=True)
+class PairScore:
+    """Similarity of one (original, suspect) pair in the output matrix."""
+
+    original: str
+    suspect: str
+    score: float
+
+
+def collect_documents(source: Path) -> list[Path]:
+    """Return documents from a directory (recursively) or a manifest file of paths."""
+
+    if source.is_dir():
+        return sorted(p for p in source.rglob("*") if p.is_file() and p.suffix.lower() in DOCUMENT_SUFFIXES)
+    try:
+        lines = source.read_text(encoding="utf-8-sig").splitlines()
+    except OSError as exc:
+        raise PlagiarismError(f"无法读取清单文件: {exc}") from exc
+    documents = []
+    for line in lines:
+        entry = line.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        path = Path(entry)
+        documents.append(path if path.is_absolute() else source.parent / path)
+    return documents
+
+
+def _load(task: tuple[Path, int, bool, Path | None]) -> tuple[Shingles, int, int]:
+    path, window, compact, cache_dir = task
+    if cache_dir is None:
+        return shingles_from_file(path, window, compact), 0, 0
+    cache = ShingleCache(cache_dir, evict=False)
+    shingles = shingles_from_file(path, window, cache=cache)
+    return shingles, cache.hits, cache.misses
+
+
+def load_corpus(
+    executor: Executor | None,
+    paths: Sequence[Path],
+    window: int,
+    compact: bool = False,
+    cache: ShingleCache | None = None,
+) -> list[Shingles]:
+    """Tokenize and shingle every document exactly once.
+
+    With a `cache`, unchanged documents are loaded from disk and the hit/miss counts
+    reported by the workers are added to the cache's own counters. Pooled workers
+    never size the cache directory; `cache` trims it once after the whole load.
+    """
+
+    if executor is None:
+        return [shingles_from_file(path, window, compact, cache=cache) for path in paths]
+    cache_dir = None if cache is None else cache.directory
+    tasks = [(path, window, compact, cache_dir) for path in paths]
+    chunksize = max(1, len(tasks) // (4 * (os.cpu_count() or 1)))
+    loaded = []
+    for shingles, hits, misses in executor.map(_load, tasks, chunksize=chunksize):
+        loaded.append(shingles)
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+    if cache is not None and cache.evict:
+        cache.trim()
+    return loaded
+
+
+def _init_worker(rows: Sequence[Shingles], columns: Sequence[Shingles] | None) -> None:
+    global _ROWS, _COLUMNS, _TRIANGLE
+    _ROWS = rows
+    _COLUMNS = rows if columns is None else columns
+    _TRIANGLE = columns is None
+
+
+def _score_rows(bounds: tuple[int, int]) -> list[tuple[int, int, float]]:
+    start, stop = bounds
+    results = []
+    for i in range(start, stop):
+        row = _ROWS[i]
+        first = i + 1 if _TRIANGLE else 0
+        for j in range(first, len(_COLUMNS)):
+            results.append((i, j, jaccard_similarity(row, _COLUMNS[j])))
+    return results
+
+
+def _row_chunks(count: int, chunk_rows: int) -> list[tuple[int, int]]:
+    return [(start, min(start + chunk_rows, count)) for start in range(0, count, chunk_rows)]
+
+
+def score_matrix(
+    rows: Sequence[Shingles],
+    columns: Sequence[Shingles] | None = None,
+    workers: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[tuple[int, int, float]]:
+    """Yield `(row, column, score)` for every pair.
+
+    With `columns=None` every unordered pair of `rows` is scored once; otherwise each
+    row is scored against every column. Rows are split into chunks of `chunk_rows` and
+    the shingle sets are shipped to each worker only once, through the initializer.
+    """
+
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be positive")
+    chunks = _row_chunks(len(rows), chunk_rows)
+    if workers <= 1:
+        _init_worker(rows, columns)
+        for bounds in chunks:
+            yield from _score_rows(bounds)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(rows, columns)) as executor:
+        for batch in executor.map(_score_rows, chunks):
+            yield from batch
+
+
+def compare_corpus(
+    suspects: Sequence[Path],
+    originals: Sequence[Path] | None = None,
+    window: int = DEFAULT_WINDOW,
+    workers: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    compact: bool = False,
+    cache: ShingleCache | None = None,
+) -> Iterator[PairScore]:
+    """Score all pairs of `suspects`, or each suspect against every original.
+
+    `compact=True` keeps `hash_shingles` arrays, which are far cheaper to hold and to
+    ship to the scoring workers than sets of string tuples; a `cache` implies them.
+    """
+
+    documents = list(suspects) + list(originals or ())
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            loaded = load_corpus(executor, documents, window, compact, cache)
+    else:
+        loaded = load_corpus(None, documents, window, compact, cache)
+    suspect_shingles = loaded[: len(suspects)]
+    original_shingles = None if originals is None else loaded[len(suspects) :]
+
+    for i, j, score in score_matrix(suspect_shingles, original_shingles, workers, chunk_rows):
+        if originals is None:
+            yield PairScore(original=str(suspects[i]), suspect=str(suspects[j]), score=score)
+        else:
+            yield PairScore(original=str(originals[j]), suspect=str(suspects[i]), score=score)
+
+
+def write_matrix(results: Iterable[PairScore], output: Path, fmt: str | None = None) -> int:
+    """Stream results to a JSONL or CSV file and return the number of rows written."""
+
+    fmt = fmt or ("csv" if output.suffix.lower() == ".csv" else "jsonl")
+    written = 0
+    try:
+        with output.open("w", encoding="utf-8", newline="") as handle:
+            if fmt == "csv":
+                writer = csv.writer(handle)
+                writer.writerow(["original", "suspect", "score"])
+                for item in results:
+                    writer.writerow([item.original, item.suspect, f"{item.score:.6f}"])
+                    written += 1
+            else:
+                for item in results:
+                    handle.write(json.dumps(asdict(item), ensure_ascii=False) + "\n")
+                    written += 1
+    except OSError as exc:
+        raise PlagiarismError(f"无法写入输出文件: {exc}") from exc
+    return written
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="批量查重：一次性计算语料内的相似度矩阵")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    matrix = subparsers.add_parser("matrix", help="计算两两相似度或新文件对已有语料的相似度")
+    matrix.add_argument("documents", type=Path, help="待查文件目录，或每行一个路径的清单文件")
+    matrix.add_argument("output", type=Path, help="输出文件（.jsonl 或 .csv）")
+    matrix.add_argument(
+        "--against",
+        type=Path,
+        help="已有语料目录或清单；给出时只计算新文件对已有语料，否则计算全部两两组合",
+    )
+    matrix.add_argument("--format", choices=("jsonl", "csv"), help="输出格式（默认按扩展名推断）")
+    matrix.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    matrix.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="进程池大小（默认 CPU 核数，1 表示不启用进程池）",
+    )
+    matrix.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help="每个任务块包含的行数（默认 16）",
+    )
+    matrix.add_argument("--compact", action="store_true", help="使用 64 位哈希数组表示 shingle")
+    matrix.add_argument("--cache-dir", type=Path, help="shingle 缓存目录，已处理过的文件直接复用")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    suspects = collect_documents(args.documents)
+    originals = None if args.against is None else collect_documents(args.against)
+    cache = None if args.cache_dir is None else ShingleCache(args.cache_dir)
+    results = compare_corpus(
+        suspects, originals, args.window, args.workers, args.chunk_rows, args.compact, cache
+    )
+    written = write_matrix(results, args.output, args.format)
+    print(f"已写入 {written} 条相似度记录 -> {args.output}")
+    if cache is not None:
+        print(f"缓存命中 {cache.hits} 次，未命中 {cache.misses} 次")
+
+
+if __name__ == "__main__":
+    main()
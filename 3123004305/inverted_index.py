@@ -0,0 +1,183 @@
+﻿"""Inverted shingle-hash index answering exact top-k most-similar-document queries."""
+from __future__ import annotations
+
+import argparse
+import heapq
+from array import array
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Hashable, Iterator, Sequence
+
+from corpus_checker import collect_documents, load_corpus
+from plagiarism_checker import DEFAULT_WINDOW, format_percentage, shingles_from_file
+from shingle_cache import ShingleCache
+
+DEFAULT_TOP_K = 10
+_BOUND_CHECKS = 32
+
+
+@dataclass(frozen=True)
+class Neighbor:
+    """One of the top-k documents: exact Jaccard score and shared shingle count."""
+
+    key: Hashable
+    score: float
+    overlap: int
+
+
+def _append_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _iter_postings(buffer: bytes) -> Iterator[int]:
+    """Decode a delta + varint encoded postings list into ascending document ids."""
+
+    doc = shift = delta = 0
+    for byte in buffer:
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        doc += delta
+        yield doc
+        delta = shift = 0
+
+
+class InvertedIndex:
+    """Maps every shingle hash to the ids of the documents containing it.
+
+    Postings are kept sorted and stored as varint-encoded gaps, typically one or two
+    bytes per entry. Document ids are assigned in insertion order, so appending a
+    document only writes to the end of each of its postings lists.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[int, bytearray] = {}
+        self._last: dict[int, int] = {}
+        self._keys: list[Hashable] = []
+        self._sizes = array("I")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable, shingles: array) -> int:
+        """Index a `hash_shingles` array (sorted, unique) and return its document id."""
+
+        doc = len(self._keys)
+        self._keys.append(key)
+        self._sizes.append(len(shingles))
+        postings, last = self._postings, self._last
+        for value in shingles:
+            buffer = postings.get(value)
+            if buffer is None:
+                buffer = postings[value] = bytearray()
+                _append_varint(buffer, doc)
+            else:
+                _append_varint(buffer, doc - last[value])
+            last[value] = doc
+        return doc
+
+    @classmethod
+    def from_paths(
+        cls,
+        paths: Sequence[Path],
+        window: int = DEFAULT_WINDOW,
+        executor: Executor | None = None,
+        cache: ShingleCache | None = None,
+    ) -> InvertedIndex:
+        index = cls()
+        corpus = load_corpus(executor, paths, window, compact=True, cache=cache)
+        for path, shingles in zip(paths, corpus):
+            index.add(str(path), shingles)
+        return index
+
+    def _score(self, doc: int, overlap: int, size: int) -> float:
+        union = size + self._sizes[doc] - overlap
+        return overlap / union if union else 1.0
+
+    def _upper_bound(self, doc: int, overlap: int, size: int, remaining: int) -> float:
+        return self._score(doc, overlap + min(remaining, self._sizes[doc] - overlap), size)
+
+    def top_k(self, shingles: array, k: int = DEFAULT_TOP_K) -> list[Neighbor]:
+        """Return the exact `k` most similar documents, best first.
+
+        Query hashes are processed rarest first while intersection counts accumulate.
+        Once `remaining / |query|` (the best score a not-yet-seen document could still
+        reach) falls below the current k-th lower bound, no new documents are admitted;
+        candidates whose upper bound drops below that bound are discarded, and the
+        remaining postings are decoded only up to the largest surviving document id.
+        Documents sharing no shingle with the query are never touched.
+        """
+
+        if k <= 0:
+            raise ValueError("k must be positive")
+        size = len(shingles)
+        if size == 0:
+            empty = [doc for doc, doc_size in enumerate(self._sizes) if doc_size == 0][:k]
+            return [Neighbor(self._keys[doc], 1.0, 0) for doc in empty]
+
+        terms = sorted(
+            (buffer for buffer in map(self._postings.get, shingles) if buffer is not None), key=len
+        )
+        counts: dict[int, int] = {}
+        admitting = True
+        kth = 0.0
+        limit = len(self._keys)
+        check_every = max(1, len(terms) // _BOUND_CHECKS)
+        for position, buffer in enumerate(terms):
+            if admitting:
+                for doc in _iter_postings(buffer):
+                    counts[doc] = counts.get(doc, 0) + 1
+            else:
+                for doc in _iter_postings(buffer):
+                    if doc > limit:
+                        break
+                    if doc in counts:
+                        counts[doc] += 1
+
+            remaining = len(terms) - position - 1
+            if remaining == 0 or (position + 1) % check_every or len(counts) <= k:
+                continue
+            kth = heapq.nlargest(k, (self._score(d, c, size) for d, c in counts.items()))[-1]
+            if admitting and remaining / size < kth:
+                admitting = False
+            if not admitting:
+                counts = {
+                    d: c for d, c in counts.items() if self._upper_bound(d, c, size, remaining) >= kth
+                }
+                limit = max(counts)
+
+        ranked = heapq.nsmallest(
+            k, counts.items(), key=lambda item: (-self._score(item[0], item[1], size), item[0])
+        )
+        return [
+            Neighbor(self._keys[doc], self._score(doc, overlap, size), overlap) for doc, overlap in ranked
+        ]
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="倒排索引：返回与待查文件最相似的前 k 篇参考文档")
+    parser.add_argument("corpus", type=Path, help="参考文档目录，或每行一个路径的清单文件")
+    parser.add_argument("suspects", type=Path, nargs="+", help="待查文件")
+    parser.add_argument("-k", "--top", type=int, default=DEFAULT_TOP_K, help="返回的文档数（默认 10）")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    parser.add_argument("--cache-dir", type=Path, help="shingle 缓存目录")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    cache = None if args.cache_dir is None else ShingleCache(args.cache_dir)
+    index = InvertedIndex.from_paths(collect_documents(args.corpus), args.window, cache=cache)
+    for suspect in args.suspects:
+        shingles = shingles_from_file(suspect, args.window, compact=True, cache=cache)
+        for neighbor in index.top_k(shingles, args.top):
+            print(f"{suspect}\t{format_percentage(neighbor.score)}\t{neighbor.key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+﻿"""MinHash signatures and a banded LSH index for screening one document against many."""
+from __future__ import annotations
+
+import random
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Hashable, Iterable, Set, Tuple
+
+from plagiarism_checker import (
+    DEFAULT_WINDOW,
+    Shingles,
+    hash_shingles,
+    jaccard_similarity,
+    shingle_hash,
+    tokenize,
+)
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_SEED = 1
+DEFAULT_ESTIMATE_MARGIN = 0.1
+_MERSENNE_PRIME = (1 << 61) - 1
+_EMPTY_SLOT = _MERSENNE_PRIME
+
+
+@dataclass(frozen=True)
+class Match:
+    """A corpus document that passed both the LSH screen and the exact re-check."""
+
+    key: Hashable
+    estimate: float
+    score: float
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm: int, seed: int) -> tuple[tuple[int, int], ...]:
+    rng = random.Random(seed)
+    return tuple(
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+    )
+
+
+def minhash_signature(
+    hashes: Iterable[int], num_perm: int = DEFAULT_NUM_PERM, seed: int = DEFAULT_SEED
+) -> array:
+    """Return the MinHash signature of a collection of 64-bit shingle hashes."""
+
+    if num_perm <= 0:
+        raise ValueError("num_perm must be positive")
+    values = [h % _MERSENNE_PRIME for h in set(hashes)]
+    if not values:
+        return array("Q", [_EMPTY_SLOT] * num_perm)
+    return array(
+        "Q",
+        [min((a * v + b) % _MERSENNE_PRIME for v in values) for a, b in _permutations(num_perm, seed)],
+    )
+
+
+def signature_from_shingles(
+    shingles: Iterable[Tuple[str, ...]] | Shingles, num_perm: int = DEFAULT_NUM_PERM, seed: int = DEFAULT_SEED
+) -> array:
+    """Return the MinHash signature of `build_shingles` tuples or a `hash_shingles` array."""
+
+    if isinstance(shingles, array):
+        return minhash_signature(shingles, num_perm, seed)
+    return minhash_signature((shingle_hash(s) for s in shingles), num_perm, seed)
+
+
+def signature_from_text(
+    text: str, window: int = DEFAULT_WINDOW, num_perm: int = DEFAULT_NUM_PERM, seed: int = DEFAULT_SEED
+) -> array:
+    """Tokenize and shingle a text, then return its MinHash signature."""
+
+    return minhash_signature(hash_shingles(tokenize(text), window), num_perm, seed)
+
+
+def estimate_similarity(sig_a: array, sig_b: array) -> float:
+    """Estimate Jaccard similarity as the fraction of agreeing signature slots."""
+
+    if len(sig_a) != len(sig_b):
+        raise ValueError("Signatures must have the same number of permutations")
+    if not sig_a:
+        return 1.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _probability_integral(bands: int, rows: int, lower: float, upper: float, steps: int = 100) -> float:
+    width = (upper - lower) / steps
+    total = 0.0
+    for step in range(steps):
+        s = lower + (step + 0.5) * width
+        total += 1 - (1 - s**rows) ** bands
+    return total * width
+
+
+@lru_cache(maxsize=None)
+def optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Pick (bands, rows) minimising false positive plus false negative mass around the threshold."""
+
+    best = (1, num_perm)
+    best_error = float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        false_positive = _probability_integral(bands, rows, 0.0, threshold)
+        false_negative = (1 - threshold) - _probability_integral(bands, rows, threshold, 1.0)
+        error = false_positive + false_negative
+        if error < best_error:
+            best_error = error
+            best = (bands, rows)
+    return best
+
+
+class MinHashLSH:
+    """Banded LSH index over MinHash signatures.
+
+    Each signature is cut into `bands` slices of `rows` slots; documents sharing any
+    slice land in the same bucket, so a query only touches its own buckets instead of
+    the whole corpus.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int | None = None,
+        seed: int = DEFAULT_SEED,
+    ):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be within (0, 1]")
+        if num_perm <= 0:
+            raise ValueError("num_perm must be positive")
+        if bands is None:
+            bands, rows = optimal_bands(threshold, num_perm)
+        else:
+            if bands <= 0 or bands > num_perm:
+                raise ValueError("bands must be within 1~num_perm")
+            rows = num_perm // bands
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = rows
+        self.seed = seed
+        self._buckets: list[dict[bytes, list[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: dict[Hashable, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def __getitem__(self, key: Hashable) -> array:
+        return self._signatures[key]
+
+    def signature(self, shingles: Iterable[Tuple[str, ...]] | Shingles) -> array:
+        """Return a signature compatible with this index for the given shingles."""
+
+        return signature_from_shingles(shingles, self.num_perm, self.seed)
+
+    def _band_keys(self, signature: array) -> Iterable[bytes]:
+        for band in range(self.bands):
+            start = band * self.rows
+            yield signature[start : start + self.rows].tobytes()
+
+    def _check(self, signature: array) -> None:
+        if len(signature) != self.num_perm:
+            raise ValueError(f"Expected a signature of {self.num_perm} slots, got {len(signature)}")
+
+    def add(self, key: Hashable, signature: array) -> None:
+        """Insert a document signature under `key`."""
+
+        self._check(signature)
+        if key in self._signatures:
+            raise ValueError(f"Key {key!r} is already indexed")
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+
+    def remove(self, key: Hashable) -> None:
+        """Drop a previously indexed document."""
+
+        signature = self._signatures.pop(key)
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket[band_key]
+            members.remove(key)
+            if not members:
+                del bucket[band_key]
+
+    def candidates(self, signature: array) -> Set[Hashable]:
+        """Return every key that shares at least one band with the signature."""
+
+        self._check(signature)
+        found: Set[Hashable] = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            found.update(bucket.get(band_key, ()))
+        return found
+
+    def query(self, signature: array, min_estimate: float | None = None) -> list[tuple[Hashable, float]]:
+        """Return `(key, estimated_similarity)` for candidates, highest estimate first."""
+
+        floor = self.threshold if min_estimate is None else min_estimate
+        scored = [
+            (key, estimate_similarity(signature, self._signatures[key])) for key in self.candidates(signature)
+        ]
+        return sorted(
+            ((key, estimate) for key, estimate in scored if estimate >= floor),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+def find_similar(
+    suspect_shingles: Shingles,
+    index: MinHashLSH,
+    load_shingles: Callable[[Hashable], Shingles],
+    estimate_margin: float = DEFAULT_ESTIMATE_MARGIN,
+) -> list[Match]:
+    """Shortlist corpus documents via LSH, then confirm them with an exact Jaccard check.
+
+    Candidates whose estimate lies within `estimate_margin` below the threshold are still
+    re-checked, since the MinHash estimate has a standard error of about 1/sqrt(num_perm).
+    """
+
+    signature = index.signature(suspect_shingles)
+    shortlist = index.query(signature, max(index.threshold - estimate_margin, 0.0))
+    matches = []
+    for key, estimate in shortlist:
+        score = jaccard_similarity(suspect_shingles, load_shingles(key))
+        if score >= index.threshold:
+            matches.append(Match(key=key, estimate=estimate, score=score))
+    matches.sort(key=lambda match: match.score, reverse=True)
+    return matches
@@ -0,0 +1,254 @@
+﻿"""Reproducible benchmarks for plagiarism_checker on synthetic original/plagiarized pairs."""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Sequence
+
+from plagiarism_checker import (
+    DEFAULT_WINDOW,
+    PlagiarismError,
+    build_shingles,
+    hash_shingles,
+    jaccard_similarity,
+    similarity_from_files,
+    token_id,
+    tokenize,
+)
+
+DEFAULT_SIZES = (100_000,)
+DEFAULT_EDIT_RATE = 0.1
+DEFAULT_VOCABULARY = 20_000
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_SEED = 2024
+
+
+def generate_pair(
+    words: int,
+    edit_rate: float = DEFAULT_EDIT_RATE,
+    seed: int = DEFAULT_SEED,
+    vocabulary: int = DEFAULT_VOCABULARY,
+) -> tuple[str, str]:
+    """Return `(original, plagiarized)` texts of about `words` words.
+
+    Each original word is, with probability `edit_rate`, deleted, followed by an
+    inserted word, or swapped for its synonym (`wN` <-> `sN`), in equal proportion.
+    """
+
+    if words < 0:
+        raise ValueError("words must be non-negative")
+    if not 0.0 <= edit_rate <= 1.0:
+        raise ValueError("edit_rate must be within 0~1")
+    rng = random.Random(seed)
+    original = [f"w{rng.randrange(vocabulary)}" for _ in range(words)]
+    plagiarized: list[str] = []
+    for word in original:
+        if rng.random() >= edit_rate:
+            plagiarized.append(word)
+            continue
+        edit = rng.randrange(3)
+        if edit == 1:
+            plagiarized.extend((word, f"w{rng.randrange(vocabulary)}"))
+        elif edit == 2:
+            plagiarized.append("s" + word[1:])
+    return " ".join(original), " ".join(plagiarized)
+
+
+def _time(func: Callable[[], object], repeat: int, cold: bool) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            token_id.cache_clear()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _peak(func: Callable[[], object], cold: bool) -> int:
+    if cold:
+        token_id.cache_clear()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Time `func` with a cold and with a warm `token_id` cache.
+
+    Cold runs clear the cache first, so they include the blake2b hashing a document
+    of unseen words pays. Warm runs follow one untimed priming call, which is the
+    steady state of a long-running process re-checking a familiar vocabulary.
+    """
+
+    cold = _time(func, repeat, cold=True)
+    cold_peak = _peak(func, cold=True)
+    func()
+    warm = _time(func, repeat, cold=False)
+    return {
+        "seconds": min(warm),
+        "median_seconds": statistics.median(warm),
+        "peak_bytes": _peak(func, cold=False),
+        "cold_seconds": min(cold),
+        "cold_median_seconds": statistics.median(cold),
+        "cold_peak_bytes": cold_peak,
+    }
+
+
+def benchmark_size(
+    words: int,
+    edit_rate: float = DEFAULT_EDIT_RATE,
+    window: int = DEFAULT_WINDOW,
+    repeat: int = DEFAULT_REPEAT,
+    seed: int = DEFAULT_SEED,
+) -> dict[str, dict[str, float]]:
+    """Time each pipeline stage separately (best of `repeat`) and record its peak memory.
+
+    Every stage is measured cold (empty `token_id` cache) and warm; see `_measure`.
+    Peak memory comes from extra, untimed runs under tracemalloc so that tracing
+    overhead never leaks into the timings.
+    """
+
+    if repeat <= 0:
+        raise ValueError("repeat must be positive")
+    original, suspect = generate_pair(words, edit_rate, seed)
+    words_a, words_b = tokenize(original), tokenize(suspect)
+    shingles_a, shingles_b = build_shingles(words_a, window), build_shingles(words_b, window)
+    hashes_a, hashes_b = hash_shingles(words_a, window), hash_shingles(words_b, window)
+
+    results = {
+        "tokenize": _measure(lambda: tokenize(original), repeat),
+        "build_shingles": _measure(lambda: build_shingles(words_a, window), repeat),
+        "jaccard_similarity": _measure(lambda: jaccard_similarity(shingles_a, shingles_b), repeat),
+        "hash_shingles": _measure(lambda: hash_shingles(words_a, window), repeat),
+        "jaccard_similarity_compact": _measure(lambda: jaccard_similarity(hashes_a, hashes_b), repeat),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path = Path(tmp) / "orig.txt"
+        suspect_path = Path(tmp) / "suspect.txt"
+        original_path.write_text(original, encoding="utf-8")
+        suspect_path.write_text(suspect, encoding="utf-8")
+        results["similarity_from_files"] = _measure(
+            lambda: similarity_from_files(original_path, suspect_path, window), repeat
+        )
+        results["similarity_from_files_stream"] = _measure(
+            lambda: similarity_from_files(original_path, suspect_path, window, streaming=True), repeat
+        )
+    return results
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    edit_rate: float = DEFAULT_EDIT_RATE,
+    window: int = DEFAULT_WINDOW,
+    repeat: int = DEFAULT_REPEAT,
+    seed: int = DEFAULT_SEED,
+) -> dict[str, object]:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "edit_rate": edit_rate,
+            "window": window,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": {str(size): benchmark_size(size, edit_rate, window, repeat, seed) for size in sizes},
+    }
+
+
+def compare(
+    current: dict[str, object], baseline: dict[str, object], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """Return one line per stage whose time or peak memory exceeds baseline by `tolerance`."""
+
+    regressions = []
+    for size, stages in current["results"].items():
+        base_stages = baseline["results"].get(size, {})
+        for stage, metrics in stages.items():
+            base = base_stages.get(stage)
+            if base is None:
+                continue
+            for metric in ("seconds", "cold_seconds", "peak_bytes", "cold_peak_bytes"):
+                if metric not in base or metric not in metrics:
+                    continue
+                old, new = base[metric], metrics[metric]
+                if old > 0 and new > old * (1 + tolerance):
+                    change = f"{old:.6g} -> {new:.6g} ({new / old:.2f}x)"
+                    regressions.append(f"{size} 词 {stage}.{metric}: {change}")
+    return regressions
+
+
+def _load_json(path: Path) -> dict[str, object]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise PlagiarismError(f"无法读取基准结果: {exc}") from exc
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="查重性能基准：合成语料、分阶段计时与回归比较")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="生成合成语料并运行基准")
+    run.add_argument(
+        "--sizes",
+        type=lambda text: [int(part) for part in text.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="原文词数列表，如 100000,1000000",
+    )
+    run.add_argument("--edit-rate", type=float, default=DEFAULT_EDIT_RATE, help="每词被改写的概率（默认 0.1）")
+    run.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每个阶段重复次数，取最快值")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子")
+    run.add_argument("--output", type=Path, required=True, help="结果 JSON 路径")
+    run.add_argument("--baseline", type=Path, help="与之比较的基线 JSON")
+    run.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的相对退化（默认 0.25）")
+
+    check = subparsers.add_parser("compare", help="比较两份已有结果")
+    check.add_argument("current", type=Path)
+    check.add_argument("baseline", type=Path)
+    check.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的相对退化（默认 0.25）")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.command == "run":
+        current = run_benchmarks(args.sizes, args.edit_rate, args.window, args.repeat, args.seed)
+        try:
+            args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        except OSError as exc:
+            raise PlagiarismError(f"无法写入输出文件: {exc}") from exc
+        for size, stages in current["results"].items():
+            for stage, metrics in stages.items():
+                cold = metrics["cold_seconds"] * 1000
+                warm = metrics["seconds"] * 1000
+                mebibytes = metrics["cold_peak_bytes"] / 2**20
+                print(f"{size}\t{stage}\t冷 {cold:.1f} ms\t热 {warm:.1f} ms\t{mebibytes:.1f} MiB")
+        if args.baseline is None:
+            return
+        baseline = _load_json(args.baseline)
+    else:
+        current = _load_json(args.current)
+        baseline = _load_json(args.baseline)
+
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        raise SystemExit("\n".join(["发现性能退化:", *regressions]))
+    print("未发现性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,61 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import heapq
+import json
+import mmap
 import re
+import sys
+import tempfile
+from array import array
+from collections import deque
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import blake2b
 from pathlib import Path
-from typing import Iterable, Sequence, Set, Tuple
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Sequence, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from shingle_cache import ShingleCache
+    from stage_stats import StageStats
 
 DEFAULT_WINDOW = 3
+# Bump whenever tokenize/token_id/shingle hashing changes so cached shingles are not reused.
+TOKENIZER_VERSION = 1
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_WINNOW = 4
+_RUN_SIZE = 1 << 18
+# Conservative per-hash cost while a spill run is buffered: int object, set slot, sort list.
+_SPILL_BYTES_PER_HASH = 128
+_SPILL_BLOCK = 1 << 13
+# Per-entry cost of a token id cache: short str key, int value, dict slot.
+_TOKEN_ID_BYTES = 256
 _WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+_HASH_MASK = (1 << 64) - 1
+_ROLL_BASE = 0x100000001B3
+
+Shingles = Union[Set[Tuple[str, ...]], array]
 
 
 class PlagiarismError(Exception):
     """Custom exception for plagiarism checker errors."""
 
 
+@dataclass(frozen=True)
+class Passage:
+    """Aligned overlap: token range [start, end) in the original and in the suspect."""
+
+    source_start: int
+    source_end: int
+    suspect_start: int
+    suspect_end: int
+
+    def __len__(self) -> int:
+        return self.suspect_end - self.suspect_start
+
+
 def tokenize(text: str) -> list[str]:
     """Lowercase and split text into words, keeping alphanumerics and apostrophes."""
 
@@ -33,8 +76,380 @@ def build_shingles(words: Sequence[str], window: int = DEFAULT_WINDOW) -> Set[Tu
     return {tuple(words[i : i + window]) for i in range(len(words) - window + 1)}
 
 
-def jaccard_similarity(a: Iterable[Tuple[str, ...]], b: Iterable[Tuple[str, ...]]) -> float:
-    """Compute Jaccard similarity between two shingle collections."""
+@lru_cache(maxsize=1 << 18)
+def token_id(token: str) -> int:
+    """Intern a token as a process-independent 64-bit id."""
+
+    return int.from_bytes(blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def shingle_hash(shingle: Sequence[str]) -> int:
+    """Return the 64-bit rolling-hash value `hash_shingles` assigns to one shingle."""
+
+    value = 0
+    for token in shingle:
+        value = (value * _ROLL_BASE + token_id(token)) & _HASH_MASK
+    return value
+
+
+def hash_shingles(words: Sequence[str], window: int = DEFAULT_WINDOW) -> array:
+    """Return the compact form of `build_shingles`: sorted, unique 64-bit hashes in an `array('Q')`.
+
+    Tokens are interned to 64-bit ids and a polynomial hash is extended one token at a
+    time over all windows at once, so no tuple is ever built. Two distinct shingles share
+    a hash with probability about 2**-64, so for inputs with n shingles in total the
+    expected number of collisions is below n**2 / 2**65 (under 1e-8 for two 300k-word
+    texts); each collision can shift the Jaccard score by at most 1 / |union|. Otherwise
+    scores equal the set-based path.
+    """
+
+    return array("Q", sorted(set(positional_hashes(words, window))))
+
+
+def positional_hashes(words: Sequence[str], window: int = DEFAULT_WINDOW) -> list[int]:
+    """Return the hash of the shingle starting at each token offset, in text order."""
+
+    if window <= 0:
+        raise ValueError("Window size must be positive")
+    if not words:
+        return []
+    if len(words) < window:
+        return [shingle_hash(words)]
+
+    ids = [token_id(word) for word in words]
+    values = ids[: len(ids) - window + 1]
+    for offset in range(1, window):
+        values = [(v * _ROLL_BASE + token) & _HASH_MASK for v, token in zip(values, ids[offset:])]
+    return values
+
+
+def multi_window_hashes(words: Sequence[str], windows: Iterable[int]) -> dict[int, array]:
+    """Return `hash_shingles(words, k)` for every k in `windows` from one shared pass.
+
+    Token ids are computed once and the positional hashes for size k are extended to
+    k + 1 with one more token, so all sizes together cost about one run at the largest.
+    """
+
+    ids = [token_id(word) for word in words]
+    return {window: array("Q", sorted(set(values))) for window, values in _grow_windows(ids, windows)}
+
+
+def _grow_windows(ids: Sequence[int], windows: Iterable[int]) -> Iterator[tuple[int, list[int]]]:
+    """Yield `(k, positional_hashes for size k)` for each requested k, in ascending order."""
+
+    targets = sorted(set(windows))
+    if not targets or targets[0] <= 0:
+        raise ValueError("Window sizes must be positive")
+    values = list(ids)
+    size = 1
+    for target in targets:
+        while size < target and size < len(ids):
+            values = [(v * _ROLL_BASE + token) & _HASH_MASK for v, token in zip(values, ids[size:])]
+            size += 1
+        yield target, values
+
+
+def winnow(
+    words: Sequence[str], window: int = DEFAULT_WINDOW, winnow_size: int = DEFAULT_WINNOW
+) -> list[tuple[int, int]]:
+    """Return MOSS-style winnowed fingerprints as `(hash, token_offset)` pairs.
+
+    Of every `winnow_size` consecutive shingle hashes the minimum (rightmost on ties) is
+    kept, so roughly 2 / (winnow_size + 1) of the shingles survive while any shared run
+    of at least `window + winnow_size - 1` tokens is still guaranteed a common fingerprint.
+    """
+
+    if winnow_size <= 0:
+        raise ValueError("Winnow size must be positive")
+    hashes = positional_hashes(words, window)
+    fingerprints: list[tuple[int, int]] = []
+    candidates: deque[int] = deque()
+    for position, value in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(position)
+        if candidates[0] <= position - winnow_size:
+            candidates.popleft()
+        if position >= winnow_size - 1 or position == len(hashes) - 1:
+            chosen = candidates[0]
+            if not fingerprints or fingerprints[-1][1] != chosen:
+                fingerprints.append((hashes[chosen], chosen))
+    return fingerprints
+
+
+def match_passages(
+    source: Sequence[tuple[int, int]],
+    suspect: Sequence[tuple[int, int]],
+    window: int = DEFAULT_WINDOW,
+    winnow_size: int = DEFAULT_WINNOW,
+) -> list[Passage]:
+    """Merge fingerprints shared by two documents into aligned passages.
+
+    Matching offsets on the same diagonal (suspect offset minus source offset) that lie
+    within one winnow span of each other belong to the same copied passage. Passages
+    whose suspect range is contained in a longer one are dropped.
+    """
+
+    offsets: dict[int, list[int]] = {}
+    for value, offset in source:
+        offsets.setdefault(value, []).append(offset)
+    pairs = sorted(
+        (suspect_offset - source_offset, source_offset)
+        for value, suspect_offset in suspect
+        for source_offset in offsets.get(value, ())
+    )
+
+    gap = window + winnow_size
+    spans: list[Passage] = []
+    start = last = diagonal = None
+    for shift, offset in pairs + [(None, None)]:
+        if start is not None and (shift != diagonal or offset - last > gap):
+            spans.append(Passage(start, last + window, start + diagonal, last + window + diagonal))
+            start = None
+        if shift is None:
+            break
+        if start is None:
+            start, diagonal = offset, shift
+        last = offset
+
+    kept: list[Passage] = []
+    for span in sorted(spans, key=len, reverse=True):
+        if not any(k.suspect_start <= span.suspect_start and span.suspect_end <= k.suspect_end for k in kept):
+            kept.append(span)
+    return sorted(kept, key=lambda span: span.suspect_start)
+
+
+def _merge_unique(runs: Sequence[array]) -> array:
+    """Merge sorted arrays into one sorted, duplicate-free array."""
+
+    merged = array("Q")
+    previous = None
+    for value in heapq.merge(*runs):
+        if value != previous:
+            merged.append(value)
+            previous = value
+    return merged
+
+
+def _bounded_token_ids(max_memory: int) -> Callable[[str], int]:
+    """Return a `token_id` equivalent whose private cache stays within `max_memory` bytes.
+
+    The shared `lru_cache` of `token_id` holds up to 262144 tokens whatever the input,
+    which a memory budget cannot account for; this cache is simply emptied when full.
+    """
+
+    limit = max(1, max_memory // _TOKEN_ID_BYTES)
+    compute = token_id.__wrapped__
+    ids: dict[str, int] = {}
+
+    def lookup(token: str) -> int:
+        ident = ids.get(token)
+        if ident is None:
+            if len(ids) >= limit:
+                ids.clear()
+            ident = ids[token] = compute(token)
+        return ident
+
+    return lookup
+
+
+def _rolling_hashes(
+    tokens: Iterable[str], window: int, ids: Callable[[str], int] = token_id
+) -> Iterator[int]:
+    """Yield `positional_hashes` one by one, holding only the last `window` token ids."""
+
+    if window <= 0:
+        raise ValueError("Window size must be positive")
+    top = pow(_ROLL_BASE, window - 1, 1 << 64)
+    recent: deque[int] = deque()
+    value = 0
+    for token in tokens:
+        ident = ids(token)
+        if len(recent) == window:
+            value -= recent.popleft() * top
+        recent.append(ident)
+        value = (value * _ROLL_BASE + ident) & _HASH_MASK
+        if len(recent) == window:
+            yield value
+    if recent and len(recent) < window:
+        yield value
+
+
+def hash_shingles_stream(tokens: Iterable[str], window: int = DEFAULT_WINDOW) -> array:
+    """Return the same array as `hash_shingles`, consuming tokens one at a time.
+
+    Only the last `window` token ids are held; hashes are buffered in fixed-size sorted
+    runs that are merged like a binary counter, so memory follows the number of unique
+    shingles rather than the input length.
+    """
+
+    runs: list[array] = []
+    pending: set[int] = set()
+    for value in _rolling_hashes(tokens, window):
+        pending.add(value)
+        if len(pending) >= _RUN_SIZE:
+            runs.append(array("Q", sorted(pending)))
+            pending.clear()
+            while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+                runs.append(_merge_unique([runs.pop(), runs.pop()]))
+    runs.append(array("Q", sorted(pending)))
+    return runs[0] if len(runs) == 1 else _merge_unique(runs)
+
+
+def _write_run(values: Iterable[int], directory: Path) -> Path:
+    handle, name = tempfile.mkstemp(suffix=".run", dir=directory)
+    with open(handle, "wb") as stream:
+        block = array("Q")
+        for value in values:
+            block.append(value)
+            if len(block) == _SPILL_BLOCK:
+                block.tofile(stream)
+                del block[:]
+        block.tofile(stream)
+    return Path(name)
+
+
+def _read_run(path: Path) -> Iterator[int]:
+    with path.open("rb") as stream:
+        while True:
+            block = array("Q")
+            try:
+                block.fromfile(stream, _SPILL_BLOCK)
+            except EOFError:
+                yield from block
+                return
+            yield from block
+
+
+def _unique(values: Iterable[int]) -> Iterator[int]:
+    previous = None
+    for value in values:
+        if value != previous:
+            yield value
+            previous = value
+
+
+def spill_shingles(
+    tokens: Iterable[str],
+    window: int,
+    max_memory: int,
+    directory: Path,
+    ids: Callable[[str], int] = token_id,
+) -> Iterator[int]:
+    """Yield the values of `hash_shingles` in order, keeping about `max_memory` bytes of hashes.
+
+    Hashes are buffered until the budget is reached, then written to `directory` as a
+    sorted run. Runs are merged with a k-way merge that reads each run in small blocks;
+    if there are more runs than the budget can hold blocks for, groups of runs are
+    merged into longer runs first. Run files are deleted once the merge finishes.
+    `ids` maps tokens to ids; the default uses the shared `token_id` cache, which no budget covers.
+    """
+
+    run_size = max(_SPILL_BLOCK, max_memory // _SPILL_BYTES_PER_HASH)
+    fan_in = max(2, max_memory // (4 * _SPILL_BLOCK * 8))
+    runs: list[Path] = []
+    pending: set[int] = set()
+    for value in _rolling_hashes(tokens, window, ids):
+        pending.add(value)
+        if len(pending) >= run_size:
+            runs.append(_write_run(sorted(pending), directory))
+            pending.clear()
+    if not runs:
+        values = array("Q", sorted(pending))
+        pending.clear()
+        yield from values
+        return
+    if pending:
+        runs.append(_write_run(sorted(pending), directory))
+    pending.clear()
+    while len(runs) > fan_in:
+        group, runs = runs[:fan_in], runs[fan_in:]
+        runs.append(_write_run(_unique(heapq.merge(*map(_read_run, group))), directory))
+        for path in group:
+            path.unlink()
+    try:
+        yield from _unique(heapq.merge(*map(_read_run, runs)))
+    finally:
+        for path in runs:
+            path.unlink()
+
+
+def similarity_within_memory(
+    original_path: Path,
+    suspect_path: Path,
+    window: int = DEFAULT_WINDOW,
+    max_memory: int = 256 << 20,
+) -> float:
+    """Exact `jaccard_similarity` of two files with shingle data bounded by `max_memory`.
+
+    A quarter of the budget holds token ids (see `_bounded_token_ids`; the shared
+    `token_id` cache is not touched) and each file is spilled to sorted temporary runs
+    with half of the rest; the two merged, duplicate-free streams are then merged once
+    more, where a value seen twice is in the intersection and every distinct value
+    counts toward the union.
+    """
+
+    if max_memory <= 0:
+        raise ValueError("max_memory must be positive")
+    ids = _bounded_token_ids(max_memory // 4)
+    budget = (max_memory - max_memory // 4) // 2
+    chunk_size = max(mmap.PAGESIZE, min(DEFAULT_CHUNK_SIZE, budget // 16) // mmap.PAGESIZE * mmap.PAGESIZE)
+    try:
+        with tempfile.TemporaryDirectory(prefix="shingle-runs-") as tmp:
+            streams = [
+                spill_shingles(iter_file_tokens(path, chunk_size), window, budget, Path(tmp), ids)
+                for path in (original_path, suspect_path)
+            ]
+            union = common = 0
+            previous = None
+            for value in heapq.merge(*streams):
+                if value == previous:
+                    common += 1
+                else:
+                    union += 1
+                    previous = value
+    except OSError as exc:
+        raise PlagiarismError(f"无法写入临时文件: {exc}") from exc
+    return common / union if union else 1.0
+
+
+def _sorted_overlap(a: array, b: array) -> int:
+    """Count common values of two sorted, duplicate-free arrays with a linear merge."""
+
+    i = j = common = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        x, y = a[i], b[j]
+        if x == y:
+            common += 1
+            i += 1
+            j += 1
+        elif x < y:
+            i += 1
+        else:
+            j += 1
+    return common
+
+
+def jaccard_similarity(a: Iterable[Tuple[str, ...]] | array, b: Iterable[Tuple[str, ...]] | array) -> float:
+    """Compute Jaccard similarity between two shingle collections.
+
+    Two `hash_shingles` arrays are compared with a linear merge instead of set algebra.
+    When only one side is an array, the tuple shingles of the other side are hashed
+    with `shingle_hash` first, so mixed inputs score like two arrays instead of
+    never matching.
+    """
+
+    if isinstance(a, array) != isinstance(b, array):
+        if isinstance(a, array):
+            b = array("Q", sorted({shingle_hash(shingle) for shingle in b}))
+        else:
+            a = array("Q", sorted({shingle_hash(shingle) for shingle in a}))
+    if isinstance(a, array) and isinstance(b, array):
+        if not a and not b:
+            return 1.0
+        common = _sorted_overlap(a, b)
+        return common / (len(a) + len(b) - common)
 
     set_a = set(a)
     set_b = set(b)
@@ -46,26 +461,177 @@ def jaccard_similarity(a: Iterable[Tuple[str, ...]], b: Iterable[Tuple[str, ...]
     return len(set_a & set_b) / len(union)
 
 
-def compute_similarity(original: str, suspect: str, window: int = DEFAULT_WINDOW) -> float:
+def _stage(stats: StageStats | None, name: str) -> AbstractContextManager[None]:
+    return nullcontext() if stats is None else stats.stage(name)
+
+
+def compute_similarity(
+    original: str,
+    suspect: str,
+    window: int = DEFAULT_WINDOW,
+    compact: bool = False,
+    stats: StageStats | None = None,
+) -> float:
     """Compute similarity score (0~1) between two texts."""
 
-    words_a = tokenize(original)
-    words_b = tokenize(suspect)
-    shingles_a = build_shingles(words_a, window)
-    shingles_b = build_shingles(words_b, window)
-    return jaccard_similarity(shingles_a, shingles_b)
+    shingle = hash_shingles if compact else build_shingles
+    with _stage(stats, "tokenize"):
+        words_a = tokenize(original)
+        words_b = tokenize(suspect)
+    with _stage(stats, shingle.__name__):
+        shingles_a = shingle(words_a, window)
+        shingles_b = shingle(words_b, window)
+    with _stage(stats, "jaccard_similarity"):
+        score = jaccard_similarity(shingles_a, shingles_b)
+    if stats is not None:
+        stats.count("tokens", len(words_a) + len(words_b))
+        stats.count("shingles", len(shingles_a) + len(shingles_b))
+    return score
+
+
+def multi_window_similarity(original: str, suspect: str, windows: Iterable[int]) -> dict[int, float]:
+    """Compute the similarity for several window sizes after tokenizing each text once.
+
+    Both texts are grown in lockstep and only one window size's hashes are alive at a
+    time; the scores equal `compute_similarity(..., compact=True)` for each size.
+    """
+
+    windows = list(windows)
+    ids_a = [token_id(word) for word in tokenize(original)]
+    ids_b = [token_id(word) for word in tokenize(suspect)]
+    scores: dict[int, float] = {}
+    grown = zip(_grow_windows(ids_a, windows), _grow_windows(ids_b, windows))
+    for (window, values_a), (_, values_b) in grown:
+        set_a = set(values_a)
+        set_b = set(values_b)
+        common = len(set_a & set_b)
+        union = len(set_a) + len(set_b) - common
+        scores[window] = common / union if union else 1.0
+    return scores
 
 
-def similarity_from_files(original_path: Path, suspect_path: Path, window: int = DEFAULT_WINDOW) -> float:
-    """Load two files and compute their similarity."""
+def read_document(path: Path) -> str:
+    """Read a UTF-8 (optionally BOM-prefixed) text file."""
 
     try:
-        original_text = original_path.read_text(encoding="utf-8-sig")
-        suspect_text = suspect_path.read_text(encoding="utf-8-sig")
+        return path.read_text(encoding="utf-8-sig")
     except OSError as exc:
         raise PlagiarismError(f"无法读取文件: {exc}") from exc
 
-    return compute_similarity(original_text, suspect_text, window)
+
+def iter_file_tokens(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield the tokens `tokenize` would produce for a file, without loading it whole.
+
+    The file is memory-mapped and decoded chunk by chunk; a word touching the end of a
+    chunk is carried over so it is never split in two. When `chunk_size` is a multiple
+    of the page size, pages already decoded are released so resident memory stays flat.
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    release = hasattr(mmap, "MADV_DONTNEED") and chunk_size % mmap.PAGESIZE == 0
+    try:
+        with path.open("rb") as handle:
+            if path.stat().st_size == 0:
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                decoder = codecs.getincrementaldecoder("utf-8-sig")()
+                carry = ""
+                for start in range(0, len(mapped), chunk_size):
+                    text = carry + decoder.decode(mapped[start : start + chunk_size])
+                    if release:
+                        mapped.madvise(mmap.MADV_DONTNEED, start, min(chunk_size, len(mapped) - start))
+                    carry = ""
+                    for match in _WORD_RE.finditer(text):
+                        if match.end() == len(text):
+                            carry = match.group(0)
+                            break
+                        yield match.group(0).lower()
+                text = carry + decoder.decode(b"", final=True)
+                for match in _WORD_RE.finditer(text):
+                    yield match.group(0).lower()
+    except OSError as exc:
+        raise PlagiarismError(f"无法读取文件: {exc}") from exc
+
+
+def shingles_from_file(
+    path: Path,
+    window: int = DEFAULT_WINDOW,
+    compact: bool = False,
+    streaming: bool = False,
+    cache: ShingleCache | None = None,
+) -> Shingles:
+    """Read a file and return its shingle set (or compact hash array).
+
+    `streaming=True` implies the compact form and never materialises the text or word list.
+    With a `cache`, the compact form is returned and unchanged files skip tokenization.
+    """
+
+    if cache is not None:
+        return cache.shingles(path, window, streaming)
+    if streaming:
+        return hash_shingles_stream(iter_file_tokens(path), window)
+    shingle = hash_shingles if compact else build_shingles
+    return shingle(tokenize(read_document(path)), window)
+
+
+def similarity_from_files(
+    original_path: Path,
+    suspect_path: Path,
+    window: int = DEFAULT_WINDOW,
+    compact: bool = False,
+    streaming: bool = False,
+    cache: ShingleCache | None = None,
+    stats: StageStats | None = None,
+) -> float:
+    """Load two files and compute their similarity.
+
+    With `stats`, each stage is timed; streaming and cached loads fuse reading,
+    tokenizing and shingling into a single `shingles_from_file` stage.
+    """
+
+    if streaming or cache is not None:
+        with _stage(stats, "shingles_from_file"):
+            shingles_a = shingles_from_file(original_path, window, streaming=streaming, cache=cache)
+            shingles_b = shingles_from_file(suspect_path, window, streaming=streaming, cache=cache)
+        with _stage(stats, "jaccard_similarity"):
+            score = jaccard_similarity(shingles_a, shingles_b)
+        if stats is not None:
+            stats.count("shingles", len(shingles_a) + len(shingles_b))
+        return score
+    with _stage(stats, "read_document"):
+        original_text = read_document(original_path)
+        suspect_text = read_document(suspect_path)
+    if stats is not None:
+        stats.count("characters", len(original_text) + len(suspect_text))
+    return compute_similarity(original_text, suspect_text, window, compact, stats)
+
+
+def find_passages(
+    original: str, suspect: str, window: int = DEFAULT_WINDOW, winnow_size: int = DEFAULT_WINNOW
+) -> list[dict[str, object]]:
+    """Locate copied passages via winnowing and return them as JSON-ready records."""
+
+    words_a = tokenize(original)
+    words_b = tokenize(suspect)
+    passages = match_passages(
+        winnow(words_a, window, winnow_size), winnow(words_b, window, winnow_size), window, winnow_size
+    )
+    records = []
+    for passage in passages:
+        source_end = min(passage.source_end, len(words_a))
+        suspect_end = min(passage.suspect_end, len(words_b))
+        records.append(
+            {
+                "source_start": passage.source_start,
+                "source_end": source_end,
+                "suspect_start": passage.suspect_start,
+                "suspect_end": suspect_end,
+                "source_text": " ".join(words_a[passage.source_start : source_end]),
+                "suspect_text": " ".join(words_b[passage.suspect_start : suspect_end]),
+            }
+        )
+    return records
 
 
 def format_percentage(score: float) -> str:
@@ -75,6 +641,38 @@ def format_percentage(score: float) -> str:
     return f"{percentage:.2f}%"
 
 
+def format_window_table(scores: dict[int, float]) -> str:
+    """Render per-window scores as a two-column table."""
+
+    lines = ["window\tsimilarity"]
+    lines.extend(f"{window}\t{format_percentage(score)}" for window, score in sorted(scores.items()))
+    return "\n".join(lines)
+
+
+def _parse_windows(text: str) -> list[int]:
+    try:
+        windows = [int(part) for part in text.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"无效的窗口列表: {text}") from exc
+    if not windows or min(windows) <= 0:
+        raise argparse.ArgumentTypeError("窗口大小必须为正整数")
+    return windows
+
+
+def _parse_size(text: str) -> int:
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    number, unit = text.strip().upper().rstrip("B"), 1
+    if number[-1:] in units:
+        number, unit = number[:-1], units[number[-1]]
+    try:
+        size = int(float(number) * unit)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"无效的内存大小: {text}") from exc
+    if size <= 0:
+        raise argparse.ArgumentTypeError("内存大小必须为正数")
+    return size
+
+
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="论文查重：基于词语 shingles 的重复率计算")
     parser.add_argument("original", type=Path, help="原文文件的绝对路径")
@@ -86,18 +684,147 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default=DEFAULT_WINDOW,
         help="shingle 窗口大小（默认 3）",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--windows",
+        type=_parse_windows,
+        help="一次计算多个窗口大小，如 2,3,5,8；输出按窗口列出的重复率表",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="使用 64 位哈希数组表示 shingle，显著降低长文本内存占用",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="内存映射逐块读取并直接滚动生成 shingle 哈希，适合 GB 级输入（隐含 --compact）",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=_parse_size,
+        help="shingle 数据的内存上限，如 256M、1G：超出部分排序后写入临时文件再多路归并，结果与内存计算一致",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="shingle 缓存目录：按内容哈希复用已处理文件的结果（隐含 --compact）",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        help="额外输出 JSON 报告：重复率及基于 winnowing 指纹定位的重复段落（按词偏移）",
+    )
+    parser.add_argument(
+        "--winnow",
+        type=int,
+        default=DEFAULT_WINNOW,
+        help="winnowing 窗口大小（默认 4），越大指纹越少、定位越粗",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="在标准错误输出各阶段耗时、调用次数、tracemalloc 峰值内存以及词/shingle 数",
+    )
+    parser.add_argument(
+        "--stats-no-memory",
+        action="store_true",
+        help="同 --stats 但只统计耗时与计数，不启动 tracemalloc（避免其拖慢内存分配、扭曲耗时）",
+    )
+    parser.add_argument("--stats-json", type=Path, help="把各阶段统计写入 JSON 文件，便于接入监控面板")
+    parser.add_argument("--profile", type=Path, help="用 cProfile 运行并把结果写入该文件（pstats 格式）")
+    args = parser.parse_args(argv)
+    if args.windows:
+        ignored = {
+            "--compact": args.compact,
+            "--stream": args.stream,
+            "--max-memory": args.max_memory is not None,
+            "--cache-dir": args.cache_dir is not None,
+            "--report": args.report is not None,
+        }
+        conflicts = [flag for flag, given in ignored.items() if given]
+        if conflicts:
+            parser.error(f"--windows 不能与 {'、'.join(conflicts)} 同时使用")
+    if args.max_memory is not None:
+        unbounded = {"--cache-dir": args.cache_dir, "--report": args.report}
+        conflicts = [flag for flag, value in unbounded.items() if value is not None]
+        if conflicts:
+            parser.error(f"--max-memory 不能与 {'、'.join(conflicts)} 同时使用")
+    return args
 
 
-def main(argv: Sequence[str] | None = None) -> None:
-    args = parse_args(argv)
-    similarity = similarity_from_files(args.original, args.suspect, args.window)
+def _check(args: argparse.Namespace, stats: StageStats | None) -> None:
+    if args.windows:
+        with _stage(stats, "multi_window_similarity"):
+            scores = multi_window_similarity(
+                read_document(args.original), read_document(args.suspect), args.windows
+            )
+        table = format_window_table(scores)
+        try:
+            args.output.write_text(table, encoding="utf-8")
+        except OSError as exc:
+            raise PlagiarismError(f"无法写入输出文件: {exc}") from exc
+        print(table)
+        return
+
+    cache = None
+    if args.cache_dir is not None:
+        from shingle_cache import ShingleCache
+
+        cache = ShingleCache(args.cache_dir)
+    if args.max_memory is not None:
+        with _stage(stats, "similarity_within_memory"):
+            similarity = similarity_within_memory(args.original, args.suspect, args.window, args.max_memory)
+    else:
+        similarity = similarity_from_files(
+            args.original, args.suspect, args.window, args.compact, args.stream, cache, stats
+        )
     result = format_percentage(similarity)
     try:
         args.output.write_text(result, encoding="utf-8")
     except OSError as exc:
         raise PlagiarismError(f"无法写入输出文件: {exc}") from exc
+    if args.report is not None:
+        with _stage(stats, "find_passages"):
+            passages = find_passages(
+                read_document(args.original), read_document(args.suspect), args.window, args.winnow
+            )
+        report = {"score": similarity, "percentage": result, "passages": passages}
+        try:
+            args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        except OSError as exc:
+            raise PlagiarismError(f"无法写入报告文件: {exc}") from exc
     print(result)
+    if cache is not None:
+        print(f"缓存命中 {cache.hits} 次，未命中 {cache.misses} 次", file=sys.stderr)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    report_stats = args.stats or args.stats_no_memory
+    if not (report_stats or args.stats_json or args.profile):
+        _check(args, None)
+        return
+
+    from stage_stats import StageStats, profiled
+
+    stats = None
+    if report_stats or args.stats_json:
+        stats = StageStats(trace_memory=not args.stats_no_memory)
+    try:
+        with profiled(args.profile):
+            _check(args, stats)
+    finally:
+        if stats is not None:
+            stats.close()
+    if stats is None:
+        return
+    if report_stats:
+        print(stats.format(), file=sys.stderr)
+    if args.stats_json is not None:
+        try:
+            args.stats_json.write_text(json.dumps(stats.as_dict(), indent=2), encoding="utf-8")
+        except OSError as exc:
+            raise PlagiarismError(f"无法写入统计文件: {exc}") from exc
 
 
 if __name__ == "__main__":
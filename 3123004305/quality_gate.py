@@ -8,6 +8,17 @@ TARGET_FILES = [
     Path(__file__).with_name("study_planner.py"),
     Path(__file__).with_name("plagiarism_checker.py"),
     Path(__file__).with_name("main.py"),
+    Path(__file__).with_name("minhash_lsh.py"),
+    Path(__file__).with_name("corpus_checker.py"),
+    Path(__file__).with_name("shingle_cache.py"),
+    Path(__file__).with_name("similarity_service.py"),
+    Path(__file__).with_name("segment_index.py"),
+    Path(__file__).with_name("plagiarism_benchmark.py"),
+    Path(__file__).with_name("inverted_index.py"),
+    Path(__file__).with_name("simhash.py"),
+    Path(__file__).with_name("stage_stats.py"),
+    Path(__file__).with_name("weekly_planner.py"),
+    Path(__file__).with_name("batch_planner.py"),
 ]
 
 
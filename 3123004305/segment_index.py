@@ -0,0 +1,505 @@
+﻿"""Incremental on-disk reference index built from append-only segments and tombstones."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from minhash_lsh import DEFAULT_ESTIMATE_MARGIN, DEFAULT_NUM_PERM, DEFAULT_THRESHOLD, Match, MinHashLSH
+from plagiarism_checker import (
+    DEFAULT_WINDOW,
+    TOKENIZER_VERSION,
+    PlagiarismError,
+    format_percentage,
+    jaccard_similarity,
+    shingles_from_file,
+)
+from shingle_cache import ShingleCache
+
+DEFAULT_MAX_SEGMENTS = 8
+MANIFEST_NAME = "manifest.json"
+_ITEM_BYTES = 8
+_JOURNAL_MIN_RECORDS = 64
+
+
+@dataclass(frozen=True)
+class _Document:
+    key: str
+    seq: int
+    signature_offset: int
+    shingle_offset: int
+    shingle_count: int
+
+
+def _to_disk(values: array) -> bytes:
+    payload = array("Q", values)
+    if sys.byteorder == "big":
+        payload.byteswap()
+    return payload.tobytes()
+
+
+def _from_disk(data: bytes) -> array:
+    values = array("Q")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class _Segment:
+    """An immutable batch of documents: a JSON directory plus one binary data file.
+
+    Opening a segment reads nothing. The document directory is read on first use,
+    and signatures are loaded into a per-segment LSH index only when a query or a
+    compaction needs them. Shingle arrays stay on disk and are read back only for
+    exact re-checks.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_id: int,
+        threshold: float,
+        num_perm: int,
+        documents: list[_Document] | None = None,
+        lsh: MinHashLSH | None = None,
+    ):
+        self.directory = directory
+        self.segment_id = segment_id
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._documents = documents
+        self._lsh = lsh
+
+    @property
+    def data_path(self) -> Path:
+        return self.directory / f"seg-{self.segment_id:06d}.bin"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / f"seg-{self.segment_id:06d}.json"
+
+    @property
+    def documents(self) -> list[_Document]:
+        if self._documents is None:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            self._documents = [_Document(**fields) for fields in meta["documents"]]
+        return self._documents
+
+    @property
+    def lsh(self) -> MinHashLSH:
+        if self._lsh is None:
+            lsh = MinHashLSH(threshold=self._threshold, num_perm=self._num_perm)
+            with self.data_path.open("rb") as handle:
+                for position, document in enumerate(self.documents):
+                    handle.seek(document.signature_offset * _ITEM_BYTES)
+                    lsh.add(position, _from_disk(handle.read(self._num_perm * _ITEM_BYTES)))
+            self._lsh = lsh
+        return self._lsh
+
+    @classmethod
+    def write(
+        cls,
+        directory: Path,
+        segment_id: int,
+        entries: Iterable[tuple[str, int, array, array]],
+        threshold: float,
+        num_perm: int,
+    ) -> _Segment:
+        """Write `(key, seq, signature, shingles)` entries as a new segment."""
+
+        lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+        segment = cls(directory, segment_id, threshold, num_perm, [], lsh)
+        documents = segment.documents
+        offset = 0
+        with segment.data_path.open("wb") as handle:
+            for key, seq, signature, shingles in entries:
+                handle.write(_to_disk(signature))
+                handle.write(_to_disk(shingles))
+                document = _Document(key, seq, offset, offset + len(signature), len(shingles))
+                offset += len(signature) + len(shingles)
+                lsh.add(len(documents), signature)
+                documents.append(document)
+            handle.flush()
+            os.fsync(handle.fileno())
+        meta = {"documents": [document.__dict__ for document in documents]}
+        _atomic_write(segment.meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return segment
+
+    def signature(self, position: int) -> array:
+        return self.lsh[position]
+
+    def shingles(self, position: int) -> array:
+        document = self.documents[position]
+        with self.data_path.open("rb") as handle:
+            handle.seek(document.shingle_offset * _ITEM_BYTES)
+            return _from_disk(handle.read(document.shingle_count * _ITEM_BYTES))
+
+    def delete_files(self) -> None:
+        self.meta_path.unlink(missing_ok=True)
+        self.data_path.unlink(missing_ok=True)
+
+
+class SegmentIndex:
+    """Reference index that grows by small append-only segments.
+
+    `add` writes one new segment, `remove` records a tombstone, and `compact` merges
+    segments while dropping dead documents, so the work of every update is proportional
+    to the change rather than to the corpus. Each document carries a sequence number;
+    a tombstone hides every version of its key up to the recorded sequence, which keeps
+    deletions correct even while a background compaction rewrites older segments.
+    The manifest snapshots the live version of every key and the tombstones; each
+    `add` or `remove` only appends its own changes to a journal, which is folded back
+    into the manifest by `compact` or once it outgrows the live map. Opening the
+    index reads the manifest and replays the journal: segment signatures are loaded
+    on the first query. Segment, journal or temporary files left behind by a crashed
+    write are removed by the next `add` or `compact`.
+    The index assumes a single writing process; any number of readers may open it.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        window: int = DEFAULT_WINDOW,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+    ):
+        if max_segments <= 1:
+            raise ValueError("max_segments must be at least 2")
+        self.directory = Path(directory)
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._compacting = threading.Lock()
+        manifest_path = self.directory / MANIFEST_NAME
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            manifest = None
+            if manifest_path.exists():
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except OSError as exc:
+            raise PlagiarismError(f"无法打开索引目录: {exc}") from exc
+
+        self._journal_records = 0
+        if manifest is None:
+            self.window, self.threshold, self.num_perm = window, threshold, num_perm
+            self._next_segment = self._next_seq = 1
+            self._journal = 0
+            self._tombstones: dict[str, int] = {}
+            self._segments: list[_Segment] = []
+            self._live: dict[str, int] = {}
+            self._save_manifest()
+        else:
+            if manifest["tokenizer_version"] != TOKENIZER_VERSION:
+                raise PlagiarismError("索引由不同版本的分词器构建，请重建索引")
+            self.window = manifest["window"]
+            self.threshold = manifest["threshold"]
+            self.num_perm = manifest["num_perm"]
+            self._next_segment = manifest["next_segment"]
+            self._next_seq = manifest["next_seq"]
+            self._journal = manifest.get("journal", 0)
+            self._tombstones = dict(manifest["tombstones"])
+            self._segments = [
+                _Segment(self.directory, segment_id, self.threshold, self.num_perm)
+                for segment_id in manifest["segments"]
+            ]
+            live = manifest.get("live")
+            self._live = self._live_versions() if live is None else dict(live)
+            self._replay_journal()
+
+    def _live_versions(self) -> dict[str, int]:
+        """Rebuild the live map from segment directories (manifests written before it was stored)."""
+
+        live: dict[str, int] = {}
+        for segment in self._segments:
+            for document in segment.documents:
+                if document.seq > self._tombstones.get(document.key, 0):
+                    live[document.key] = max(live.get(document.key, 0), document.seq)
+        return live
+
+    @property
+    def _journal_path(self) -> Path:
+        return self.directory / f"journal-{self._journal:06d}.jsonl"
+
+    def _replay_journal(self) -> None:
+        try:
+            data = self._journal_path.read_bytes().decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            return
+        except OSError as exc:
+            raise PlagiarismError(f"无法读取索引日志: {exc}") from exc
+        for line in data.splitlines():
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # An append torn by a crash never completed, so it changed nothing.
+                continue
+            self._apply(record)
+            self._journal_records += 1
+
+    def _apply(self, record: dict) -> None:
+        """Apply one journal record; records hold absolute values, so replay is idempotent."""
+
+        segment_id = record.get("segment")
+        if segment_id is not None:
+            if all(segment.segment_id != segment_id for segment in self._segments):
+                self._segments.append(_Segment(self.directory, segment_id, self.threshold, self.num_perm))
+            self._next_segment = max(self._next_segment, segment_id + 1)
+        for key, seq in record.get("live", {}).items():
+            self._live[key] = seq
+            self._next_seq = max(self._next_seq, seq + 1)
+        for key, seq in record.get("tombstones", {}).items():
+            self._tombstones[key] = seq
+            if self._live.get(key) == seq:
+                del self._live[key]
+
+    def _log(self, record: dict) -> None:
+        """Append `record` to the journal, or fold everything into the manifest when it is long.
+
+        Each record starts on a fresh line, so one torn by a crash cannot swallow the next.
+        """
+
+        self._journal_records += 1
+        if self._journal_records > max(_JOURNAL_MIN_RECORDS, len(self._live)):
+            self._checkpoint()
+            return
+        line = b"\n" + json.dumps(record, ensure_ascii=False).encode("utf-8")
+        with self._journal_path.open("ab") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _checkpoint(self) -> None:
+        """Write the whole state to the manifest and start a new, empty journal."""
+
+        previous = self._journal_path
+        self._journal += 1
+        self._journal_records = 0
+        self._save_manifest()
+        previous.unlink(missing_ok=True)
+
+    def _save_manifest(self) -> None:
+        manifest = {
+            "tokenizer_version": TOKENIZER_VERSION,
+            "window": self.window,
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "next_segment": self._next_segment,
+            "next_seq": self._next_seq,
+            "journal": self._journal,
+            "segments": [segment.segment_id for segment in self._segments],
+            "tombstones": self._tombstones,
+            "live": self._live,
+        }
+        data = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+        _atomic_write(self.directory / MANIFEST_NAME, data)
+
+    def _remove_orphans(self) -> None:
+        """Delete segment, journal and temporary files the index does not list (crashed writes).
+
+        Callers hold `_lock` and make sure no compaction is writing a segment.
+        """
+
+        listed = {segment.segment_id for segment in self._segments}
+        for path in self.directory.iterdir():
+            stem, _, number = path.stem.partition("-")
+            if path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+            elif stem == "seg" and path.suffix in (".bin", ".json") and number.isdigit():
+                if int(number) not in listed:
+                    path.unlink(missing_ok=True)
+            elif stem == "journal" and path.suffix == ".jsonl" and number.isdigit():
+                if int(number) != self._journal:
+                    path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._live
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def _alive(self, document: _Document) -> bool:
+        return self._live.get(document.key) == document.seq
+
+    def add_many(self, items: Iterable[tuple[str, array]]) -> int:
+        """Add or replace documents given as `(key, hash_shingles array)`; one new segment."""
+
+        items = list(items)
+        if not items:
+            return 0
+        signer = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm)
+        with self._lock:
+            if not self._compacting.locked():
+                self._remove_orphans()
+            first_seq = self._next_seq
+            entries = [
+                (key, first_seq + offset, signer.signature(shingles), shingles)
+                for offset, (key, shingles) in enumerate(items)
+            ]
+            segment = _Segment.write(
+                self.directory, self._next_segment, entries, self.threshold, self.num_perm
+            )
+            self._next_segment += 1
+            self._next_seq += len(entries)
+            self._segments.append(segment)
+            record: dict = {"segment": segment.segment_id, "live": {}, "tombstones": {}}
+            for key, seq, _, _ in entries:
+                if key in self._live:
+                    self._tombstones[key] = record["tombstones"][key] = self._live[key]
+                self._live[key] = record["live"][key] = seq
+            self._log(record)
+        return len(entries)
+
+    def add(self, key: str, shingles: array) -> None:
+        self.add_many([(key, shingles)])
+
+    def add_files(self, paths: Sequence[Path], cache: ShingleCache | None = None) -> int:
+        """Shingle files (optionally through a cache) and add them keyed by path."""
+
+        return self.add_many(
+            (str(path), shingles_from_file(path, self.window, compact=True, cache=cache)) for path in paths
+        )
+
+    def remove(self, key: str) -> bool:
+        """Tombstone a document; returns False when the key is not indexed."""
+
+        with self._lock:
+            seq = self._live.pop(key, None)
+            if seq is None:
+                return False
+            self._tombstones[key] = seq
+            self._log({"tombstones": {key: seq}})
+        return True
+
+    def query(self, shingles: array) -> list[Match]:
+        """Return live documents at or above the threshold, exactly re-checked."""
+
+        with self._lock:
+            segments = list(self._segments)
+        signature = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm).signature(shingles)
+        floor = max(self.threshold - DEFAULT_ESTIMATE_MARGIN, 0.0)
+        matches: list[Match] = []
+        for segment in segments:
+            for position, estimate in segment.lsh.query(signature, floor):
+                document = segment.documents[position]
+                if not self._alive(document):
+                    continue
+                score = jaccard_similarity(shingles, segment.shingles(position))
+                if score >= self.threshold:
+                    matches.append(Match(key=document.key, estimate=estimate, score=score))
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches
+
+    def compact(self, force: bool = False) -> bool:
+        """Merge segments and drop dead documents; returns True when anything was merged.
+
+        Without `force`, only runs once there are more than `max_segments` segments and
+        then merges the smallest half, so repeated compactions stay cheap (tiered merge).
+        """
+
+        with self._compacting:
+            with self._lock:
+                self._remove_orphans()
+                if len(self._segments) <= (1 if force else self.max_segments):
+                    return False
+                ordered = sorted(self._segments, key=lambda segment: len(segment.documents))
+                victims = ordered if force else ordered[: max(2, len(ordered) // 2)]
+                segment_id = self._next_segment
+                self._next_segment += 1
+                self._checkpoint()
+
+            entries = [
+                (document.key, document.seq, segment.signature(position), segment.shingles(position))
+                for segment in victims
+                for position, document in enumerate(segment.documents)
+                if self._alive(document)
+            ]
+            merged = _Segment.write(self.directory, segment_id, entries, self.threshold, self.num_perm)
+
+            with self._lock:
+                victim_ids = {segment.segment_id for segment in victims}
+                self._segments = [s for s in self._segments if s.segment_id not in victim_ids]
+                self._segments.append(merged)
+                self._segments.sort(key=lambda segment: segment.segment_id)
+                present = {document.key for segment in self._segments for document in segment.documents}
+                self._tombstones = {key: seq for key, seq in self._tombstones.items() if key in present}
+                self._checkpoint()
+            for segment in victims:
+                segment.delete_files()
+        return True
+
+    def compact_in_background(self, force: bool = False) -> threading.Thread:
+        """Run `compact` on a daemon thread; queries and updates keep working meanwhile."""
+
+        thread = threading.Thread(target=self.compact, kwargs={"force": force}, daemon=True)
+        thread.start()
+        return thread
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="增量参考索引：追加段、墓碑删除与后台合并")
+    parser.add_argument("index", type=Path, help="索引目录")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="新建索引时的 shingle 窗口（默认 3）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="新建索引时的相似度阈值")
+    parser.add_argument("--cache-dir", type=Path, help="shingle 缓存目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="添加（或替换）文档，写入一个新段")
+    add.add_argument("documents", type=Path, nargs="+", help="文档目录或清单文件")
+    remove = subparsers.add_parser("remove", help="按键（文件路径）删除文档")
+    remove.add_argument("keys", nargs="+")
+    compact = subparsers.add_parser("compact", help="合并段并清理已删除文档")
+    compact.add_argument("--force", action="store_true", help="忽略段数阈值，合并全部段")
+    query = subparsers.add_parser("query", help="查询与给定文件相似的参考文档")
+    query.add_argument("suspect", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    from corpus_checker import collect_documents
+
+    args = parse_args(argv)
+    index = SegmentIndex(args.index, args.window, args.threshold)
+    cache = None if args.cache_dir is None else ShingleCache(args.cache_dir)
+    if args.command == "add":
+        paths = [path for source in args.documents for path in collect_documents(source)]
+        print(f"已添加 {index.add_files(paths, cache)} 篇文档，当前 {len(index)} 篇 / {index.segment_count} 段")
+    elif args.command == "remove":
+        removed = sum(index.remove(key) for key in args.keys)
+        print(f"已删除 {removed} 篇文档，当前 {len(index)} 篇")
+    elif args.command == "compact":
+        merged = index.compact(force=args.force)
+        print(f"{'已合并' if merged else '无需合并'}，当前 {index.segment_count} 段")
+    else:
+        shingles = shingles_from_file(args.suspect, index.window, compact=True, cache=cache)
+        for match in index.query(shingles):
+            print(f"{format_percentage(match.score)}\t{match.key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+﻿"""On-disk, content-addressed cache of compact shingle arrays and MinHash signatures."""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Callable
+
+from minhash_lsh import DEFAULT_NUM_PERM, DEFAULT_SEED, minhash_signature
+from plagiarism_checker import (
+    DEFAULT_WINDOW,
+    TOKENIZER_VERSION,
+    PlagiarismError,
+    hash_shingles,
+    hash_shingles_stream,
+    iter_file_tokens,
+    read_document,
+    tokenize,
+)
+
+DEFAULT_MAX_BYTES = 1 << 30
+_READ_BLOCK = 1 << 20
+_EVICT_TARGET = 0.9
+_SUFFIX = ".bin"
+
+
+def content_digest(path: Path) -> str:
+    """Return a hex digest of the file's bytes, read in blocks."""
+
+    digest = blake2b(digest_size=16)
+    try:
+        with path.open("rb") as handle:
+            for block in iter(lambda: handle.read(_READ_BLOCK), b""):
+                digest.update(block)
+    except OSError as exc:
+        raise PlagiarismError(f"无法读取文件: {exc}") from exc
+    return digest.hexdigest()
+
+
+class ShingleCache:
+    """Size-capped LRU cache keyed by (content hash, window, tokenizer version).
+
+    Entries are raw little-endian `array('Q')` buffers written to a temporary file and
+    renamed into place, so concurrent readers only ever see complete entries. A hit
+    refreshes the entry's mtime; when the directory grows past `max_bytes` the least
+    recently used entries are removed.
+
+    With `evict=False` writes never look at the directory size; a pool of such
+    caches leaves the cap to one owner that calls `trim()` once the batch is done.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES, evict: bool = True):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.evict = evict
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            raise PlagiarismError(f"无法创建缓存目录: {exc}") from exc
+
+    def shingles(self, path: Path, window: int = DEFAULT_WINDOW, streaming: bool = False) -> array:
+        """Return the `hash_shingles` array of a file, computing it only on a miss."""
+
+        def compute() -> array:
+            if streaming:
+                return hash_shingles_stream(iter_file_tokens(path), window)
+            return hash_shingles(tokenize(read_document(path)), window)
+
+        key = f"{content_digest(path)}-w{window}-t{TOKENIZER_VERSION}"
+        return self._fetch(key, compute)
+
+    def signature(
+        self,
+        path: Path,
+        window: int = DEFAULT_WINDOW,
+        num_perm: int = DEFAULT_NUM_PERM,
+        seed: int = DEFAULT_SEED,
+    ) -> array:
+        """Return the MinHash signature of a file, reusing cached shingles on a miss."""
+
+        key = f"{content_digest(path)}-w{window}-t{TOKENIZER_VERSION}-p{num_perm}s{seed}"
+        return self._fetch(key, lambda: minhash_signature(self.shingles(path, window), num_perm, seed))
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def trim(self) -> None:
+        """Rescan the directory once and evict down to the cap if other writers grew it."""
+
+        self._size = self._disk_usage()
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{_SUFFIX}"
+
+    def _fetch(self, key: str, compute: Callable[[], array]) -> array:
+        entry = self._entry(key)
+        try:
+            data = entry.read_bytes()
+        except OSError:
+            data = None
+        if data is not None and len(data) % 8 == 0:
+            self.hits += 1
+            try:
+                os.utime(entry)
+            except OSError:
+                pass
+            values = array("Q")
+            values.frombytes(data)
+            if sys.byteorder == "big":
+                values.byteswap()
+            return values
+
+        self.misses += 1
+        values = compute()
+        self._store(entry, values)
+        return values
+
+    def _store(self, entry: Path, values: array) -> None:
+        payload = array("Q", values)
+        if sys.byteorder == "big":
+            payload.byteswap()
+        data = payload.tobytes()
+        try:
+            entry.parent.mkdir(exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(data)
+                os.replace(tmp_name, entry)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        except OSError:
+            # A cache that cannot be written degrades to recomputation, never to failure.
+            return
+        if not self.evict:
+            return
+        if self._size is None:
+            self._size = self._disk_usage()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        found = []
+        for entry in self.directory.glob(f"*/*{_SUFFIX}"):
+            try:
+                info = entry.stat()
+            except OSError:
+                continue
+            found.append((info.st_mtime, info.st_size, entry))
+        return found
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda item: item[0])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * _EVICT_TARGET)
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._size = total
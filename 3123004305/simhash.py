@@ -0,0 +1,292 @@
+﻿"""64-bit SimHash fingerprints and a permuted-table Hamming index for bulk near-duplicate dedupe."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Hashable, Iterable, Iterator, Sequence
+
+from corpus_checker import collect_documents
+from plagiarism_checker import DEFAULT_WINDOW, PlagiarismError, positional_hashes, read_document, tokenize
+
+FINGERPRINT_BITS = 64
+DEFAULT_DISTANCE = 3
+_MASK = (1 << FINGERPRINT_BITS) - 1
+
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer: every output bit depends on every bit of the rolling hash."""
+
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def simhash(words: Sequence[str], window: int = DEFAULT_WINDOW) -> int:
+    """Return the 64-bit SimHash of `words`, each shingle weighted by its frequency.
+
+    Instead of 64 votes per shingle, weights are first summed into a 256-entry table
+    for each of the eight bytes; per-bit totals are then read off those tables.
+    """
+
+    weights = Counter(map(_mix, positional_hashes(words, window)))
+    if not weights:
+        return 0
+    tables = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    for value, weight in weights.items():
+        for table in tables:
+            table[value & 0xFF] += weight
+            value >>= 8
+    half = sum(weights.values())
+    fingerprint = 0
+    for byte, table in enumerate(tables):
+        for bit in range(8):
+            mask = 1 << bit
+            ones = sum(weight for value, weight in enumerate(table) if value & mask)
+            if 2 * ones > half:
+                fingerprint |= 1 << (byte * 8 + bit)
+    return fingerprint
+
+
+def simhash_text(text: str, window: int = DEFAULT_WINDOW) -> int:
+    return simhash(tokenize(text), window)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _block_bounds(blocks: int) -> list[tuple[int, int]]:
+    """Split the 64 bits into `blocks` contiguous `(start, width)` ranges."""
+
+    base, extra = divmod(FINGERPRINT_BITS, blocks)
+    bounds, start = [], 0
+    for number in range(blocks):
+        width = base + (number < extra)
+        bounds.append((start, width))
+        start += width
+    return bounds
+
+
+class _Table:
+    """Fingerprints permuted so one combination of blocks forms the top bits, kept sorted."""
+
+    def __init__(self, order: Sequence[tuple[int, int]], key_bits: int) -> None:
+        self._order = tuple(order)
+        self._shift = FINGERPRINT_BITS - key_bits
+        self.values = array("Q")
+        self.ids = array("I")
+
+    def permute(self, fingerprint: int) -> int:
+        result = 0
+        for start, width in self._order:
+            result = (result << width) | ((fingerprint >> start) & ((1 << width) - 1))
+        return result
+
+    def build(self, fingerprints: Sequence[int]) -> None:
+        permuted = sorted((self.permute(fp), doc) for doc, fp in enumerate(fingerprints))
+        self.values = array("Q", (value for value, _ in permuted))
+        self.ids = array("I", (doc for _, doc in permuted))
+
+    def candidates(self, fingerprint: int) -> Iterator[int]:
+        """Yield ids whose keyed blocks equal those of `fingerprint`."""
+
+        key = self.permute(fingerprint) >> self._shift
+        position = bisect_left(self.values, key << self._shift)
+        values, ids = self.values, self.ids
+        while position < len(values) and values[position] >> self._shift == key:
+            yield ids[position]
+            position += 1
+
+    def buckets(self) -> Iterator[range]:
+        """Yield index ranges of entries sharing the same key."""
+
+        values, start = self.values, 0
+        for position in range(1, len(values) + 1):
+            if position == len(values) or values[position] >> self._shift != values[start] >> self._shift:
+                if position - start > 1:
+                    yield range(start, position)
+                start = position
+
+
+class HammingIndex:
+    """Finds every fingerprint within Hamming distance `distance` (Manku et al., 2007).
+
+    The 64 bits are split into `blocks` pieces. Two fingerprints within `distance`
+    bits agree exactly on at least `blocks - distance` pieces, so one table is kept
+    per such combination, sorted on those pieces; a query only examines the entries
+    whose key matches in some table. More blocks mean longer keys and fewer
+    candidates, at the cost of C(blocks, distance) tables.
+    """
+
+    def __init__(self, distance: int = DEFAULT_DISTANCE, blocks: int | None = None) -> None:
+        blocks = distance + 2 if blocks is None else blocks
+        if distance < 0:
+            raise ValueError("distance must be non-negative")
+        if not distance < blocks <= FINGERPRINT_BITS:
+            raise ValueError("blocks must exceed distance and be at most 64")
+        self.distance = distance
+        self._keys: list[Hashable] = []
+        self._fingerprints = array("Q")
+        bounds = _block_bounds(blocks)
+        self._tables = []
+        for chosen in combinations(range(blocks), blocks - distance):
+            rest = [number for number in range(blocks) if number not in chosen]
+            order = [bounds[number] for number in (*chosen, *rest)]
+            self._tables.append(_Table(order, sum(bounds[number][1] for number in chosen)))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[tuple[Hashable, int]],
+        distance: int = DEFAULT_DISTANCE,
+        blocks: int | None = None,
+    ) -> HammingIndex:
+        """Bulk-build from `(key, fingerprint)` pairs; each table is sorted once."""
+
+        index = cls(distance, blocks)
+        for key, fingerprint in items:
+            index._keys.append(key)
+            index._fingerprints.append(fingerprint)
+        for table in index._tables:
+            table.build(index._fingerprints)
+        return index
+
+    def key(self, doc: int) -> Hashable:
+        return self._keys[doc]
+
+    def query(self, fingerprint: int) -> list[tuple[Hashable, int]]:
+        """Return `(key, distance)` for every indexed fingerprint within `self.distance`."""
+
+        seen: set[int] = set()
+        found = []
+        for table in self._tables:
+            for doc in table.candidates(fingerprint):
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                distance = hamming_distance(fingerprint, self._fingerprints[doc])
+                if distance <= self.distance:
+                    found.append((doc, distance))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return [(self._keys[doc], distance) for doc, distance in found]
+
+    def pairs(self) -> Iterator[tuple[int, int, int]]:
+        """Yield each near-duplicate `(doc_a, doc_b, distance)` once, with `doc_a < doc_b`.
+
+        This is the self-join used for bulk dedupe: only entries sharing a table bucket
+        are compared, and a pair found by several tables is reported by the first.
+        """
+
+        reported: set[tuple[int, int]] = set()
+        fingerprints = self._fingerprints
+        for table in self._tables:
+            ids = table.ids
+            for bucket in table.buckets():
+                for i, left in enumerate(bucket):
+                    for right in bucket[i + 1 :]:
+                        a, b = sorted((ids[left], ids[right]))
+                        distance = hamming_distance(fingerprints[a], fingerprints[b])
+                        if distance <= self.distance and (a, b) not in reported:
+                            reported.add((a, b))
+                            yield a, b, distance
+
+
+def _fingerprint_file(task: tuple[Path, int]) -> int:
+    path, window = task
+    return simhash(tokenize(read_document(path)), window)
+
+
+def cluster(
+    paths: Sequence[Path],
+    distance: int = DEFAULT_DISTANCE,
+    window: int = DEFAULT_WINDOW,
+    workers: int | None = None,
+) -> list[list[Path]]:
+    """Group documents whose fingerprints are connected by near-duplicate links.
+
+    Exact fingerprint duplicates are collapsed before indexing so that a large group
+    of identical pages does not turn a table bucket into a quadratic comparison.
+    Only clusters with at least two documents are returned, largest first.
+    """
+
+    tasks = [(path, window) for path in paths]
+    if workers == 1:
+        fingerprints = [_fingerprint_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+            fingerprints = list(executor.map(_fingerprint_file, tasks, chunksize=chunksize))
+
+    members: dict[int, list[Path]] = {}
+    for path, fingerprint in zip(paths, fingerprints):
+        members.setdefault(fingerprint, []).append(path)
+    unique = list(members)
+    parent = list(range(len(unique)))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    index = HammingIndex.build(enumerate(unique), distance)
+    for a, b, _ in index.pairs():
+        parent[find(a)] = find(b)
+
+    groups: dict[int, list[Path]] = {}
+    for node, fingerprint in enumerate(unique):
+        groups.setdefault(find(node), []).extend(members[fingerprint])
+    clusters = [sorted(group) for group in groups.values() if len(group) > 1]
+    clusters.sort(key=lambda group: (-len(group), group[0]))
+    return clusters
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SimHash 指纹与汉明距离索引：批量去除近似重复文档")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    group = subparsers.add_parser("cluster", help="把目录中的近似重复文档聚成簇")
+    group.add_argument("documents", type=Path, help="文档目录，或每行一个路径的清单文件")
+    group.add_argument("--output", type=Path, help="输出 JSONL 文件（每行一个簇），缺省打印到标准输出")
+    group.add_argument("--distance", type=int, default=DEFAULT_DISTANCE, help="最大汉明距离（默认 3）")
+    group.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    group.add_argument("--workers", type=int, help="计算指纹的进程数（默认 CPU 核数，1 表示不用进程池）")
+    fingerprint = subparsers.add_parser("fingerprint", help="输出单个文件的 SimHash 指纹")
+    fingerprint.add_argument("document", type=Path)
+    fingerprint.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.command == "fingerprint":
+        print(f"{_fingerprint_file((args.document, args.window)):016x}")
+        return
+
+    paths = collect_documents(args.documents)
+    clusters = cluster(paths, args.distance, args.window, args.workers)
+    lines = [json.dumps([str(path) for path in group], ensure_ascii=False) for group in clusters]
+    if args.output is None:
+        for line in lines:
+            print(line)
+    else:
+        try:
+            args.output.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+        except OSError as exc:
+            raise PlagiarismError(f"无法写入输出文件: {exc}") from exc
+    duplicates = sum(len(group) - 1 for group in clusters)
+    print(f"{len(paths)} 篇文档，{len(clusters)} 个近似重复簇，可去除 {duplicates} 篇", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+﻿"""Long-running local similarity service with a hot in-memory reference index."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Hashable, Sequence
+
+from corpus_checker import collect_documents, load_corpus
+from minhash_lsh import DEFAULT_NUM_PERM, DEFAULT_THRESHOLD, Match, MinHashLSH, find_similar
+from plagiarism_checker import DEFAULT_WINDOW, Shingles, format_percentage, hash_shingles, tokenize
+from shingle_cache import ShingleCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_BATCH_DELAY_MS = 5.0
+MAX_BODY_BYTES = 64 << 20
+_LATENCY_SAMPLES = 10_000
+
+_INDEX: ReferenceIndex | None = None
+
+
+class ReferenceIndex:
+    """Reference corpus kept in memory: compact shingles plus an LSH index over them."""
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+    ):
+        self.window = window
+        self.lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+        self._shingles: dict[Hashable, Shingles] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def add(self, key: Hashable, shingles: Shingles) -> None:
+        self.lsh.add(key, self.lsh.signature(shingles))
+        self._shingles[key] = shingles
+
+    def check(self, text: str) -> list[Match]:
+        """Return reference documents at or above the threshold for a submission."""
+
+        suspect = hash_shingles(tokenize(text), self.window)
+        return find_similar(suspect, self.lsh, self._shingles.__getitem__)
+
+    @classmethod
+    def from_paths(
+        cls,
+        paths: Sequence[Path],
+        window: int = DEFAULT_WINDOW,
+        threshold: float = DEFAULT_THRESHOLD,
+        executor: Executor | None = None,
+        cache: ShingleCache | None = None,
+    ) -> ReferenceIndex:
+        index = cls(window, threshold)
+        for path, shingles in zip(paths, load_corpus(executor, paths, window, compact=True, cache=cache)):
+            index.add(str(path), shingles)
+        return index
+
+
+def _init_worker(index: ReferenceIndex) -> None:
+    global _INDEX
+    _INDEX = index
+
+
+def _check_batch(texts: Sequence[str]) -> list[list[dict[str, object]]]:
+    assert _INDEX is not None
+    return [
+        [
+            {
+                "document": match.key,
+                "estimate": match.estimate,
+                "score": match.score,
+                "percentage": format_percentage(match.score),
+            }
+            for match in _INDEX.check(text)
+        ]
+        for text in texts
+    ]
+
+
+class LatencyTracker:
+    """Keeps the most recent request latencies and reports percentiles."""
+
+    def __init__(self, samples: int = _LATENCY_SAMPLES):
+        self._latencies: deque[float] = deque(maxlen=samples)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self.count += 1
+
+    def percentile(self, fraction: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "requests": self.count,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+        }
+
+
+class SimilarityService:
+    """Batches concurrent submissions and checks them in a worker pool.
+
+    Requests queued within `batch_delay_ms` of each other (up to `batch_size`) go to a
+    worker as one task, so bursts amortise the pool round-trip; the event loop only
+    parses requests and writes responses. `workers=0` checks in a thread of this
+    process instead of a process pool.
+    """
+
+    def __init__(
+        self,
+        index: ReferenceIndex,
+        workers: int = 1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_delay_ms: float = DEFAULT_BATCH_DELAY_MS,
+    ):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.index = index
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000
+        self.latency = LatencyTracker()
+        self.batches = 0
+        if workers > 0:
+            # Workers start lazily on the first request; forking then would hand them copies
+            # of the open client sockets, so responses would never reach EOF. Spawn instead.
+            self._executor: Executor | None = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(index,),
+            )
+        else:
+            _init_worker(index)
+            self._executor = None
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] | None = None
+        self._batcher: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def check(self, text: str) -> list[dict[str, object]]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _batch_loop(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, _check_batch, [text for text, _ in batch])
+        except Exception as exc:  # noqa: BLE001
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self) -> dict[str, object]:
+        return {**self.latency.snapshot(), "batches": self.batches, "documents": len(self.index)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP/1.1 request: POST /check, GET /metrics or GET /health."""
+
+        started = time.perf_counter()
+        status, payload, timed = 200, {}, False
+        try:
+            method, target, body = await _read_request(reader)
+            if method == "POST" and target == "/check":
+                timed = True
+                try:
+                    text = json.loads(body.decode("utf-8"))["text"]
+                except (UnicodeDecodeError, ValueError, KeyError, TypeError):
+                    status, payload = 400, {"error": "body must be JSON with a 'text' field"}
+                else:
+                    if not isinstance(text, str):
+                        status, payload = 400, {"error": "'text' must be a string"}
+                    else:
+                        payload = {"matches": await self.check(text)}
+            elif method == "GET" and target == "/metrics":
+                payload = self.metrics()
+            elif method == "GET" and target == "/health":
+                payload = {"status": "ok"}
+            else:
+                status, payload = 404, {"error": f"no route for {method} {target}"}
+        except _HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except Exception as exc:  # noqa: BLE001
+            status, payload = 500, {"error": str(exc)}
+        await _write_response(writer, status, payload)
+        if timed and status == 200:
+            self.latency.record(time.perf_counter() - started)
+
+    def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Server Error"}
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    parts = request_line.split()
+    if len(parts) != 3:
+        raise _HTTPError(400, "malformed request line")
+    method, target, _ = parts
+    length = 0
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            try:
+                length = int(value.strip())
+            except ValueError as exc:
+                raise _HTTPError(400, "invalid Content-Length") from exc
+    if length > MAX_BODY_BYTES:
+        raise _HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, body
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict[str, object]) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    try:
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(
+    service: SimilarityService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix: Path | None = None
+) -> asyncio.AbstractServer:
+    """Start listening on localhost TCP or, when `unix` is given, a Unix socket."""
+
+    if unix is not None:
+        return await asyncio.start_unix_server(service.handle, path=str(unix))
+    return await asyncio.start_server(service.handle, host, port)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="常驻查重服务：参考语料索引常驻内存，批量处理并发提交")
+    parser.add_argument("corpus", type=Path, help="参考语料目录，或每行一个路径的清单文件")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址（默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口（默认 8765）")
+    parser.add_argument("--unix", type=Path, help="改为监听 Unix socket 路径")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="shingle 窗口大小（默认 3）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="返回结果的最低相似度")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数（0 表示线程内计算）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="单批最多合并的请求数")
+    parser.add_argument(
+        "--batch-delay-ms",
+        type=float,
+        default=DEFAULT_BATCH_DELAY_MS,
+        help="等待凑批的最长毫秒数",
+    )
+    parser.add_argument("--cache-dir", type=Path, help="shingle 缓存目录，加速启动时的语料加载")
+    return parser.parse_args(argv)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    paths = collect_documents(args.corpus)
+    cache = None if args.cache_dir is None else ShingleCache(args.cache_dir)
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as executor:
+            index = ReferenceIndex.from_paths(paths, args.window, args.threshold, executor, cache)
+    else:
+        index = ReferenceIndex.from_paths(paths, args.window, args.threshold, cache=cache)
+    service = SimilarityService(index, args.workers, args.batch_size, args.batch_delay_ms)
+    server = await serve(service, args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"已加载 {len(index)} 篇参考文档，服务地址 {where}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    try:
+        asyncio.run(_run(parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+﻿"""Opt-in per-stage timers, counters and memory peaks for the checking pipeline."""
+from __future__ import annotations
+
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+class StageStats:
+    """Collects wall time, call count and tracemalloc peak for each named stage.
+
+    Pipeline functions take an optional `stats` argument and only wrap their stages
+    when one is given, so a run without stats pays a single `None` check per stage.
+    Memory tracing slows Python allocation noticeably; pass `trace_memory=False`
+    to keep only timers and counters.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.stages: dict[str, dict[str, float]] = {}
+        self.counts: dict[str, int] = {}
+        self._owns_tracing = trace_memory and not tracemalloc.is_tracing()
+        self._trace = trace_memory
+        self._open_peaks: list[list[int]] = []
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block; its memory peak is measured relative to its start.
+
+        Stages may nest. tracemalloc keeps a single peak, so before a stage resets it
+        the peak reached so far is folded into every enclosing stage that is still open.
+        """
+
+        if self._trace:
+            peak_so_far = tracemalloc.get_traced_memory()[1]
+            for frame in self._open_peaks:
+                frame[1] = max(frame[1], peak_so_far)
+            tracemalloc.reset_peak()
+            frame = [tracemalloc.get_traced_memory()[0], 0]
+            self._open_peaks.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "peak_bytes": 0})
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+            if self._trace:
+                self._open_peaks.pop()
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1]) - frame[0]
+                entry["peak_bytes"] = max(entry["peak_bytes"], peak)
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def close(self) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "total_seconds": sum(entry["seconds"] for entry in self.stages.values()),
+            "stages": self.stages,
+            "counts": self.counts,
+        }
+
+    def format(self) -> str:
+        lines = ["stage\tcalls\tms\tpeak MiB"]
+        for name, entry in self.stages.items():
+            milliseconds = entry["seconds"] * 1000
+            mebibytes = f"{entry['peak_bytes'] / 2**20:.2f}" if self._trace else "-"
+            lines.append(f"{name}\t{entry['calls']}\t{milliseconds:.2f}\t{mebibytes}")
+        lines.extend(f"{name}\t{value}" for name, value in self.counts.items())
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiled(path: Path | None) -> Iterator[None]:
+    """Run the enclosed block under cProfile and dump the stats to `path` (no-op for None)."""
+
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
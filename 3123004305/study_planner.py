@@ -4,13 +4,29 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+import time
+from array import array
+from bisect import bisect_right
 from collections import Counter
-from dataclasses import dataclass
-from functools import lru_cache
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import accumulate
+from math import gcd
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Callable, Iterable, Iterator, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python solver is always available.
+    np = None
 
 FOCUS_MULTIPLIER = {"low": 0.8, "medium": 1.0, "high": 1.25}
+BACKENDS = ("auto", "python", "numpy")
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+_LAYER_SIZE = 32
+_DP_CELLS_PER_MS = 5_000
+_DEADLINE_CHECK_NODES = 1024
+_SCORE_TOLERANCE = 1e-9
 
 
 @dataclass(frozen=True)
@@ -35,56 +51,745 @@ class Task:
         return self.value * FOCUS_MULTIPLIER[self.focus]
 
 
+Decisions = Callable[[int, int], bool]
+
+
+def _knapsack_step(values: list[float], weight: int, score: float) -> int:
+    """Add one task to the value array in place; return its decision bit row.
+
+    Bit `m` of the row is set when taking the task is strictly better than skipping
+    it with `m` units left. The row is a Python int built from the flag bytes in C.
+    """
+
+    capacity = len(values) - 1
+    if weight > capacity:
+        return 0
+    skipped = values[weight:]
+    taken = [value + score for value in values[: capacity + 1 - weight]]
+    flags = [t > s for t, s in zip(taken, skipped)]
+    values[weight:] = [t if flag else s for t, s, flag in zip(taken, skipped, flags)]
+    return int(bytes(flags).translate(_BIT_CHARS)[::-1], 2) << weight
+
+
+def _knapsack_table(
+    minutes: Sequence[int], scores: Sequence[float], capacity: int
+) -> tuple[list[float], Decisions]:
+    """Solve the 0/1 knapsack bottom-up, from the last task to the first.
+
+    Returns `values[m]`, the best score within `m` units over all tasks, and a
+    lookup telling whether task `i` is taken with `m` units left. Decisions take
+    about `len(tasks) * capacity / 8` bytes.
+    """
+
+    values = [0.0] * (capacity + 1)
+    rows = [0] * len(minutes)
+    for index in range(len(minutes) - 1, -1, -1):
+        rows[index] = _knapsack_step(values, minutes[index], scores[index])
+    return values, lambda index, remaining: rows[index] >> remaining & 1
+
+
+def _knapsack_table_numpy(
+    minutes: Sequence[int], scores: Sequence[float], capacity: int
+) -> tuple[list[float], Decisions]:
+    """NumPy version of `_knapsack_table`: one vectorized step per task.
+
+    Each step compares the value array with itself shifted by the task's minutes and
+    keeps the element-wise maximum; the strict-improvement mask is packed into row
+    `i` of an `n x ceil((capacity + 1) / 8)` uint8 bit matrix. Float results are
+    bit-for-bit those of the pure-Python solver, so plans are identical.
+    """
+
+    values = np.zeros(capacity + 1)
+    bits = np.zeros((len(minutes), (capacity + 8) // 8), dtype=np.uint8)
+    row = np.zeros(capacity + 1, dtype=bool)
+    for index in range(len(minutes) - 1, -1, -1):
+        weight = minutes[index]
+        if weight > capacity:
+            continue
+        taken = values[: capacity + 1 - weight] + scores[index]
+        flags = taken > values[weight:]
+        np.maximum(values[weight:], taken, out=values[weight:])
+        row[:weight] = False
+        row[weight:] = flags
+        bits[index] = np.packbits(row, bitorder="little")
+    return values.tolist(), lambda index, remaining: bits[index, remaining >> 3] >> (remaining & 7) & 1
+
+
+Solver = Callable[[Sequence[int], Sequence[float], int], tuple[list[float], Decisions]]
+
+
+def _solver(backend: str) -> Solver:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend {backend} is not supported")
+    if backend == "numpy" and np is None:
+        raise ValueError("The numpy backend requires NumPy to be installed")
+    if backend == "python" or np is None:
+        return _knapsack_table
+    return _knapsack_table_numpy
+
+
+def _reconstruct(minutes: Sequence[int], taken: Decisions, remaining: int) -> list[int]:
+    plan = []
+    for index, weight in enumerate(minutes):
+        if taken(index, remaining):
+            plan.append(index)
+            remaining -= weight
+    return plan
+
+
+def _greedy(
+    minutes: Sequence[int], scores: Sequence[float], capacity: int
+) -> tuple[list[int], float, float]:
+    """Return the density-greedy plan, its score and the fractional (LP) upper bound.
+
+    Tasks are taken by decreasing score per minute while they fit; the bound adds
+    the fitting fraction of the first task that does not. If the best single task
+    scores more than the greedy plan, it is returned instead, so `score >= OPT / 2`.
+    """
+
+    items = [i for i, weight in enumerate(minutes) if weight <= capacity and scores[i] > 0]
+    plan: list[int] = []
+    score = upper = 0.0
+    room = capacity
+    split = False
+    for item in sorted(items, key=lambda i: -scores[i] / minutes[i]):
+        if minutes[item] <= room:
+            room -= minutes[item]
+            plan.append(item)
+            score += scores[item]
+            if not split:
+                upper += scores[item]
+        elif not split:
+            upper += scores[item] * room / minutes[item]
+            split = True
+    best = max(items, key=scores.__getitem__, default=None)
+    if best is not None and scores[best] > score:
+        plan, score = [best], scores[best]
+    return sorted(plan), score, max(upper, score)
+
+
+def _branch_and_bound(
+    minutes: Sequence[int],
+    scores: Sequence[float],
+    capacity: int,
+    incumbent: list[int],
+    best: float,
+    deadline: float,
+) -> tuple[list[int], float, float]:
+    """Improve `incumbent` by depth-first search until done or `deadline` passes.
+
+    Tasks are branched in density order, "take" first, so the first dives follow the
+    greedy plan. Nodes are pruned by the LP bound, found by bisecting prefix sums.
+    Returns the best plan, its score and an upper bound on the optimum: the score
+    itself when the search finished, else the largest bound of the unexplored nodes.
+    """
+
+    order = sorted(
+        (i for i, weight in enumerate(minutes) if weight <= capacity and scores[i] > 0),
+        key=lambda i: -scores[i] / minutes[i],
+    )
+    weights = [minutes[i] for i in order]
+    values = [scores[i] for i in order]
+    prefix_weights = list(accumulate(weights, initial=0))
+    prefix_values = list(accumulate(values, initial=0.0))
+    count = len(order)
+
+    def bound(position: int, room: int, value: float) -> float:
+        stop = bisect_right(prefix_weights, prefix_weights[position] + room, position) - 1
+        value += prefix_values[stop] - prefix_values[position]
+        if stop < count:
+            value += values[stop] * (room - prefix_weights[stop] + prefix_weights[position]) / weights[stop]
+        return value
+
+    stack = [(0, capacity, 0.0, None, bound(0, capacity, 0.0))]
+    chosen = None
+    nodes = 0
+    while stack:
+        nodes += 1
+        if nodes % _DEADLINE_CHECK_NODES == 0 and time.perf_counter() > deadline:
+            break
+        position, room, value, chain, node_bound = stack.pop()
+        if node_bound <= best + _SCORE_TOLERANCE:
+            continue
+        if position == count:
+            best, chosen = value, chain
+            continue
+        stack.append((position + 1, room, value, chain, bound(position + 1, room, value)))
+        if weights[position] <= room:
+            taken = value + values[position]
+            stack.append((position + 1, room - weights[position], taken, (position, chain), node_bound))
+    upper = max((entry[4] for entry in stack), default=best)
+    if chosen is None:
+        return incumbent, best, max(upper, best)
+    plan = []
+    while chosen is not None:
+        position, chosen = chosen
+        plan.append(order[position])
+    return sorted(plan), best, max(upper, best)
+
+
+def _fptas(minutes: Sequence[int], scores: Sequence[float], capacity: int, epsilon: float) -> list[int]:
+    """Return indices of a plan scoring at least `(1 - epsilon)` of the optimum.
+
+    The greedy plan gives `LB >= OPT / 2` and the fractional relaxation `UB >= OPT`.
+    Scores are scaled by `K = epsilon * LB / n` and floored, losing less than `K`
+    per task and so at most `epsilon * OPT` in total; a DP over the scaled profit
+    keeps the fewest minutes reaching each profit up to `UB / K`, about `2n / epsilon`
+    cells per task whatever the minute budget.
+    """
+
+    return _fptas_many(minutes, scores, [capacity], epsilon)[capacity]
+
+
+def _fptas_many(
+    minutes: Sequence[int], scores: Sequence[float], capacities: Iterable[int], epsilon: float
+) -> dict[int, list[int]]:
+    """Run `_fptas` for several capacities, sharing one profit table per group of them.
+
+    A table scaled for the smallest greedy bound `LB` of a group keeps the guarantee
+    for every capacity in it, and since `UB <= 2 * LB`, grouping capacities while
+    their bounds stay within a factor of two caps the table at about `4n / epsilon`
+    cells per task, twice a single run, however many capacities it answers.
+    """
+
+    plans: dict[int, list[int]] = {}
+    group: list[tuple[int, float, float]] = []
+    for capacity in sorted(set(capacities)):
+        _, lower, upper = _greedy(minutes, scores, capacity)
+        if lower <= 0:
+            plans[capacity] = []
+            continue
+        lowers = [bound for _, bound, _ in group] + [lower]
+        if group and max(lowers) > 2 * min(lowers):
+            plans.update(_fptas_group(minutes, scores, group, epsilon))
+            group = []
+        group.append((capacity, lower, upper))
+    if group:
+        plans.update(_fptas_group(minutes, scores, group, epsilon))
+    return plans
+
+
+def _fptas_group(
+    minutes: Sequence[int], scores: Sequence[float], group: Sequence[tuple[int, float, float]], epsilon: float
+) -> dict[int, list[int]]:
+    """Solve one profit table for `(capacity, LB, UB)` entries and read off each plan."""
+
+    largest = max(capacity for capacity, _, _ in group)
+    items = [i for i, weight in enumerate(minutes) if weight <= largest and scores[i] > 0]
+    scale = epsilon * min(lower for _, lower, _ in group) / len(items)
+    total = int(max(upper for _, _, upper in group) / scale) + 1
+    spent = [0] + [largest + 1] * total
+    rows = []
+    profits = [min(int(scores[i] // scale), total) for i in items]
+    for item, profit in zip(items, profits):
+        weight = minutes[item]
+        skipped = spent[profit:]
+        taken = [value + weight for value in spent[: total + 1 - profit]]
+        flags = [t < s for t, s in zip(taken, skipped)]
+        spent[profit:] = [t if flag else s for t, s, flag in zip(taken, skipped, flags)]
+        rows.append(int(bytes(flags).translate(_BIT_CHARS)[::-1], 2) << profit)
+    plans = {}
+    for capacity, _, _ in group:
+        profit = max(q for q, value in enumerate(spent) if value <= capacity)
+        plan = []
+        for item, item_profit, row in zip(reversed(items), reversed(profits), reversed(rows)):
+            if row >> profit & 1:
+                plan.append(item)
+                profit -= item_profit
+        plans[capacity] = sorted(plan)
+    return plans
+
+
+@dataclass(frozen=True)
+class BudgetPlan:
+    """Optimal score for one minute budget; the task list is rebuilt on first access.
+
+    `plan` holds the tasks when the solver already produced them (FPTAS mode).
+    """
+
+    minutes: int
+    score: float
+    planner: StudyPlanner = field(repr=False, compare=False)
+    plan: tuple[Task, ...] | None = field(default=None, repr=False, compare=False)
+
+    @cached_property
+    def tasks(self) -> list[Task]:
+        if self.plan is not None:
+            return list(self.plan)
+        return self.planner.optimize(self.minutes)
+
+
+@dataclass(frozen=True)
+class PlanReport:
+    """A plan together with the solver mode and a proven upper bound on the optimum."""
+
+    mode: str
+    unit: int
+    tasks: list[Task]
+    score: float
+    upper_bound: float
+
+    @property
+    def gap(self) -> float:
+        return (self.upper_bound - self.score) / self.upper_bound if self.upper_bound > 0 else 0.0
+
+
 class StudyPlanner:
-    """Computes an optimal mix of tasks for the available minutes."""
+    """Computes an optimal mix of tasks for the available minutes.
+
+    Task minutes and the budget are divided by the GCD of all task durations (or
+    rounded up to an explicit `granularity`), so a catalog of 15-minute multiples
+    runs a DP 15 times smaller with the same answer. Rounding to a granularity that
+    does not divide every duration keeps plans feasible but may lose optimality;
+    `report` bounds the loss. With `epsilon`, the FPTAS replaces the DP.
+
+    The DP table of the largest budget solved so far is kept: any budget up to it is
+    answered by walking the stored decisions, O(number of tasks), without re-solving.
+    """
+
+    def __init__(
+        self,
+        tasks: Sequence[Task],
+        backend: str = "auto",
+        granularity: int | None = None,
+        epsilon: float | None = None,
+    ):
+        """`backend` is "python", "numpy", or "auto" (NumPy when it is installed)."""
 
-    def __init__(self, tasks: Sequence[Task]):
         if not tasks:
             raise ValueError("At least one task is required")
+        if granularity is not None and granularity <= 0:
+            raise ValueError("Granularity must be a positive number of minutes")
+        if epsilon is not None and not 0 < epsilon < 1:
+            raise ValueError("Epsilon must be between 0 and 1")
         self._tasks = tuple(tasks)
-
-    def optimize(self, available_minutes: int) -> list[Task]:
+        self._solve = _solver(backend)
+        self._epsilon = epsilon
+        self._scores = [task.score() for task in self._tasks]
+        durations = [task.minutes for task in self._tasks]
+        self._unit = granularity or gcd(*durations)
+        self._exact = all(minutes % self._unit == 0 for minutes in durations)
+        self._minutes = [-(-minutes // self._unit) for minutes in durations]
+        self._values: list[float] = [0.0]
+        self._taken: Decisions | None = None
+
+    @property
+    def mode(self) -> str:
+        if self._epsilon is not None:
+            return "fptas"
+        return "exact" if self._exact else "granularity"
+
+    def _table(self, capacity: int) -> tuple[list[float], Decisions]:
+        if self._taken is None or capacity >= len(self._values):
+            self._values, self._taken = self._solve(self._minutes, self._scores, capacity)
+        return self._values, self._taken
+
+    def _indices(self, available_minutes: int) -> list[int]:
         if available_minutes <= 0:
             raise ValueError("Minutes must be greater than zero")
+        capacity = available_minutes // self._unit
+        if self._epsilon is not None:
+            return _fptas(self._minutes, self._scores, capacity, self._epsilon)
+        _, taken = self._table(capacity)
+        return _reconstruct(self._minutes, taken, capacity)
+
+    def optimize(self, available_minutes: int, deadline_ms: float | None = None) -> list[Task]:
+        """Return the best-scoring subset of tasks that fits, in catalog order.
+
+        Ties are broken as "skip unless taking is strictly better", evaluated from
+        the first task on, so equal-score alternatives resolve to the same plan as
+        the original recursive formulation. With `deadline_ms`, returns the tasks of
+        `report(available_minutes, deadline_ms)`.
+        """
+
+        if deadline_ms is not None:
+            return self.report(available_minutes, deadline_ms).tasks
+        return [self._tasks[i] for i in self._indices(available_minutes)]
+
+    def report(self, available_minutes: int, deadline_ms: float | None = None) -> PlanReport:
+        """Plan for `available_minutes` and bound how far it can be from the optimum.
+
+        Exact mode is optimal. The FPTAS guarantees `score >= (1 - epsilon) * OPT`.
+        For a granularity that does not divide every duration, the bound is the DP
+        optimum with durations rounded down instead, a relaxation of the real problem.
+        A `deadline_ms` switches to anytime planning, see `_anytime`.
+        """
+
+        if deadline_ms is not None:
+            return self._anytime(available_minutes, deadline_ms)
+        indices = self._indices(available_minutes)
+        score = sum(self._scores[i] for i in indices)
+        if self.mode == "fptas":
+            upper_bound = score / (1 - self._epsilon)
+        elif self.mode == "granularity":
+            relaxed = [task.minutes // self._unit for task in self._tasks]
+            values, _ = self._solve(relaxed, self._scores, available_minutes // self._unit)
+            upper_bound = max(score, values[-1])
+        else:
+            upper_bound = score
+        return PlanReport(self.mode, self._unit, [self._tasks[i] for i in indices], score, upper_bound)
+
+    def _anytime(self, available_minutes: int, deadline_ms: float) -> PlanReport:
+        """Best plan found within `deadline_ms`, starting from the greedy plan.
+
+        When the DP table is cached or its estimated cost fits the remaining time, the
+        exact DP runs and the usual plan is returned. Otherwise a branch-and-bound
+        search improves the greedy plan until it finishes or the deadline passes; the
+        report then has mode "anytime" and the bound of the unexplored search space.
+        The DP itself is not interruptible, so the estimate is deliberately cautious.
+        """
+
+        started = time.perf_counter()
+        if self._epsilon is not None:
+            raise ValueError("A deadline cannot be combined with epsilon")
+        if available_minutes <= 0:
+            raise ValueError("Minutes must be greater than zero")
+        if deadline_ms <= 0:
+            raise ValueError("Deadline must be positive milliseconds")
+        capacity = available_minutes // self._unit
+        durations = [task.minutes for task in self._tasks]
+        _, _, upper_bound = _greedy(durations, self._scores, available_minutes)
+        cached = self._taken is not None and capacity < len(self._values)
+        cells = len(self._tasks) * (capacity + 1) * (1 if self._exact else 2)
+        remaining_ms = deadline_ms - (time.perf_counter() - started) * 1000
+        if cached or cells <= remaining_ms * _DP_CELLS_PER_MS:
+            return self.report(available_minutes)
+        indices, score, search_bound = _branch_and_bound(
+            self._minutes,
+            self._scores,
+            capacity,
+            *_greedy(self._minutes, self._scores, capacity)[:2],
+            started + deadline_ms / 1000,
+        )
+        if self._exact:
+            upper_bound = min(upper_bound, search_bound)
+        finished = search_bound <= score + _SCORE_TOLERANCE
+        mode = self.mode if finished else "anytime"
+        if finished and self._exact:
+            upper_bound = score
+        tasks = [self._tasks[i] for i in indices]
+        return PlanReport(mode, self._unit, tasks, score, max(score, upper_bound))
+
+    def optimize_many(self, budgets: Iterable[int]) -> dict[int, BudgetPlan]:
+        """Solve once up to the largest budget and return the optimum for each budget.
+
+        Decisions for `m` minutes only depend on smaller budgets, so the table solved
+        for the maximum also answers every smaller budget exactly. In FPTAS mode the
+        budgets share profit tables (see `_fptas_many`) and plans come with the result.
+        """
+
+        budgets = sorted(set(budgets))
+        if not budgets:
+            return {}
+        if budgets[0] <= 0:
+            raise ValueError("Minutes must be greater than zero")
+        if self._epsilon is not None:
+            capacities = [minutes // self._unit for minutes in budgets]
+            plans = _fptas_many(self._minutes, self._scores, capacities, self._epsilon)
+            results = {}
+            for minutes, capacity in zip(budgets, capacities):
+                tasks = tuple(self._tasks[i] for i in plans[capacity])
+                results[minutes] = BudgetPlan(minutes, sum(task.score() for task in tasks), self, tasks)
+            return results
+        values, _ = self._table(budgets[-1] // self._unit)
+        return {minutes: BudgetPlan(minutes, values[minutes // self._unit], self) for minutes in budgets}
+
+    def plan_curve(self, max_minutes: int) -> list[BudgetPlan]:
+        """Return the optimum for every budget from 1 to `max_minutes` minutes."""
+
+        return list(self.optimize_many(range(1, max_minutes + 1)).values())
+
+
+class _Layer:
+    """A run of consecutive tasks with the DP arrays cached at its two ends.
+
+    `prefix[m]` is the best score within `m` minutes over every task up to the end
+    of this layer, `suffix[m]` over every task from its start on. `prefix_rows` and
+    `suffix_rows` are the decision rows of its own tasks in either direction.
+    """
+
+    __slots__ = ("tasks", "prefix", "suffix", "prefix_rows", "suffix_rows")
+
+    def __init__(self, tasks: list[Task]) -> None:
+        self.tasks = tasks
+        self.prefix = array("d")
+        self.suffix = array("d")
+        self.prefix_rows: list[int] = []
+        self.suffix_rows: list[int] = []
+
+
+class IncrementalPlanner:
+    """A mutable task catalog whose optimum for a fixed budget is kept up to date.
+
+    Tasks are grouped into layers of about `layer_size`. Each layer caches the DP
+    array over all tasks before it (prefix) and from it on (suffix). Editing a task
+    only invalidates prefixes after its layer and suffixes before it; the optimum is
+    then recovered by recomputing the layers between the valid prefix and suffix
+    and combining the two arrays in O(minutes). After one edit that is a single
+    layer, so the cost follows the distance between successive edits rather than
+    the catalog size. The first call solves every layer in both directions, twice
+    the work of one full solve, so that the first edit is cheap wherever it lands.
+
+    Both directions keep their decision rows, so `optimize` splits the budget where
+    prefix and suffix meet and walks the prefix rows backwards and the suffix rows
+    forwards, O(tasks) on top of `score`. The plan is optimal, but among plans of
+    equal score it need not be the one `StudyPlanner` picks.
+    """
+
+    def __init__(
+        self, tasks: Iterable[Task], available_minutes: int, layer_size: int = _LAYER_SIZE
+    ) -> None:
+        if available_minutes <= 0:
+            raise ValueError("Minutes must be greater than zero")
+        if layer_size <= 0:
+            raise ValueError("Layer size must be positive")
+        self.available_minutes = available_minutes
+        self._size = layer_size
+        tasks = list(tasks)
+        chunks = [tasks[start : start + layer_size] for start in range(0, len(tasks), layer_size)]
+        self._layers = [_Layer(chunk) for chunk in chunks] or [_Layer([])]
+        self._prefix_valid = 0
+        self._suffix_valid = 0
+        self._last_edit = 0
+
+    def __len__(self) -> int:
+        return sum(len(layer.tasks) for layer in self._layers)
+
+    @property
+    def tasks(self) -> list[Task]:
+        return [task for layer in self._layers for task in layer.tasks]
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for number, layer in enumerate(self._layers):
+                if index < len(layer.tasks):
+                    return number, index
+                index -= len(layer.tasks)
+        raise IndexError("Task index out of range")
+
+    def _touch(self, number: int) -> None:
+        self._prefix_valid = min(self._prefix_valid, number)
+        self._suffix_valid = min(self._suffix_valid, len(self._layers) - 1 - number)
+        self._last_edit = number
+
+    def add_task(self, task: Task, index: int | None = None) -> None:
+        """Insert `task` before position `index`, or append it when `index` is None."""
+
+        if index is None or index >= len(self):
+            number = len(self._layers) - 1
+            offset = len(self._layers[number].tasks)
+        else:
+            number, offset = self._locate(index)
+        layer = self._layers[number]
+        layer.tasks.insert(offset, task)
+        self._touch(number)
+        if len(layer.tasks) > 2 * self._size:
+            half = len(layer.tasks) // 2
+            self._layers.insert(number + 1, _Layer(layer.tasks[half:]))
+            del layer.tasks[half:]
+            self._touch(number)
+
+    def remove_task(self, index: int) -> Task:
+        """Remove and return the task at position `index`."""
+
+        number, offset = self._locate(index)
+        layer = self._layers[number]
+        task = layer.tasks.pop(offset)
+        self._touch(number)
+        if not layer.tasks and len(self._layers) > 1:
+            del self._layers[number]
+            self._last_edit = min(number, len(self._layers) - 1)
+        return task
+
+    def update_task(self, index: int, task: Task) -> Task:
+        """Replace the task at position `index` and return the previous one."""
+
+        number, offset = self._locate(index)
+        layer = self._layers[number]
+        previous, layer.tasks[offset] = layer.tasks[offset], task
+        self._touch(number)
+        return previous
+
+    def _extend_prefix(self, stop: int) -> None:
+        """Recompute prefixes until every layer before `stop` is valid."""
+
+        for number in range(self._prefix_valid, stop):
+            previous = self._layers[number - 1].prefix if number else [0.0] * (self.available_minutes + 1)
+            values = list(previous)
+            layer = self._layers[number]
+            layer.prefix_rows = [_knapsack_step(values, task.minutes, task.score()) for task in layer.tasks]
+            layer.prefix = array("d", values)
+        self._prefix_valid = max(self._prefix_valid, stop)
+
+    def _extend_suffix(self, start: int) -> None:
+        """Recompute suffixes until every layer from `start` on is valid."""
+
+        layers = self._layers
+        for number in range(len(layers) - 1 - self._suffix_valid, start - 1, -1):
+            following = number + 1 < len(layers)
+            values = list(layers[number + 1].suffix) if following else [0.0] * (self.available_minutes + 1)
+            tasks = reversed(layers[number].tasks)
+            rows = [_knapsack_step(values, task.minutes, task.score()) for task in tasks]
+            layers[number].suffix_rows = rows[::-1]
+            layers[number].suffix = array("d", values)
+        self._suffix_valid = max(self._suffix_valid, len(layers) - start)
+
+    def _split(self) -> tuple[int, int]:
+        """Refresh the layers invalidated by edits and split the budget between them.
+
+        Returns `(split, minutes)`: every layer before `split` has a valid prefix,
+        every layer from it on a valid suffix, and giving `minutes` to the prefix side
+        reaches the optimum.
+        """
+
+        layers = self._layers
+        if not self._prefix_valid and not self._suffix_valid:
+            self._extend_prefix(len(layers))
+            self._extend_suffix(0)
+        split = len(layers) - self._suffix_valid
+        if self._prefix_valid < split:
+            split = min(max(self._last_edit, self._prefix_valid), split)
+            self._extend_prefix(split)
+            self._extend_suffix(split)
+        if split == 0:
+            return 0, 0
+        prefix = layers[split - 1].prefix
+        if split == len(layers):
+            return split, self.available_minutes
+        totals = list(map(sum, zip(prefix, reversed(layers[split].suffix))))
+        return split, totals.index(max(totals))
 
-        @lru_cache(maxsize=None)
-        def best(start: int, remaining: int) -> tuple[float, tuple[int, ...]]:
-            if start == len(self._tasks) or remaining <= 0:
-                return 0.0, ()
-
-            skip_score, skip_plan = best(start + 1, remaining)
-            best_score = skip_score
-            best_plan = skip_plan
+    def score(self) -> float:
+        """Return the optimal score, recomputing only the layers invalidated by edits."""
+
+        split, minutes = self._split()
+        layers = self._layers
+        before = layers[split - 1].prefix[minutes] if split else 0.0
+        after = layers[split].suffix[self.available_minutes - minutes] if split < len(layers) else 0.0
+        return before + after
+
+    def optimize(self) -> list[Task]:
+        """Return an optimal plan in catalog order, at the cost of `score` plus O(tasks)."""
+
+        split, minutes = self._split()
+        head = []
+        remaining = minutes
+        for layer in reversed(self._layers[:split]):
+            for task, row in zip(reversed(layer.tasks), reversed(layer.prefix_rows)):
+                if row >> remaining & 1:
+                    head.append(task)
+                    remaining -= task.minutes
+        plan = head[::-1]
+        remaining = self.available_minutes - minutes
+        for layer in self._layers[split:]:
+            for task, row in zip(layer.tasks, layer.suffix_rows):
+                if row >> remaining & 1:
+                    plan.append(task)
+                    remaining -= task.minutes
+        return plan
+
+
+def _task_from_entry(entry: dict) -> Task:
+    return Task(
+        name=entry["name"],
+        category=entry["category"],
+        minutes=int(entry["minutes"]),
+        value=float(entry["value"]),
+        focus=entry.get("focus", "medium"),
+    )
 
-            task = self._tasks[start]
-            if task.minutes <= remaining:
-                taken_score, taken_plan = best(start + 1, remaining - task.minutes)
-                taken_score += task.score()
-                if taken_score > best_score:
-                    best_score = taken_score
-                    best_plan = (start,) + taken_plan
 
-            return best_score, best_plan
+def iter_tasks(path: Path) -> Iterator[Task]:
+    """Stream tasks from a JSON Lines file, one object per line; blank lines are skipped."""
 
-        _, indices = best(0, available_minutes)
-        return [self._tasks[i] for i in indices]
+    with path.open(encoding="utf-8-sig") as handle:
+        for line in handle:
+            if line.strip():
+                yield _task_from_entry(json.loads(line))
 
 
 def load_tasks(path: Path) -> list[Task]:
-    """Load task definitions from a JSON file."""
+    """Load task definitions from a JSON array file, or a `.jsonl` file line by line."""
 
+    if path.suffix == ".jsonl":
+        return list(iter_tasks(path))
     raw_text = path.read_text(encoding="utf-8-sig")
     data = json.loads(raw_text)
-    return [
-        Task(
-            name=entry["name"],
-            category=entry["category"],
-            minutes=int(entry["minutes"]),
-            value=float(entry["value"]),
-            focus=entry.get("focus", "medium"),
-        )
-        for entry in data
-    ]
+    return [_task_from_entry(entry) for entry in data]
+
+
+def stream_tasks(path: Path) -> Iterable[Task]:
+    """Return a lazy task iterator for `.jsonl` files, else the loaded JSON array.
+
+    Feeding this to `prune_tasks` keeps surplus copies and over-budget tasks of a JSON
+    Lines catalog from ever being held in memory together.
+    """
+
+    return iter_tasks(path) if path.suffix == ".jsonl" else load_tasks(path)
+
+
+@dataclass(frozen=True)
+class PruneReport:
+    """Tasks surviving `prune_tasks`, in catalog order, and why the others were dropped."""
+
+    tasks: list[Task]
+    duplicates: int
+    too_long: int
+    dominated: int
+
+    @property
+    def pruned(self) -> int:
+        return self.duplicates + self.too_long + self.dominated
+
+
+def prune_tasks(tasks: Iterable[Task], available_minutes: int) -> PruneReport:
+    """Drop tasks that cannot change the optimal score for `available_minutes`.
+
+    Tasks longer than the budget, and copies of an identical record beyond the
+    `available_minutes // minutes` a plan could ever take, are dropped while
+    streaming. The remaining copies stay separate items: a 0/1 plan may use several
+    of them. A task is dominated by every task no longer and scoring at least as
+    much. It is dropped once it cannot fit together with all of its kept
+    dominators: any plan using it then leaves one of them out, and swapping that one
+    in is still feasible and scores no less. Merely having a dominator is not enough,
+    since a 0/1 plan may take both. Dominator minutes are summed with a Fenwick tree
+    over score ranks while sweeping tasks by duration, O(n log n) overall.
+
+    The optimal score is unchanged; among equal-score plans, the one chosen may differ
+    from the plan for the full catalog.
+    """
+
+    copies: Counter[Task] = Counter()
+    items: list[Task] = []
+    duplicates = too_long = 0
+    for task in tasks:
+        if task.minutes > available_minutes:
+            too_long += 1
+        elif copies[task] >= available_minutes // task.minutes:
+            duplicates += 1
+        else:
+            copies[task] += 1
+            items.append(task)
+    scores = [task.score() for task in items]
+    ranks = {score: rank for rank, score in enumerate(sorted(set(scores), reverse=True), 1)}
+    tree = [0] * (len(ranks) + 1)
+    keep = [False] * len(items)
+    for index in sorted(range(len(items)), key=lambda i: (items[i].minutes, -scores[i], i)):
+        rank = ranks[scores[index]]
+        dominators, position = 0, rank
+        while position:
+            dominators += tree[position]
+            position &= position - 1
+        if items[index].minutes + dominators > available_minutes:
+            continue
+        keep[index] = True
+        while rank < len(tree):
+            tree[rank] += items[index].minutes
+            rank += rank & -rank
+    kept = [task for task, flag in zip(items, keep) if flag]
+    return PruneReport(kept, duplicates, too_long, len(items) - len(kept))
 
 
 def describe_plan(plan: list[Task], available_minutes: int) -> str:
@@ -135,7 +840,28 @@ def build_focus_blocks(plan: Iterable[Task], block_minutes: int = 25) -> list[st
     return blocks
 
 
-def parse_args() -> argparse.Namespace:
+def describe_mode(report: PlanReport, epsilon: float | None = None) -> str:
+    """Say which solver ran and how far from the optimum its plan can be."""
+
+    if report.mode == "exact":
+        return f"求解模式: 精确动态规划（以 {report.unit} 分钟为单位），结果即最优解"
+    if report.mode == "fptas":
+        return (
+            f"求解模式: FPTAS 近似（ε={epsilon}），保证不低于最优值的 {1 - epsilon:.0%}，"
+            f"最优值上界 {report.upper_bound:.2f}"
+        )
+    if report.mode == "anytime":
+        return (
+            f"求解模式: 限时求解（截止时间内找到的最好计划），"
+            f"最优值上界 {report.upper_bound:.2f}，误差不超过 {report.gap:.2%}"
+        )
+    return (
+        f"求解模式: 按 {report.unit} 分钟粒度取整（任务时长向上取整），"
+        f"最优值上界 {report.upper_bound:.2f}，误差不超过 {report.gap:.2%}"
+    )
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="为一天的自学/科研安排生成最优任务组合"
     )
@@ -143,7 +869,7 @@ def parse_args() -> argparse.Namespace:
         "--tasks",
         type=Path,
         default=Path(__file__).with_name("sample_tasks.json"),
-        help="任务定义 JSON 文件",
+        help="任务定义 JSON 文件，或每行一个任务的 JSON Lines（.jsonl）文件",
     )
     parser.add_argument(
         "--minutes",
@@ -151,18 +877,61 @@ def parse_args() -> argparse.Namespace:
         default=240,
         help="可用于深度工作的分钟数",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="动态规划实现：auto（已安装 NumPy 时用向量化版本）、python 或 numpy",
+    )
+    parser.add_argument(
+        "--granularity",
+        type=int,
+        help="按该分钟数对任务时长向上取整后求解（默认自动取所有时长的最大公约数，结果精确）",
+    )
+    parser.add_argument(
+        "--epsilon",
+        type=float,
+        help="使用 FPTAS 近似求解，保证得分不低于最优值的 (1-ε)，耗时与分钟数无关",
+    )
+    parser.add_argument(
+        "--deadline-ms",
+        type=float,
+        help="限时求解：在该毫秒数内返回找到的最好计划，并给出最优值上界",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="求解前去掉超出时长、预算内放不下的多余重复及被支配的任务（最优得分不变）",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
+def describe_pruning(report: PruneReport) -> str:
+    total = len(report.tasks) + report.pruned
+    return (
+        f"预处理: 共 {total} 项任务，多余重复 {report.duplicates} 项，超出时长 {report.too_long} 项，"
+        f"被支配 {report.dominated} 项，剩余 {len(report.tasks)} 项"
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
     if hasattr(sys.stdout, "reconfigure"):
         sys.stdout.reconfigure(encoding="utf-8")
 
-    args = parse_args()
-    tasks = load_tasks(args.tasks)
-    planner = StudyPlanner(tasks)
-    plan = planner.optimize(args.minutes)
-    print(describe_plan(plan, args.minutes))
+    args = parse_args(argv)
+    if args.prune:
+        pruning = prune_tasks(stream_tasks(args.tasks), args.minutes)
+        print(describe_pruning(pruning))
+        tasks = pruning.tasks
+        if not tasks:
+            print(describe_plan([], args.minutes))
+            return
+    else:
+        tasks = load_tasks(args.tasks)
+    planner = StudyPlanner(tasks, args.backend, args.granularity, args.epsilon)
+    report = planner.report(args.minutes, args.deadline_ms)
+    print(describe_mode(report, args.epsilon))
+    print(describe_plan(report.tasks, args.minutes))
 
 
 if __name__ == "__main__":
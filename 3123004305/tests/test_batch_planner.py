@@ -0,0 +1,81 @@
+﻿import json
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import batch_planner as bp
+from study_planner import StudyPlanner, load_tasks
+from test_study_planner import random_tasks
+
+
+class TestBatchPlanner(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        rng = random.Random(23)
+        for number in range(6):
+            entries = [task.__dict__ for task in random_tasks(rng, 12, step=5)]
+            (self.root / f"student{number}.json").write_text(json.dumps(entries), encoding="utf-8")
+        (self.root / "broken.json").write_text("[{", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_directory_batch_matches_single_runs(self) -> None:
+        jobs = bp.collect_jobs(self.root, (90, 240))
+        self.assertEqual(len(jobs), 7)
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                records = list(bp.plan_batch(jobs, workers=workers, chunksize=2))
+                errors = [record for record in records if "error" in record]
+                self.assertEqual([record["file"] for record in errors], [str(self.root / "broken.json")])
+                planned = [record for record in records if "error" not in record]
+                self.assertEqual(len(planned), 12)
+                for record in planned:
+                    plan = StudyPlanner(load_tasks(Path(record["file"]))).optimize(record["minutes"])
+                    self.assertEqual(record["tasks"], [task.name for task in plan])
+                    self.assertNotIn("description", record)
+
+    def test_manifest_budgets_and_description(self) -> None:
+        manifest = self.root / "manifest.txt"
+        manifest.write_text("# students\nstudent0.json 60,120\nmissing.json\n", encoding="utf-8")
+        jobs = bp.collect_jobs(manifest)
+        expected = [(self.root / "student0.json", (60, 120), None), (self.root / "missing.json", (240,), None)]
+        self.assertEqual(jobs, expected)
+        records = list(bp.plan_batch(jobs, describe=True))
+        self.assertEqual([record.get("minutes") for record in records], [60, 120, None])
+        self.assertIn("计划用时", records[0]["description"])
+        self.assertTrue(records[2]["error"].startswith("FileNotFoundError"))
+
+    def test_bad_manifest_lines_do_not_stop_the_batch(self) -> None:
+        (self.root / "with space.json").write_text((self.root / "student1.json").read_text(), encoding="utf-8")
+        manifest = self.root / "manifest.txt"
+        manifest.write_text(
+            'student0.json 60,abc\n"with space.json" 90\nwith space.json\t120\n"unterminated 60\nstudent2.json\n',
+            encoding="utf-8",
+        )
+        jobs = bp.collect_jobs(manifest)
+        self.assertEqual(len(jobs), 5)
+        records = list(bp.plan_batch(jobs))
+        self.assertEqual([record.get("minutes") for record in records], [None, 90, 120, None, 240])
+        self.assertIn("manifest.txt:1", records[0]["error"])
+        self.assertIn("manifest.txt:4", records[3]["error"])
+        self.assertEqual(records[1]["file"], str(self.root / "with space.json"))
+
+    def test_main_writes_jsonl(self) -> None:
+        output = self.root / "out" / "plans.jsonl"
+        output.parent.mkdir()
+        bp.main([str(self.root), "--output", str(output), "--workers", "1", "--minutes", "120"])
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(all("file" in json.loads(line) for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+﻿import io
+import json
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import corpus_checker as cc
+import plagiarism_checker as pc
+
+TEXTS = {
+    "a.txt": "a b c d e",
+    "b.txt": "a b c x y",
+    "c.txt": "p q r s t",
+}
+
+
+class TestCorpusChecker(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        for name, text in TEXTS.items():
+            (self.root / name).write_text(text, encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_collect_from_manifest(self) -> None:
+        manifest = self.root / "list.txt"
+        manifest.write_text("# comment\na.txt\n\nc.txt\n", encoding="utf-8")
+        self.assertEqual(cc.collect_documents(manifest), [self.root / "a.txt", self.root / "c.txt"])
+
+    def test_all_pairs_match_pairwise_scores(self) -> None:
+        paths = cc.collect_documents(self.root)
+        results = list(cc.compare_corpus(paths, window=2, workers=1, chunk_rows=1))
+        self.assertEqual(len(results), 3)
+        for item in results:
+            expected = pc.similarity_from_files(Path(item.original), Path(item.suspect), window=2)
+            self.assertAlmostEqual(item.score, expected)
+
+    def test_process_pool_matches_serial(self) -> None:
+        paths = cc.collect_documents(self.root)
+        serial = list(cc.compare_corpus(paths, paths[:1], window=2, workers=1))
+        pooled = list(cc.compare_corpus(paths, paths[:1], window=2, workers=2, chunk_rows=1))
+        self.assertEqual(serial, pooled)
+        self.assertEqual({item.original for item in pooled}, {str(paths[0])})
+
+    def test_compact_matches_set_scores(self) -> None:
+        paths = cc.collect_documents(self.root)
+        compact = list(cc.compare_corpus(paths, window=2, workers=2, compact=True))
+        self.assertEqual(compact, list(cc.compare_corpus(paths, window=2, workers=1)))
+
+    def test_cli_writes_jsonl_and_csv(self) -> None:
+        for suffix in (".jsonl", ".csv"):
+            out_file = self.root.parent / f"{self.root.name}-matrix{suffix}"
+            try:
+                with redirect_stdout(io.StringIO()):
+                    cc.main(["matrix", str(self.root), str(out_file), "--workers", "1", "--window", "2"])
+                lines = out_file.read_text(encoding="utf-8").splitlines()
+            finally:
+                out_file.unlink(missing_ok=True)
+            if suffix == ".csv":
+                self.assertEqual(lines[0], "original,suspect,score")
+                self.assertEqual(len(lines), 4)
+            else:
+                self.assertEqual(len(lines), 3)
+                self.assertEqual(set(json.loads(lines[0])), {"original", "suspect", "score"})
+
+
+if __name__ == "__main__":
+    unittest.main()
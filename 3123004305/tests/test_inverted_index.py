@@ -0,0 +1,71 @@
+﻿import io
+import random
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import plagiarism_checker as pc
+from inverted_index import InvertedIndex, _append_varint, _iter_postings, main
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def test_postings_round_trip(self) -> None:
+        ids = [0, 1, 5, 127, 128, 300, 70000, 70001]
+        buffer = bytearray()
+        previous = 0
+        for doc in ids:
+            _append_varint(buffer, doc - previous)
+            previous = doc
+        self.assertEqual(list(_iter_postings(buffer)), ids)
+
+    def test_top_k_matches_brute_force(self) -> None:
+        rng = random.Random(5)
+        vocabulary = [f"w{i}" for i in range(40)]
+        documents = [[rng.choice(vocabulary) for _ in range(rng.randrange(5, 200))] for _ in range(120)]
+        shingles = [pc.hash_shingles(words) for words in documents]
+        index = InvertedIndex()
+        for number, values in enumerate(shingles):
+            index.add(number, values)
+
+        for query_words in documents[:10] + [documents[3][:50] + vocabulary[:20]]:
+            query = pc.hash_shingles(query_words)
+            expected = sorted(
+                ((pc.jaccard_similarity(query, values), number) for number, values in enumerate(shingles)),
+                key=lambda item: (-item[0], item[1]),
+            )
+            for k in (1, 5, 15):
+                with self.subTest(k=k):
+                    result = index.top_k(query, k)
+                    wanted = [item for item in expected[:k] if item[0] > 0]
+                    self.assertEqual([(n.score, n.key) for n in result], wanted)
+
+    def test_from_paths_and_cli(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = Path(tmp) / "corpus"
+            corpus.mkdir()
+            (corpus / "a.txt").write_text("the quick brown fox jumps over the lazy dog", encoding="utf-8")
+            (corpus / "b.txt").write_text("an entirely different piece of writing", encoding="utf-8")
+            suspect = Path(tmp) / "suspect.txt"
+            suspect.write_text("a quick brown fox jumps over the lazy cat", encoding="utf-8")
+
+            index = InvertedIndex.from_paths(sorted(corpus.glob("*.txt")))
+            self.assertEqual(len(index), 2)
+            result = index.top_k(pc.shingles_from_file(suspect, compact=True), k=2)
+            self.assertEqual([Path(n.key).name for n in result], ["a.txt"])
+            self.assertGreater(result[0].overlap, 0)
+
+            with redirect_stdout(io.StringIO()) as buffer:
+                main([str(corpus), str(suspect), "-k", "1"])
+        line = buffer.getvalue().strip()
+        self.assertTrue(line.endswith("a.txt"))
+        self.assertIn(pc.format_percentage(result[0].score), line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+﻿import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import minhash_lsh as ml
+import plagiarism_checker as pc
+
+BASE = (
+    "the quick brown fox jumps over the lazy dog while the farmer watches from the porch and "
+    "the children play near the river bank until the sun sets behind the distant hills"
+)
+
+
+def _shingles(text: str) -> set:
+    return pc.build_shingles(pc.tokenize(text))
+
+
+class TestMinHashLSH(unittest.TestCase):
+    def test_signature_is_deterministic(self) -> None:
+        self.assertEqual(ml.signature_from_text(BASE), ml.signature_from_text(BASE))
+
+    def test_estimate_tracks_exact_jaccard(self) -> None:
+        edited = BASE.replace("lazy dog", "sleepy cat").replace("river bank", "old mill")
+        exact = pc.jaccard_similarity(_shingles(BASE), _shingles(edited))
+        estimate = ml.estimate_similarity(
+            ml.signature_from_text(BASE, num_perm=256), ml.signature_from_text(edited, num_perm=256)
+        )
+        self.assertAlmostEqual(estimate, exact, delta=0.15)
+
+    def test_index_finds_near_duplicate_only(self) -> None:
+        index = ml.MinHashLSH(threshold=0.5)
+        corpus = {
+            "copy": BASE.replace("lazy dog", "sleepy dog"),
+            "other": "basketball tactics require teamwork and constant communication on the court",
+        }
+        for key, text in corpus.items():
+            index.add(key, index.signature(_shingles(text)))
+
+        matches = ml.find_similar(_shingles(BASE), index, lambda key: _shingles(corpus[key]))
+        self.assertEqual([match.key for match in matches], ["copy"])
+        expected = pc.jaccard_similarity(_shingles(BASE), _shingles(corpus["copy"]))
+        self.assertAlmostEqual(matches[0].score, expected)
+
+    def test_remove_drops_candidate(self) -> None:
+        index = ml.MinHashLSH(threshold=0.5)
+        signature = index.signature(_shingles(BASE))
+        index.add("doc", signature)
+        self.assertIn("doc", index.candidates(signature))
+        index.remove("doc")
+        self.assertEqual(index.candidates(signature), set())
+        self.assertEqual(len(index), 0)
+
+    def test_rejects_mismatched_signature(self) -> None:
+        index = ml.MinHashLSH(num_perm=64)
+        with self.assertRaises(ValueError):
+            index.add("doc", ml.signature_from_text(BASE, num_perm=32))
+
+
+if __name__ == "__main__":
+    unittest.main()
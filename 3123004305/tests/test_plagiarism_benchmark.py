@@ -0,0 +1,73 @@
+﻿import copy
+import io
+import json
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import plagiarism_benchmark as pb
+import plagiarism_checker as pc
+
+
+class TestPlagiarismBenchmark(unittest.TestCase):
+    def test_generate_pair_is_reproducible_and_edited(self) -> None:
+        original, suspect = pb.generate_pair(2000, edit_rate=0.2, seed=7)
+        self.assertEqual((original, suspect), pb.generate_pair(2000, edit_rate=0.2, seed=7))
+        self.assertEqual(len(pc.tokenize(original)), 2000)
+        score = pc.compute_similarity(original, suspect)
+        self.assertGreater(score, 0.1)
+        self.assertLess(score, 0.9)
+        self.assertEqual(pb.generate_pair(100, edit_rate=0.0)[0], pb.generate_pair(100, edit_rate=0.0)[1])
+
+    def test_run_records_every_stage(self) -> None:
+        report = pb.run_benchmarks(sizes=[300], repeat=1)
+        stages = report["results"]["300"]
+        for stage in ("tokenize", "build_shingles", "jaccard_similarity", "similarity_from_files"):
+            self.assertGreater(stages[stage]["seconds"], 0)
+            self.assertGreater(stages[stage]["cold_seconds"], 0)
+            self.assertGreater(stages[stage]["peak_bytes"], 0)
+
+    def test_cold_timings_clear_the_token_cache(self) -> None:
+        sizes = []
+        pc.token_id("warm-up")
+        pb._time(lambda: sizes.append(pc.token_id.cache_info().currsize), 2, cold=True)
+        self.assertEqual(sizes, [0, 0])
+        pc.token_id("warm-up")
+        pb._time(lambda: sizes.append(pc.token_id.cache_info().currsize), 1, cold=False)
+        self.assertEqual(sizes[-1], 1)
+
+    def test_compare_flags_regressions(self) -> None:
+        baseline = {"results": {"10": {"tokenize": {"seconds": 1.0, "peak_bytes": 100}}}}
+        current = copy.deepcopy(baseline)
+        self.assertEqual(pb.compare(current, baseline), [])
+        current["results"]["10"]["tokenize"]["seconds"] = 2.0
+        regressions = pb.compare(current, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("tokenize.seconds", regressions[0])
+        baseline["results"]["10"]["tokenize"]["cold_seconds"] = 1.0
+        current["results"]["10"]["tokenize"].update(seconds=1.0, cold_seconds=3.0)
+        self.assertIn("tokenize.cold_seconds", pb.compare(current, baseline)[0])
+
+    def test_cli_compare_exits_on_regression(self) -> None:
+        baseline = {"results": {"10": {"tokenize": {"seconds": 1.0, "peak_bytes": 100}}}}
+        current = {"results": {"10": {"tokenize": {"seconds": 1.0, "peak_bytes": 500}}}}
+        with tempfile.TemporaryDirectory() as tmp:
+            base_path = Path(tmp) / "base.json"
+            current_path = Path(tmp) / "current.json"
+            base_path.write_text(json.dumps(baseline), encoding="utf-8")
+            current_path.write_text(json.dumps(current), encoding="utf-8")
+            with self.assertRaises(SystemExit):
+                pb.main(["compare", str(current_path), str(base_path)])
+            with redirect_stdout(io.StringIO()) as buffer:
+                pb.main(["compare", str(base_path), str(base_path)])
+        self.assertIn("未发现性能退化", buffer.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
 ﻿import io
+import json
 import sys
 import tempfile
+import tracemalloc
 import unittest
-from contextlib import redirect_stdout
+from array import array
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -77,6 +80,184 @@ class TestPlagiarismChecker(unittest.TestCase):
         self.assertEqual(output, "33.33%")
         self.assertEqual(file_output, "33.33%")
 
+    def test_hash_shingles_sorted_unique(self) -> None:
+        words = pc.tokenize("a b a b a b c")
+        hashes = pc.hash_shingles(words, window=2)
+        self.assertEqual(list(hashes), sorted(set(hashes)))
+        self.assertEqual(sorted(hashes), sorted(pc.shingle_hash(s) for s in pc.build_shingles(words, 2)))
+
+    def test_compact_matches_set_path(self) -> None:
+        cases = [
+            ("a b c d", "a b x y", 2),
+            ("only two", "only three words", 3),
+            ("", "", 3),
+            ("", "content here", 3),
+            ("the cat sat on the mat and the cat ran", "the cat sat on a mat and the dog ran", 3),
+        ]
+        for original, suspect, window in cases:
+            with self.subTest(original=original, suspect=suspect):
+                self.assertEqual(
+                    pc.compute_similarity(original, suspect, window, compact=True),
+                    pc.compute_similarity(original, suspect, window),
+                )
+
+    def test_mixed_array_and_set_inputs(self) -> None:
+        words_a = pc.tokenize("the cat sat on the mat and the cat ran")
+        words_b = pc.tokenize("the cat sat on a mat and the dog ran")
+        expected = pc.jaccard_similarity(pc.build_shingles(words_a, 3), pc.build_shingles(words_b, 3))
+        self.assertGreater(expected, 0.0)
+        compact_a, tuples_b = pc.hash_shingles(words_a, 3), pc.build_shingles(words_b, 3)
+        self.assertEqual(pc.jaccard_similarity(compact_a, tuples_b), expected)
+        self.assertEqual(pc.jaccard_similarity(tuples_b, compact_a), expected)
+        self.assertEqual(pc.jaccard_similarity(pc.hash_shingles([], 3), set()), 1.0)
+
+    def test_streaming_tokens_across_chunk_boundaries(self) -> None:
+        text = "Ünïcode wörds, don't split; 数据 结构 end"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "doc.txt"
+            path.write_text(text, encoding="utf-8-sig")
+            for chunk_size in (1, 2, 3, 7, 1024):
+                with self.subTest(chunk_size=chunk_size):
+                    tokens = list(pc.iter_file_tokens(path, chunk_size=chunk_size))
+                    self.assertEqual(tokens, pc.tokenize(text))
+
+    def test_streaming_similarity_matches_in_memory(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            suspect = Path(tmp) / "suspect.txt"
+            empty = Path(tmp) / "empty.txt"
+            orig.write_text("the cat sat on the mat and the cat ran away", encoding="utf-8")
+            suspect.write_text("the cat sat on a mat and the dog ran away", encoding="utf-8")
+            empty.write_text("", encoding="utf-8")
+            for a, b in ((orig, suspect), (orig, empty), (empty, empty)):
+                with self.subTest(a=a.name, b=b.name):
+                    self.assertEqual(
+                        pc.similarity_from_files(a, b, window=3, streaming=True),
+                        pc.similarity_from_files(a, b, window=3),
+                    )
+
+    def test_stream_hash_shingles_matches_batch(self) -> None:
+        words = [f"w{i % 50}" for i in range(1000)] + ["tail"]
+        for window in (1, 3, 2000):
+            with self.subTest(window=window):
+                self.assertEqual(pc.hash_shingles_stream(iter(words), window), pc.hash_shingles(words, window))
+
+    def test_bounded_memory_similarity_matches_in_memory(self) -> None:
+        words = [f"w{(i * 7919) % 30011}" for i in range(40000)]
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            suspect = Path(tmp) / "suspect.txt"
+            empty = Path(tmp) / "empty.txt"
+            orig.write_text(" ".join(words), encoding="utf-8")
+            suspect.write_text(" ".join(words[5000:] + words[:3000:2]), encoding="utf-8")
+            empty.write_text("", encoding="utf-8")
+            runs = list(pc.spill_shingles(words, 3, 1, Path(tmp)))
+            self.assertEqual(array("Q", runs), pc.hash_shingles(words))
+            self.assertEqual(len(list(Path(tmp).glob("*.run"))), 0)
+            cases = ((orig, suspect, 1), (orig, suspect, 1 << 30), (orig, empty, 1), (empty, empty, 1))
+            for a, b, budget in cases:
+                with self.subTest(a=a.name, b=b.name, budget=budget):
+                    self.assertEqual(
+                        pc.similarity_within_memory(a, b, window=3, max_memory=budget),
+                        pc.similarity_from_files(a, b, window=3, compact=True),
+                    )
+            output = Path(tmp) / "answer.txt"
+            with redirect_stdout(io.StringIO()):
+                pc.main([str(orig), str(suspect), str(output), "--max-memory", "64K"])
+            expected = pc.format_percentage(pc.similarity_from_files(orig, suspect))
+            self.assertEqual(output.read_text(encoding="utf-8"), expected)
+
+    def test_bounded_memory_counts_token_ids_against_the_budget(self) -> None:
+        words = [f"w{(i * 7919) % 20011}" for i in range(20000)]
+        budget = 1 << 20
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            orig.write_text(" ".join(words), encoding="utf-8")
+            pc.token_id.cache_clear()
+            tracemalloc.start()
+            try:
+                score = pc.similarity_within_memory(orig, orig, window=3, max_memory=budget)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(score, 1.0)
+        self.assertEqual(pc.token_id.cache_info().currsize, 0)
+        self.assertLess(peak, 3 * budget)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            pc.parse_args(["a", "b", "c", "--max-memory", "64K", "--report", "report.json"])
+
+    def test_winnow_keeps_a_fingerprint_per_window(self) -> None:
+        words = [f"w{(i * 7919) % 101}" for i in range(300)]
+        fingerprints = pc.winnow(words, window=3, winnow_size=4)
+        offsets = [offset for _, offset in fingerprints]
+        self.assertLess(len(fingerprints), len(words) // 2)
+        self.assertTrue(all(b - a <= 4 for a, b in zip(offsets, offsets[1:])))
+
+    def test_match_passages_localizes_copied_run(self) -> None:
+        source = [f"s{i}" for i in range(200)]
+        suspect = [f"x{i}" for i in range(50)] + source[100:160] + [f"y{i}" for i in range(50)]
+        passages = pc.match_passages(pc.winnow(source), pc.winnow(suspect))
+        self.assertEqual(len(passages), 1)
+        passage = passages[0]
+        self.assertEqual(passage.suspect_start - passage.source_start, 50 - 100)
+        self.assertLessEqual(abs(passage.source_start - 100), 4)
+        self.assertLessEqual(abs(passage.source_end - 160), 4)
+
+    def test_cli_report_lists_passages(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            suspect = Path(tmp) / "suspect.txt"
+            report = Path(tmp) / "report.json"
+            shared = " ".join(f"word{i}" for i in range(30))
+            orig.write_text(f"alpha beta gamma {shared} delta", encoding="utf-8")
+            suspect.write_text(f"{shared} omega", encoding="utf-8")
+            with redirect_stdout(io.StringIO()):
+                pc.main([str(orig), str(suspect), str(Path(tmp) / "ans.txt"), "--report", str(report)])
+            data = json.loads(report.read_text(encoding="utf-8"))
+
+        self.assertEqual(data["percentage"], pc.format_percentage(data["score"]))
+        self.assertEqual(len(data["passages"]), 1)
+        self.assertIn("word10 word11", data["passages"][0]["suspect_text"])
+
+    def test_multi_window_matches_single_runs(self) -> None:
+        a = "the cat sat on the mat and the cat ran off into the night"
+        b = "the cat sat on a mat and then the dog ran off into the night"
+        scores = pc.multi_window_similarity(a, b, [8, 2, 3, 5, 20])
+        self.assertEqual(list(scores), [2, 3, 5, 8, 20])
+        for window, score in scores.items():
+            with self.subTest(window=window):
+                self.assertEqual(score, pc.compute_similarity(a, b, window))
+
+    def test_cli_windows_table(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            suspect = Path(tmp) / "suspect.txt"
+            out_file = Path(tmp) / "result.txt"
+            orig.write_text("A B C", encoding="utf-8")
+            suspect.write_text("A B D", encoding="utf-8")
+            with redirect_stdout(io.StringIO()):
+                pc.main([str(orig), str(suspect), str(out_file), "--windows", "1,2"])
+            lines = out_file.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines, ["window\tsimilarity", "1\t50.00%", "2\t33.33%"])
+
+    def test_cli_rejects_flags_it_would_ignore(self) -> None:
+        paths = ["orig.txt", "suspect.txt", "out.txt"]
+        cases = [
+            ["--windows", "2,3", "--compact"],
+            ["--windows", "2,3", "--stream"],
+            ["--windows", "2,3", "--max-memory", "64K"],
+            ["--windows", "2,3", "--cache-dir", "cache"],
+            ["--windows", "2,3", "--report", "report.json"],
+            ["--max-memory", "64K", "--cache-dir", "cache"],
+            ["--max-memory", "64K", "--report", "report.json"],
+        ]
+        for flags in cases:
+            with self.subTest(flags=flags):
+                with redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+                    pc.parse_args(paths + flags)
+                self.assertIn("不能与", errors.getvalue())
+        self.assertEqual(pc.parse_args(paths + ["--windows", "2,3"]).windows, [2, 3])
+
     def test_format_percentage_bounds(self) -> None:
         self.assertEqual(pc.format_percentage(1.5), "100.00%")
         self.assertEqual(pc.format_percentage(-0.2), "0.00%")
@@ -0,0 +1,152 @@
+﻿import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import plagiarism_checker as pc
+from segment_index import SegmentIndex
+
+
+def _doc(seed: int, length: int = 60) -> list[str]:
+    return [f"t{seed}x{i}" for i in range(length)]
+
+
+def _shingles(words: list[str]):
+    return pc.hash_shingles(words)
+
+
+class TestSegmentIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "index"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_add_query_and_reopen(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        index.add("a", _shingles(_doc(1)))
+        index.add_many([("b", _shingles(_doc(2))), ("c", _shingles(_doc(3)))])
+        self.assertEqual(index.segment_count, 2)
+
+        suspect = _shingles(_doc(2)[:55] + ["edit"] * 5)
+        matches = index.query(suspect)
+        self.assertEqual([match.key for match in matches], ["b"])
+        self.assertEqual(matches[0].score, pc.jaccard_similarity(suspect, _shingles(_doc(2))))
+
+        reopened = SegmentIndex(self.root)
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual([match.key for match in reopened.query(suspect)], ["b"])
+
+    def test_remove_and_replace_use_tombstones(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        index.add("a", _shingles(_doc(1)))
+        self.assertTrue(index.remove("a"))
+        self.assertFalse(index.remove("a"))
+        self.assertEqual(index.query(_shingles(_doc(1))), [])
+
+        index.add("a", _shingles(_doc(4)))
+        self.assertEqual(index.query(_shingles(_doc(1))), [])
+        self.assertEqual([m.key for m in SegmentIndex(self.root).query(_shingles(_doc(4)))], ["a"])
+
+    def test_compaction_merges_segments_and_drops_dead_documents(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5, max_segments=2)
+        for seed in range(5):
+            index.add(f"d{seed}", _shingles(_doc(seed)))
+        index.remove("d0")
+        self.assertTrue(index.compact())
+        self.assertLess(index.segment_count, 5)
+
+        thread = index.compact_in_background(force=True)
+        thread.join()
+        self.assertEqual(index.segment_count, 1)
+        self.assertEqual(len(list(self.root.glob("seg-*.bin"))), 1)
+
+        reopened = SegmentIndex(self.root)
+        self.assertEqual(len(reopened), 4)
+        self.assertEqual(reopened.query(_shingles(_doc(0))), [])
+        self.assertEqual([m.key for m in reopened.query(_shingles(_doc(3)))], ["d3"])
+
+    def test_reopen_and_updates_do_not_load_segments(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        for seed in range(3):
+            index.add(f"d{seed}", _shingles(_doc(seed)))
+
+        reopened = SegmentIndex(self.root)
+        self.assertEqual(len(reopened), 3)
+        reopened.add("d9", _shingles(_doc(9)))
+        self.assertTrue(reopened.remove("d1"))
+        self.assertNotIn("d1", SegmentIndex(self.root))
+        self.assertTrue(all(s._documents is None and s._lsh is None for s in reopened._segments[:3]))
+
+        self.assertEqual([m.key for m in reopened.query(_shingles(_doc(2)))], ["d2"])
+        self.assertTrue(all(s._lsh is not None for s in reopened._segments))
+
+    def test_updates_append_to_journal_instead_of_rewriting_manifest(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        index.add_many([(f"d{seed}", _shingles(_doc(seed))) for seed in range(20)])
+        index.add_many([(f"d{seed}", _shingles(_doc(seed))) for seed in range(20, 40)])
+        self.assertTrue(index.compact(force=True))
+        manifest_path = self.root / "manifest.json"
+        manifest = manifest_path.read_bytes()
+        journal = next(self.root.glob("journal-*.jsonl"), None)
+        self.assertIsNone(journal)
+
+        index.add("d3", _shingles(_doc(99)))
+        index.remove("d5")
+        self.assertEqual(manifest_path.read_bytes(), manifest)
+        journal = next(self.root.glob("journal-*.jsonl"))
+        self.assertLess(journal.stat().st_size, 200)
+        with journal.open("ab") as handle:
+            handle.write(b'\n{"tombstones": {"d7"')
+
+        reopened = SegmentIndex(self.root)
+        self.assertEqual((len(reopened), "d5" in reopened, "d7" in reopened), (39, False, True))
+        self.assertEqual([m.key for m in reopened.query(_shingles(_doc(99)))], ["d3"])
+        self.assertEqual(reopened.query(_shingles(_doc(3))), [])
+        reopened.remove("d8")
+        self.assertNotIn("d8", SegmentIndex(self.root))
+
+    def test_long_journal_is_folded_into_manifest(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        for seed in range(70):
+            index.add("draft", _shingles(_doc(seed, 10)))
+        self.assertLessEqual(index._journal_records, 64)
+        self.assertEqual(len(list(self.root.glob("journal-*.jsonl"))), 1)
+        reopened = SegmentIndex(self.root)
+        self.assertEqual((len(reopened), reopened.segment_count), (1, 70))
+        self.assertEqual([m.key for m in reopened.query(_shingles(_doc(69, 10)))], ["draft"])
+        self.assertEqual(reopened.query(_shingles(_doc(3, 10))), [])
+
+    def test_manifest_without_live_map_is_rebuilt(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        index.add_many([("a", _shingles(_doc(1))), ("b", _shingles(_doc(2)))])
+        index.remove("a")
+        manifest_path = self.root / "manifest.json"
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        del manifest["live"]
+        manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+        reopened = SegmentIndex(self.root)
+        self.assertEqual((len(reopened), "a" in reopened, "b" in reopened), (1, False, True))
+
+    def test_orphaned_segment_files_are_removed(self) -> None:
+        index = SegmentIndex(self.root, threshold=0.5)
+        index.add("a", _shingles(_doc(1)))
+        orphans = [self.root / "seg-000099.bin", self.root / "seg-000099.json", self.root / "tmpcrash.tmp"]
+        for path in orphans:
+            path.write_bytes(b"partial")
+
+        reopened = SegmentIndex(self.root)
+        reopened.add("b", _shingles(_doc(2)))
+        self.assertFalse(any(path.exists() for path in orphans))
+        self.assertEqual(len(list(self.root.glob("seg-*.bin"))), 2)
+        self.assertEqual([m.key for m in reopened.query(_shingles(_doc(1)))], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+﻿import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import corpus_checker as cc
+import minhash_lsh as ml
+import plagiarism_checker as pc
+from shingle_cache import ShingleCache
+
+
+class TestShingleCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.doc = self.root / "doc.txt"
+        self.doc.write_text("the cat sat on the mat", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_hit_after_miss_returns_same_shingles(self) -> None:
+        cache = ShingleCache(self.root / "cache")
+        first = cache.shingles(self.doc, 2)
+        second = cache.shingles(self.doc, 2)
+        self.assertEqual(first, pc.hash_shingles(pc.tokenize("the cat sat on the mat"), 2))
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_key_depends_on_content_and_window(self) -> None:
+        cache = ShingleCache(self.root / "cache")
+        cache.shingles(self.doc, 2)
+        cache.shingles(self.doc, 3)
+        self.doc.write_text("a different text entirely", encoding="utf-8")
+        cache.shingles(self.doc, 2)
+        self.assertEqual(cache.misses, 3)
+        self.assertEqual(cache.hits, 0)
+
+    def test_signature_is_cached(self) -> None:
+        cache = ShingleCache(self.root / "cache")
+        signature = cache.signature(self.doc, 2, num_perm=16)
+        self.assertEqual(signature, ml.signature_from_text("the cat sat on the mat", 2, num_perm=16))
+        self.assertEqual(cache.signature(self.doc, 2, num_perm=16), signature)
+        self.assertEqual(cache.hits, 1)
+
+    def test_eviction_keeps_most_recent_entries(self) -> None:
+        cache = ShingleCache(self.root / "cache", max_bytes=60)
+        docs = []
+        for i in range(3):
+            doc = self.root / f"d{i}.txt"
+            doc.write_text(" ".join(f"w{i}x{j}" for j in range(6)), encoding="utf-8")
+            docs.append(doc)
+        cache.shingles(docs[0], 2)
+        entry = next((self.root / "cache").glob("*/*.bin"))
+        os.utime(entry, (0, 0))
+        cache.shingles(docs[1], 2)
+        self.assertFalse(entry.exists())
+        self.assertLessEqual(sum(p.stat().st_size for p in (self.root / "cache").glob("*/*.bin")), 60)
+
+    def test_pooled_load_sizes_the_cache_once(self) -> None:
+        docs = []
+        for i in range(20):
+            doc = self.root / f"d{i}.txt"
+            doc.write_text(" ".join(f"w{i}x{j}" for j in range(30)), encoding="utf-8")
+            docs.append(doc)
+        cache = ShingleCache(self.root / "cache", max_bytes=2000)
+        scans = []
+        original = ShingleCache._disk_usage
+
+        def counting(instance: ShingleCache) -> int:
+            scans.append(instance)
+            return original(instance)
+
+        with mock.patch.object(ShingleCache, "_disk_usage", counting), ThreadPoolExecutor(4) as executor:
+            loaded = cc.load_corpus(executor, docs, 2, cache=cache)
+        self.assertEqual(scans, [cache])
+        self.assertEqual(cache.misses, 20)
+        self.assertEqual(loaded[3], pc.hash_shingles(pc.tokenize(docs[3].read_text(encoding="utf-8")), 2))
+        self.assertLessEqual(sum(p.stat().st_size for p in (self.root / "cache").glob("*/*.bin")), 2000)
+
+    def test_similarity_and_corpus_use_cache(self) -> None:
+        other = self.root / "other.txt"
+        other.write_text("the cat sat on a mat", encoding="utf-8")
+        cache = ShingleCache(self.root / "cache")
+        score = pc.similarity_from_files(self.doc, other, 2, cache=cache)
+        self.assertEqual(score, pc.similarity_from_files(self.doc, other, 2))
+
+        pooled = ShingleCache(self.root / "cache")
+        results = list(cc.compare_corpus([self.doc, other], window=2, workers=2, cache=pooled))
+        self.assertEqual(results[0].score, score)
+        self.assertEqual(pooled.stats(), {"hits": 2, "misses": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+﻿import io
+import json
+import random
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from itertools import combinations
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import plagiarism_benchmark as pb
+import simhash as sh
+
+
+class TestSimHash(unittest.TestCase):
+    def test_near_duplicates_have_close_fingerprints(self) -> None:
+        original, edited = pb.generate_pair(3000, edit_rate=0.02, seed=3)
+        other, _ = pb.generate_pair(3000, seed=4)
+        a, b, c = sh.simhash_text(original), sh.simhash_text(edited), sh.simhash_text(other)
+        self.assertEqual(a, sh.simhash_text(original))
+        self.assertLessEqual(sh.hamming_distance(a, b), 12)
+        self.assertGreater(sh.hamming_distance(a, c), 16)
+        self.assertEqual(sh.simhash([]), 0)
+
+    def test_index_finds_exactly_the_fingerprints_within_distance(self) -> None:
+        rng = random.Random(11)
+        fingerprints = [rng.getrandbits(64) for _ in range(300)]
+        for base in fingerprints[:40]:
+            flipped = base
+            for bit in rng.sample(range(64), rng.randrange(6)):
+                flipped ^= 1 << bit
+            fingerprints.append(flipped)
+        for blocks in (None, 6):
+            with self.subTest(blocks=blocks):
+                index = sh.HammingIndex.build(enumerate(fingerprints), distance=3, blocks=blocks)
+                expected = {
+                    (i, j) for i, j in combinations(range(len(fingerprints)), 2)
+                    if sh.hamming_distance(fingerprints[i], fingerprints[j]) <= 3
+                }
+                self.assertEqual({(a, b) for a, b, _ in index.pairs()}, expected)
+                for query in fingerprints[:50]:
+                    wanted = sorted(
+                        (sh.hamming_distance(query, fp), key) for key, fp in enumerate(fingerprints)
+                        if sh.hamming_distance(query, fp) <= 3
+                    )
+                    self.assertEqual(index.query(query), [(key, d) for d, key in wanted])
+
+    def test_cli_clusters_near_duplicates(self) -> None:
+        original, edited = pb.generate_pair(2000, edit_rate=0.01, seed=8)
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "a.txt").write_text(original, encoding="utf-8")
+            (root / "b.txt").write_text(original, encoding="utf-8")
+            (root / "c.txt").write_text(edited, encoding="utf-8")
+            (root / "d.txt").write_text(pb.generate_pair(2000, seed=9)[0], encoding="utf-8")
+            clusters = sh.cluster(sorted(root.glob("*.txt")), distance=8, workers=1)
+            self.assertEqual(clusters, [[root / "a.txt", root / "b.txt", root / "c.txt"]])
+
+            output = root / "clusters.jsonl"
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as summary:
+                sh.main(["cluster", str(root), "--distance", "8", "--workers", "1", "--output", str(output)])
+            self.assertEqual(len(output.read_text(encoding="utf-8").splitlines()), 1)
+            self.assertIn("可去除 2 篇", summary.getvalue())
+
+            with redirect_stdout(io.StringIO()) as buffer, redirect_stderr(io.StringIO()):
+                sh.main(["cluster", str(root), "--distance", "8", "--workers", "1"])
+        records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        self.assertEqual(records, [[str(root / name) for name in ("a.txt", "b.txt", "c.txt")]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+﻿import asyncio
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import similarity_service as ss
+
+REFERENCE = " ".join(f"word{i}" for i in range(60))
+
+
+async def _request(port: int, method: str, target: str, payload: object = None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+class TestSimilarityService(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        (root / "ref.txt").write_text(REFERENCE, encoding="utf-8")
+        (root / "other.txt").write_text("completely unrelated basketball notes " * 5, encoding="utf-8")
+        self.paths = sorted(root.glob("*.txt"))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _exercise(self, workers: int) -> None:
+        index = ss.ReferenceIndex.from_paths(self.paths, threshold=0.5)
+        service = ss.SimilarityService(index, workers=workers, batch_delay_ms=20)
+
+        async def scenario() -> None:
+            server = await ss.serve(service, port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                suspect = REFERENCE.replace("word30", "changed")
+                results = await asyncio.gather(
+                    *(_request(port, "POST", "/check", {"text": suspect}) for _ in range(5))
+                )
+                for status, payload in results:
+                    self.assertEqual(status, 200)
+                    self.assertEqual([m["document"] for m in payload["matches"]], [str(self.paths[1])])
+                self.assertLess(service.batches, 5)
+
+                status, _ = await _request(port, "POST", "/check", {"wrong": 1})
+                self.assertEqual(status, 400)
+                status, metrics = await _request(port, "GET", "/metrics")
+                self.assertEqual(status, 200)
+                self.assertEqual(metrics["requests"], 5)
+                self.assertGreaterEqual(metrics["p99_ms"], metrics["p50_ms"])
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            service.close()
+
+    def test_inline_worker(self) -> None:
+        self._exercise(workers=0)
+
+    def test_process_pool(self) -> None:
+        self._exercise(workers=1)
+
+    def test_latency_percentiles(self) -> None:
+        tracker = ss.LatencyTracker()
+        for ms in range(1, 101):
+            tracker.record(ms / 1000)
+        snapshot = tracker.snapshot()
+        self.assertEqual(snapshot["requests"], 100)
+        self.assertEqual(snapshot["p50_ms"], 51.0)
+        self.assertEqual(snapshot["p99_ms"], 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+﻿import io
+import json
+import pstats
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import plagiarism_checker as pc
+from stage_stats import StageStats
+
+
+class TestStageStats(unittest.TestCase):
+    def test_stage_records_time_calls_and_memory(self) -> None:
+        stats = StageStats()
+        try:
+            for _ in range(2):
+                with stats.stage("alloc"):
+                    payload = [0] * 100_000
+            del payload
+            stats.count("items", 3)
+        finally:
+            stats.close()
+        entry = stats.stages["alloc"]
+        self.assertEqual(entry["calls"], 2)
+        self.assertGreater(entry["seconds"], 0)
+        self.assertGreater(entry["peak_bytes"], 700_000)
+        self.assertEqual(stats.as_dict()["counts"], {"items": 3})
+        self.assertIn("alloc\t2\t", stats.format())
+
+    def test_nested_stages_keep_the_outer_peak(self) -> None:
+        stats = StageStats()
+        try:
+            with stats.stage("outer"):
+                payload = [0] * 200_000
+                del payload
+                with stats.stage("inner"):
+                    small = [0] * 1_000
+                del small
+        finally:
+            stats.close()
+        self.assertGreater(stats.stages["outer"]["peak_bytes"], 1_500_000)
+        self.assertLess(stats.stages["inner"]["peak_bytes"], 100_000)
+
+    def test_pipeline_stages_and_counts(self) -> None:
+        stats = StageStats(trace_memory=False)
+        score = pc.compute_similarity("a b c d e", "a b c d f", compact=True, stats=stats)
+        self.assertEqual(score, pc.compute_similarity("a b c d e", "a b c d f"))
+        self.assertEqual(list(stats.stages), ["tokenize", "hash_shingles", "jaccard_similarity"])
+        self.assertEqual(stats.counts, {"tokens": 10, "shingles": 6})
+        self.assertEqual(stats.stages["tokenize"]["peak_bytes"], 0)
+
+    def test_cli_writes_stats_json_and_profile(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            orig = Path(tmp) / "orig.txt"
+            suspect = Path(tmp) / "suspect.txt"
+            orig.write_text("the cat sat on the mat", encoding="utf-8")
+            suspect.write_text("the cat sat on a mat", encoding="utf-8")
+            stats_path = Path(tmp) / "stats.json"
+            profile_path = Path(tmp) / "run.prof"
+            args = [str(orig), str(suspect), str(Path(tmp) / "out.txt")]
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as errors:
+                pc.main(args + ["--stats", "--stats-json", str(stats_path), "--profile", str(profile_path)])
+            report = json.loads(stats_path.read_text(encoding="utf-8"))
+            self.assertEqual(
+                list(report["stages"]),
+                ["read_document", "tokenize", "build_shingles", "jaccard_similarity"],
+            )
+            self.assertEqual(report["counts"]["tokens"], 12)
+            self.assertIn("read_document", errors.getvalue())
+            self.assertGreater(pstats.Stats(str(profile_path)).total_calls, 0)
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as errors:
+                pc.main(args + ["--stats-no-memory", "--stats-json", str(stats_path)])
+            self.assertFalse(tracemalloc.is_tracing())
+            self.assertIn("tokenize\t1\t", errors.getvalue())
+            self.assertTrue(errors.getvalue().splitlines()[1].endswith("\t-"))
+            report = json.loads(stats_path.read_text(encoding="utf-8"))
+            self.assertEqual(report["stages"]["tokenize"]["peak_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
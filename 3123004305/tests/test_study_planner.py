@@ -0,0 +1,372 @@
+﻿import json
+import random
+import sys
+import tempfile
+import unittest
+import weakref
+from contextlib import redirect_stdout
+from io import StringIO
+from functools import lru_cache
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import study_planner as sp
+
+
+def recursive_plan(tasks, available_minutes):
+    """The original top-down formulation, kept as the reference for plan identity."""
+
+    @lru_cache(maxsize=None)
+    def best(start, remaining):
+        if start == len(tasks) or remaining <= 0:
+            return 0.0, ()
+        best_score, best_plan = best(start + 1, remaining)
+        task = tasks[start]
+        if task.minutes <= remaining:
+            taken_score, taken_plan = best(start + 1, remaining - task.minutes)
+            taken_score += task.score()
+            if taken_score > best_score:
+                best_score, best_plan = taken_score, (start,) + taken_plan
+        return best_score, best_plan
+
+    return [tasks[i] for i in best(0, available_minutes)[1]]
+
+
+def random_tasks(rng, count, max_minutes=60, step=1):
+    focus = list(sp.FOCUS_MULTIPLIER)
+    return [
+        sp.Task(
+            name=f"t{i}",
+            category=f"c{rng.randrange(4)}",
+            minutes=rng.randrange(1, max_minutes // step + 1) * step,
+            value=float(rng.randrange(1, 12)),
+            focus=rng.choice(focus),
+        )
+        for i in range(count)
+    ]
+
+
+class TestStudyPlanner(unittest.TestCase):
+    def test_plans_match_recursive_solver(self) -> None:
+        rng = random.Random(3)
+        for trial in range(30):
+            tasks = random_tasks(rng, rng.randrange(1, 25), step=rng.choice((1, 5, 15)))
+            budget = rng.randrange(1, 300)
+            with self.subTest(trial=trial, budget=budget):
+                self.assertEqual(sp.StudyPlanner(tasks).optimize(budget), recursive_plan(tasks, budget))
+
+    def test_sample_tasks(self) -> None:
+        tasks = sp.load_tasks(ROOT / "sample_tasks.json")
+        plan = sp.StudyPlanner(tasks).optimize(240)
+        self.assertEqual(plan, recursive_plan(tasks, 240))
+        self.assertLessEqual(sum(task.minutes for task in plan), 240)
+
+    def test_jsonl_tasks_stream_like_json(self) -> None:
+        tasks = sp.load_tasks(ROOT / "sample_tasks.json")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "tasks.jsonl"
+            lines = [json.dumps(task.__dict__, ensure_ascii=False) for task in tasks]
+            path.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+            self.assertEqual(sp.load_tasks(path), tasks)
+            self.assertEqual(next(sp.iter_tasks(path)), tasks[0])
+
+    def test_pruning_consumes_stream_lazily(self) -> None:
+        alive = weakref.WeakSet()
+        pulled = []
+
+        def catalog():
+            for index in range(2000):
+                if index % 100 == 0:
+                    pulled.append(len(alive))
+                task = sp.Task(f"long{index}", "c0", 500, 1.0)
+                alive.add(task)
+                yield task
+            yield sp.Task("fits", "c0", 30, 5.0)
+
+        report = sp.prune_tasks(catalog(), 60)
+        self.assertEqual(report.too_long, 2000)
+        self.assertEqual([task.name for task in report.tasks], ["fits"])
+        self.assertLessEqual(max(pulled), 1)
+
+    def test_cli_prune_streams_jsonl(self) -> None:
+        tasks = random_tasks(random.Random(25), 50, max_minutes=90)
+        pulled = []
+        original_iter, original_load = sp.iter_tasks, sp.load_tasks
+
+        def counting_iter(path):
+            for task in original_iter(path):
+                pulled.append(task)
+                yield task
+
+        def failing_load(path):
+            raise AssertionError("the catalog must not be loaded whole")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "tasks.jsonl"
+            path.write_text("".join(json.dumps(task.__dict__) + "\n" for task in tasks), encoding="utf-8")
+            sp.iter_tasks, sp.load_tasks = counting_iter, failing_load
+            try:
+                with redirect_stdout(StringIO()) as output:
+                    sp.main(["--tasks", str(path), "--minutes", "60", "--prune"])
+            finally:
+                sp.iter_tasks, sp.load_tasks = original_iter, original_load
+        self.assertEqual(len(pulled), 50)
+        self.assertIn("预处理: 共 50 项任务", output.getvalue())
+
+    def test_pruning_keeps_optimal_score(self) -> None:
+        rng = random.Random(21)
+        for trial in range(40):
+            tasks = random_tasks(rng, rng.randrange(1, 30), max_minutes=rng.choice((20, 60)))
+            tasks += rng.sample(tasks, rng.randrange(len(tasks) + 1))
+            budget = rng.randrange(1, 120)
+            report = sp.prune_tasks(tasks, budget)
+            with self.subTest(trial=trial, budget=budget):
+                self.assertEqual(len(report.tasks) + report.pruned, len(tasks))
+                expected = sum(task.score() for task in recursive_plan(tasks, budget))
+                plan = sp.StudyPlanner(report.tasks).optimize(budget) if report.tasks else []
+                self.assertAlmostEqual(sum(task.score() for task in plan), expected)
+
+    def test_pruning_keeps_duplicates_that_fit_together(self) -> None:
+        twin = sp.Task("review", "c0", 30, 5.0)
+        report = sp.prune_tasks([twin, twin, twin], 60)
+        self.assertEqual((report.tasks, report.duplicates), ([twin, twin], 1))
+        self.assertEqual(sp.StudyPlanner(report.tasks).optimize(60), [twin, twin])
+
+    def test_pruning_shrinks_large_catalogs(self) -> None:
+        tasks = random_tasks(random.Random(22), 20000, max_minutes=120)
+        report = sp.prune_tasks(tasks, 90)
+        self.assertLess(len(report.tasks), 500)
+        self.assertGreater(report.too_long, 0)
+
+    def test_deep_catalog_does_not_recurse(self) -> None:
+        tasks = random_tasks(random.Random(9), 3000, max_minutes=30)
+        plan = sp.StudyPlanner(tasks).optimize(2000)
+        self.assertLessEqual(sum(task.minutes for task in plan), 2000)
+        self.assertGreater(len(plan), 60)
+
+    def test_optimize_many_reuses_one_table(self) -> None:
+        tasks = random_tasks(random.Random(6), 30, step=5)
+        planner = sp.StudyPlanner(tasks, backend="python")
+        calls = []
+        solve = planner._solve
+        planner._solve = lambda *args: calls.append(args[-1]) or solve(*args)
+
+        results = planner.optimize_many([600, 30, 45, 600])
+        self.assertEqual(list(results), [30, 45, 600])
+        for minutes, result in results.items():
+            expected = recursive_plan(tasks, minutes)
+            self.assertEqual(result.tasks, expected)
+            self.assertAlmostEqual(result.score, sum(task.score() for task in expected))
+        self.assertEqual(planner.optimize(300), recursive_plan(tasks, 300))
+        curve = planner.plan_curve(200)
+        self.assertEqual([point.minutes for point in curve], list(range(1, 201)))
+        self.assertTrue(all(a.score <= b.score for a, b in zip(curve, curve[1:])))
+        self.assertEqual(calls, [600 // 5])
+
+    def test_fptas_optimize_many_shares_tables(self) -> None:
+        tasks = random_tasks(random.Random(26), 25, max_minutes=120)
+        planner = sp.StudyPlanner(tasks, epsilon=0.1)
+        groups = []
+        original = sp._fptas_group
+        sp._fptas_group = lambda *args: groups.append(len(args[2])) or original(*args)
+        try:
+            results = planner.optimize_many(range(60, 601, 20))
+            plans = {minutes: result.tasks for minutes, result in results.items()}
+        finally:
+            sp._fptas_group = original
+        self.assertEqual(sum(groups), len(results))
+        self.assertLess(len(groups), len(results) // 3)
+        for minutes, plan in plans.items():
+            optimum = sum(task.score() for task in recursive_plan(tasks, minutes))
+            with self.subTest(minutes=minutes):
+                self.assertLessEqual(sum(task.minutes for task in plan), minutes)
+                self.assertAlmostEqual(results[minutes].score, sum(task.score() for task in plan))
+                self.assertGreaterEqual(results[minutes].score, 0.9 * optimum - 1e-9)
+
+    def test_gcd_scaling_keeps_plans_identical(self) -> None:
+        rng = random.Random(8)
+        for trial in range(20):
+            tasks = random_tasks(rng, rng.randrange(1, 20), max_minutes=90, step=15)
+            budget = rng.randrange(1, 400)
+            planner = sp.StudyPlanner(tasks)
+            with self.subTest(trial=trial):
+                self.assertEqual(planner.optimize(budget), recursive_plan(tasks, budget))
+                self.assertEqual(planner.mode, "exact")
+                self.assertEqual(planner._unit % 15, 0)
+
+    def test_granularity_plans_are_feasible_and_bounded(self) -> None:
+        rng = random.Random(12)
+        for trial in range(20):
+            tasks = random_tasks(rng, rng.randrange(1, 20), max_minutes=90)
+            budget = rng.randrange(30, 400)
+            report = sp.StudyPlanner(tasks, granularity=10).report(budget)
+            optimum = sum(task.score() for task in recursive_plan(tasks, budget))
+            with self.subTest(trial=trial):
+                self.assertLessEqual(sum(task.minutes for task in report.tasks), budget)
+                self.assertLessEqual(report.score, optimum + 1e-9)
+                self.assertGreaterEqual(report.upper_bound, optimum - 1e-9)
+                if report.mode == "granularity":
+                    self.assertGreaterEqual(report.gap, 0.0)
+
+    def test_fptas_guarantee(self) -> None:
+        rng = random.Random(13)
+        for epsilon in (0.5, 0.2, 0.05):
+            for trial in range(15):
+                tasks = random_tasks(rng, rng.randrange(1, 20), max_minutes=120)
+                budget = rng.randrange(1, 500)
+                report = sp.StudyPlanner(tasks, epsilon=epsilon).report(budget)
+                optimum = sum(task.score() for task in recursive_plan(tasks, budget))
+                with self.subTest(epsilon=epsilon, trial=trial):
+                    self.assertEqual(report.mode, "fptas")
+                    self.assertLessEqual(sum(task.minutes for task in report.tasks), budget)
+                    self.assertGreaterEqual(report.score, (1 - epsilon) * optimum - 1e-9)
+                    self.assertGreaterEqual(report.upper_bound, optimum - 1e-9)
+
+    @unittest.skipIf(sp.np is None, "NumPy is not installed")
+    def test_numpy_backend_matches_python_solver(self) -> None:
+        rng = random.Random(4)
+        for trial in range(30):
+            tasks = random_tasks(rng, rng.randrange(1, 40), step=rng.choice((1, 5)))
+            budget = rng.randrange(1, 500)
+            with self.subTest(trial=trial, budget=budget):
+                self.assertEqual(
+                    sp.StudyPlanner(tasks, backend="numpy").optimize(budget),
+                    sp.StudyPlanner(tasks, backend="python").optimize(budget),
+                )
+
+    def test_auto_backend_falls_back_without_numpy(self) -> None:
+        tasks = random_tasks(random.Random(2), 10)
+        original = sp.np
+        sp.np = None
+        try:
+            self.assertEqual(sp.StudyPlanner(tasks).optimize(100), recursive_plan(tasks, 100))
+            with self.assertRaises(ValueError):
+                sp.StudyPlanner(tasks, backend="numpy")
+        finally:
+            sp.np = original
+
+    def test_incremental_edits_match_full_resolve(self) -> None:
+        rng = random.Random(20)
+        tasks = random_tasks(rng, 40, max_minutes=30)
+        planner = sp.IncrementalPlanner(tasks, 120, layer_size=4)
+        for step in range(60):
+            action = rng.randrange(3)
+            if action == 0 or len(planner) < 2:
+                index = rng.choice([None, rng.randrange(len(planner) + 1)])
+                planner.add_task(random_tasks(rng, 1, max_minutes=30)[0], index)
+            elif action == 1:
+                planner.remove_task(rng.randrange(len(planner)))
+            else:
+                planner.update_task(rng.randrange(len(planner)), random_tasks(rng, 1, max_minutes=30)[0])
+            expected = sum(task.score() for task in sp.StudyPlanner(planner.tasks).optimize(120))
+            with self.subTest(step=step):
+                self.assertAlmostEqual(planner.score(), expected)
+                if step % 5 == 0:
+                    self.assertOptimalPlan(planner, expected)
+
+    def test_incremental_edit_recomputes_one_layer(self) -> None:
+        tasks = random_tasks(random.Random(21), 64, max_minutes=30)
+        planner = sp.IncrementalPlanner(tasks, 200, layer_size=8)
+        planner.update_task(28, sp.Task("warm", "c1", 20, 30.0))
+        planner.score()
+        calls = []
+        original = sp._knapsack_step
+        sp._knapsack_step = lambda *args: calls.append(args) or original(*args)
+        try:
+            planner.update_task(30, sp.Task("new", "c0", 10, 50.0))
+            planner.score()
+        finally:
+            sp._knapsack_step = original
+        self.assertEqual(len(calls), 8)
+        expected = sp.StudyPlanner(planner.tasks).optimize(200)
+        self.assertOptimalPlan(planner, sum(task.score() for task in expected))
+
+    def test_incremental_optimize_after_append_skips_earlier_layers(self) -> None:
+        tasks = random_tasks(random.Random(24), 96, max_minutes=30)
+        planner = sp.IncrementalPlanner(tasks, 200, layer_size=8)
+        planner.optimize()
+        edits = [
+            lambda: planner.add_task(sp.Task("tail", "c0", 15, 40.0)),
+            lambda: planner.update_task(-2, sp.Task("near", "c1", 25, 60.0)),
+            lambda: planner.add_task(sp.Task("more", "c2", 10, 35.0)),
+        ]
+        for edit in edits:
+            calls = []
+            original = sp._knapsack_step
+            sp._knapsack_step = lambda *args: calls.append(args) or original(*args)
+            try:
+                edit()
+                plan = planner.optimize()
+            finally:
+                sp._knapsack_step = original
+            with self.subTest(edit=len(planner)):
+                self.assertLessEqual(len(calls), 10)
+                self.assertEqual(plan, planner.optimize())
+                expected = sp.StudyPlanner(planner.tasks).optimize(200)
+                self.assertOptimalPlan(planner, sum(task.score() for task in expected))
+
+    def assertOptimalPlan(self, planner: sp.IncrementalPlanner, expected: float) -> None:
+        plan = planner.optimize()
+        self.assertLessEqual(sum(task.minutes for task in plan), planner.available_minutes)
+        self.assertAlmostEqual(sum(task.score() for task in plan), expected)
+        positions = [planner.tasks.index(task) for task in plan]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_deadline_search_finds_optimum(self) -> None:
+        rng = random.Random(22)
+        original = sp._DP_CELLS_PER_MS
+        sp._DP_CELLS_PER_MS = 0
+        try:
+            for trial in range(30):
+                tasks = random_tasks(rng, rng.randrange(1, 25), step=rng.choice((1, 5)))
+                budget = rng.randrange(1, 300)
+                report = sp.StudyPlanner(tasks).report(budget, deadline_ms=10_000)
+                expected = sum(task.score() for task in recursive_plan(tasks, budget))
+                with self.subTest(trial=trial, budget=budget):
+                    self.assertEqual(report.mode, "exact")
+                    self.assertAlmostEqual(report.score, expected)
+                    self.assertEqual(report.upper_bound, report.score)
+                    self.assertLessEqual(sum(task.minutes for task in report.tasks), budget)
+        finally:
+            sp._DP_CELLS_PER_MS = original
+
+    def test_expired_deadline_reports_bound(self) -> None:
+        tasks = random_tasks(random.Random(23), 200, max_minutes=90)
+        expected = sum(task.score() for task in sp.StudyPlanner(tasks).optimize(1500))
+        original = sp._DEADLINE_CHECK_NODES, sp._DP_CELLS_PER_MS
+        sp._DEADLINE_CHECK_NODES, sp._DP_CELLS_PER_MS = 1, 0
+        try:
+            report = sp.StudyPlanner(tasks).report(1500, deadline_ms=1e-6)
+        finally:
+            sp._DEADLINE_CHECK_NODES, sp._DP_CELLS_PER_MS = original
+        self.assertEqual(report.mode, "anytime")
+        self.assertLessEqual(sum(task.minutes for task in report.tasks), 1500)
+        self.assertGreaterEqual(report.score, expected / 2)
+        self.assertGreaterEqual(report.upper_bound + 1e-9, expected)
+        self.assertIn("限时求解", sp.describe_mode(report))
+
+    def test_deadline_uses_dp_when_affordable(self) -> None:
+        tasks = random_tasks(random.Random(24), 20, step=5)
+        planner = sp.StudyPlanner(tasks)
+        self.assertEqual(planner.optimize(200, deadline_ms=200), planner.optimize(200))
+        with self.assertRaises(ValueError):
+            sp.StudyPlanner(tasks, epsilon=0.1).optimize(200, deadline_ms=200)
+
+    def test_invalid_input(self) -> None:
+        with self.assertRaises(ValueError):
+            sp.StudyPlanner([])
+        with self.assertRaises(ValueError):
+            sp.StudyPlanner(random_tasks(random.Random(1), 3)).optimize(0)
+        with self.assertRaises(ValueError):
+            sp.StudyPlanner(random_tasks(random.Random(1), 3), backend="gpu")
+        with self.assertRaises(ValueError):
+            sp.StudyPlanner(random_tasks(random.Random(1), 3), epsilon=1.5)
+        with self.assertRaises(IndexError):
+            sp.IncrementalPlanner([], 60).remove_task(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+﻿import io
+import itertools
+import random
+import sys
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import weekly_planner as wp
+from study_planner import Task
+from test_study_planner import random_tasks
+
+
+def brute_force(tasks, days, limits):
+    best = None
+    for assignment in itertools.product(range(len(days) + 1), repeat=len(tasks)):
+        loads = [0] * len(days)
+        minutes = {}
+        score = 0.0
+        for task, day in zip(tasks, assignment):
+            if day < len(days):
+                loads[day] += task.minutes
+                minutes[task.category] = minutes.get(task.category, 0) + task.minutes
+                score += task.score()
+        if any(load > cap for load, cap in zip(loads, days)):
+            continue
+        if all(
+            limit.min_minutes <= minutes.get(category, 0)
+            and (limit.max_minutes is None or minutes.get(category, 0) <= limit.max_minutes)
+            for category, limit in limits.items()
+        ):
+            best = score if best is None else max(best, score)
+    return best
+
+
+class TestWeeklyPlanner(unittest.TestCase):
+    def test_matches_brute_force(self) -> None:
+        rng = random.Random(1)
+        for trial in range(40):
+            tasks = random_tasks(rng, rng.randrange(1, 7), step=5)
+            days = [rng.choice((30, 60, 90)) for _ in range(rng.randrange(1, 4))]
+            limits = {"c0": wp.CategoryLimit(rng.choice((0, 20, 40)), rng.choice((None, 60, 120)))}
+            expected = brute_force(tasks, days, limits)
+            with self.subTest(trial=trial):
+                if expected is None:
+                    with self.assertRaises(ValueError):
+                        wp.WeeklyPlanner(tasks, days, limits).optimize()
+                    continue
+                plan = wp.WeeklyPlanner(tasks, days, limits).optimize()
+                self.assertTrue(plan.optimal)
+                self.assertAlmostEqual(plan.score, expected)
+                for day_tasks, capacity in zip(plan.days, days):
+                    self.assertLessEqual(sum(task.minutes for task in day_tasks), capacity)
+
+    def test_worthless_tasks_are_only_used_for_minimums(self) -> None:
+        tasks = [
+            Task("read", "c0", 30, 6.0),
+            Task("idle", "c0", 20, 0.0),
+            Task("chores", "c1", 30, -2.0),
+            Task("drill", "c1", 40, 5.0),
+        ]
+        plan = wp.WeeklyPlanner(tasks, [60, 60]).optimize()
+        scheduled = {task.name for day in plan.days for task in day}
+        self.assertEqual(scheduled, {"read", "drill"})
+        self.assertTrue(plan.optimal)
+        self.assertEqual(plan.upper_bound, plan.score)
+
+        limits = {"c1": wp.CategoryLimit(60)}
+        plan = wp.WeeklyPlanner(tasks, [60, 60], limits).optimize()
+        self.assertAlmostEqual(plan.score, brute_force(tasks, [60, 60], limits))
+        self.assertIn("chores", {task.name for day in plan.days for task in day})
+        self.assertNotIn("idle", {task.name for day in plan.days for task in day})
+
+        limits = {"c1": wp.CategoryLimit(30, 30)}
+        plan = wp.WeeklyPlanner([Task("chores", "c1", 30, -2.0)], [60], limits).optimize()
+        self.assertEqual((plan.score, plan.optimal), (-2.0, True))
+
+    def test_reports_gap_when_stopped_early(self) -> None:
+        tasks = random_tasks(random.Random(5), 500, max_minutes=120, step=5)
+        limits = {"c1": wp.CategoryLimit(300, 900), "c2": wp.CategoryLimit(0, 200)}
+        plan = wp.WeeklyPlanner(tasks, [240] * 7, limits).optimize(time_limit=1.0, node_limit=500)
+        self.assertLessEqual(plan.nodes, 500)
+        self.assertGreaterEqual(plan.upper_bound, plan.score)
+        self.assertLess(plan.gap, 0.05)
+        scheduled = [task for day in plan.days for task in day]
+        self.assertEqual(len(scheduled), len(set(map(id, scheduled))))
+        c1 = sum(task.minutes for task in scheduled if task.category == "c1")
+        c2 = sum(task.minutes for task in scheduled if task.category == "c2")
+        self.assertTrue(300 <= c1 <= 900 and c2 <= 200)
+
+    def test_cli_prints_each_day(self) -> None:
+        with redirect_stdout(io.StringIO()) as buffer:
+            wp.main(["--days", "60,60", "--category", "运动:50"])
+        output = buffer.getvalue()
+        self.assertIn("第 2 天", output)
+        self.assertIn("篮球训练", output)
+        self.assertIn("最优性差距 0.00%", output)
+
+    def test_invalid_limits(self) -> None:
+        with self.assertRaises(ValueError):
+            wp.CategoryLimit(60, 30)
+        with self.assertRaises(ValueError):
+            wp.WeeklyPlanner([Task("a", "x", 10, 1.0)], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,401 @@
+﻿"""Multi-day, category-constrained study planning with best-first branch-and-bound."""
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Sequence
+
+from study_planner import Task, build_focus_blocks, load_tasks
+
+DEFAULT_TIME_LIMIT = 5.0
+DEFAULT_NODE_LIMIT = 2_000_000
+_MEMO_LIMIT = 1_000_000
+_DP_BOUND_CELLS = 5_000_000
+_DIVE_EVERY = 64
+_EPSILON = 1e-9
+
+
+@dataclass(frozen=True)
+class CategoryLimit:
+    """Weekly bounds on the minutes spent on one category."""
+
+    min_minutes: int = 0
+    max_minutes: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.min_minutes < 0:
+            raise ValueError("Category minimum must not be negative")
+        if self.max_minutes is not None and self.max_minutes < self.min_minutes:
+            raise ValueError("Category maximum must not be below its minimum")
+
+
+@dataclass(frozen=True)
+class WeeklyPlan:
+    """Best schedule found, with a proven upper bound on the optimum.
+
+    `gap` is `(upper_bound - score) / upper_bound`; it is 0 when the search finished,
+    i.e. the schedule is proven optimal.
+    """
+
+    days: tuple[tuple[Task, ...], ...]
+    score: float
+    upper_bound: float
+    nodes: int
+
+    @property
+    def gap(self) -> float:
+        return (self.upper_bound - self.score) / self.upper_bound if self.upper_bound > 0 else 0.0
+
+    @property
+    def optimal(self) -> bool:
+        return self.upper_bound - self.score <= _EPSILON
+
+
+class WeeklyPlanner:
+    """Assigns each task to at most one day, maximising the total `Task.score()`.
+
+    Day capacities are hard limits; category limits apply to the whole week. The
+    search decides tasks in decreasing score density. Each node is bounded by the
+    LP relaxation, which for several knapsacks equals one knapsack of their pooled
+    capacity. With per-category minimums and caps it is still solved greedily:
+    each category's outstanding minimum is filled with its densest tasks, then
+    the remaining room is filled by density within the caps (the last task of
+    each pass fractionally).
+    Nodes are expanded best bound first; days with equal remaining capacity are
+    interchangeable, so only one of them is branched on, and a node is dropped when
+    an equal state (next task, sorted day capacities, category minutes) was already
+    reached with at least its score.
+
+    When tasks share a density the LP bound barely moves, so for moderate pooled
+    capacities a second bound is precomputed: the exact 0/1 knapsack over each suffix
+    of the task order with the pooled capacity, ignoring categories. A node uses the
+    smaller of the two.
+
+    Tasks scoring zero or less can only lower the total, so they are dropped before
+    the search unless their category has a minimum they may be needed to meet; such
+    kept ones are placed only toward that minimum.
+    """
+
+    def __init__(
+        self,
+        tasks: Sequence[Task],
+        day_minutes: Sequence[int],
+        category_limits: Mapping[str, CategoryLimit] | None = None,
+    ) -> None:
+        if not tasks:
+            raise ValueError("At least one task is required")
+        if not day_minutes or min(day_minutes) < 0:
+            raise ValueError("Day capacities must be non-negative minutes")
+        self._day_minutes = tuple(day_minutes)
+        self._limits = dict(category_limits or {})
+        required = {category for category, limit in self._limits.items() if limit.min_minutes > 0}
+        useful = [task for task in tasks if task.score() > 0 or task.category in required]
+        self._order = sorted(useful, key=lambda task: -task.score() / task.minutes)
+        self._tracked = sorted(self._limits)
+        self._slot = {category: slot for slot, category in enumerate(self._tracked)}
+        # _available[slot][i]: minutes of tracked-category tasks from position i on.
+        self._members = [
+            [position for position, task in enumerate(self._order) if task.category == category]
+            for category in self._tracked
+        ]
+        self._available = []
+        for category in self._tracked:
+            suffix = [0] * (len(self._order) + 1)
+            for position in range(len(self._order) - 1, -1, -1):
+                task = self._order[position]
+                suffix[position] = suffix[position + 1] + (task.minutes if task.category == category else 0)
+            self._available.append(suffix)
+        self._suffix_best = self._suffix_table(sum(self._day_minutes))
+
+    def _suffix_table(self, capacity: int) -> list[array] | None:
+        """`table[i][c]`: best score of tasks from position `i` on within `c` pooled minutes."""
+
+        if (len(self._order) + 1) * (capacity + 1) > _DP_BOUND_CELLS:
+            return None
+        row = [0.0] * (capacity + 1)
+        table = [array("d", row)]
+        for task in reversed(self._order):
+            minutes = task.minutes
+            if minutes <= capacity:
+                score = task.score()
+                tail = [max(kept, taken + score) for kept, taken in zip(row[minutes:], row)]
+                row = row[:minutes] + tail
+            table.append(array("d", row))
+        table.reverse()
+        return table
+
+    def _room(self, category: str, used: tuple[int, ...]) -> float:
+        limit = self._limits.get(category)
+        if limit is None or limit.max_minutes is None:
+            return float("inf")
+        return limit.max_minutes - used[self._slot[category]]
+
+    def _bound(self, position: int, caps: tuple[int, ...], used: tuple[int, ...], score: float) -> float:
+        base = score
+        room = sum(caps)
+        largest = max(caps)
+        category_room: dict[str, float] = {}
+        counted: dict[int, int] = {}
+        # Minutes a category still owes are mandatory, so the LP fills them first
+        # with that category's densest tasks.
+        for slot, category in enumerate(self._tracked):
+            deficit = self._limits[category].min_minutes - used[slot]
+            if deficit <= 0:
+                continue
+            members = self._members[slot]
+            reserved = 0
+            for member in itertools.islice(members, bisect_left(members, position), None):
+                if reserved >= deficit:
+                    break
+                task = self._order[member]
+                if task.minutes > largest:
+                    continue
+                amount = min(task.minutes, deficit - reserved)
+                score += task.score() * amount / task.minutes
+                counted[member] = amount
+                reserved += amount
+            room -= reserved
+            category_room[category] = self._room(category, used) - reserved
+        for index in range(position, len(self._order)):
+            if room <= 0:
+                break
+            task = self._order[index]
+            if task.score() <= 0:
+                break
+            if task.minutes > largest:
+                continue
+            left = category_room.get(task.category)
+            if left is None:
+                left = self._room(task.category, used)
+            amount = min(task.minutes - counted.get(index, 0), room, left)
+            if amount <= 0:
+                continue
+            score += task.score() * amount / task.minutes
+            room -= amount
+            category_room[task.category] = left - amount
+        if self._suffix_best is not None:
+            return min(score, base + self._suffix_best[position][sum(caps)])
+        return score
+
+    def _feasible(self, position: int, caps: tuple[int, ...], used: tuple[int, ...]) -> bool:
+        """Cheap necessary condition: category minimums can still be met."""
+
+        deficit_total = 0
+        for slot, category in enumerate(self._tracked):
+            deficit = self._limits[category].min_minutes - used[slot]
+            if deficit > 0:
+                if self._available[slot][position] < deficit:
+                    return False
+                deficit_total += deficit
+        return deficit_total <= sum(caps)
+
+    def _satisfied(self, used: tuple[int, ...]) -> bool:
+        limits = self._limits
+        return all(used[slot] >= limits[category].min_minutes for slot, category in enumerate(self._tracked))
+
+    def _greedy(
+        self, start: int, caps: Sequence[int], used: Sequence[int], score: float
+    ) -> tuple[float, dict[int, int]] | None:
+        """Complete a partial schedule best-fit: category minimums first, then by density.
+
+        Only tasks from `start` on are placed; returns the total score and the new
+        `{position: day}` assignments, or None if the minimums end up unmet.
+        """
+
+        caps = list(caps)
+        used = list(used)
+        assigned: dict[int, int] = {}
+
+        def place(position: int) -> bool:
+            task = self._order[position]
+            if self._room(task.category, tuple(used)) < task.minutes:
+                return False
+            fitting = [day for day, cap in enumerate(caps) if cap >= task.minutes]
+            if not fitting:
+                return False
+            day = min(fitting, key=lambda candidate: caps[candidate])
+            caps[day] -= task.minutes
+            if task.category in self._slot:
+                used[self._slot[task.category]] += task.minutes
+            assigned[position] = day
+            return True
+
+        for slot, category in enumerate(self._tracked):
+            for position in range(start, len(self._order)):
+                if used[slot] >= self._limits[category].min_minutes:
+                    break
+                if self._order[position].category == category and position not in assigned:
+                    place(position)
+        for position in range(start, len(self._order)):
+            if position not in assigned and self._order[position].score() > 0:
+                place(position)
+        if not self._satisfied(tuple(used)):
+            return None
+        return score + sum(self._order[position].score() for position in assigned), assigned
+
+    def optimize(
+        self, time_limit: float = DEFAULT_TIME_LIMIT, node_limit: int = DEFAULT_NODE_LIMIT
+    ) -> WeeklyPlan:
+        """Search until optimality is proven or a limit is hit; return the best schedule.
+
+        Raises `ValueError` when no schedule satisfying the category minimums exists
+        (or none was found within the limits).
+        """
+
+        deadline = time.perf_counter() + time_limit
+        root_used = (0,) * len(self._tracked)
+        best_score, best_assignment = float("-inf"), None
+        greedy = self._greedy(0, self._day_minutes, root_used, 0.0)
+        if greedy is not None:
+            best_score, best_assignment = greedy
+        root_bound = self._bound(0, self._day_minutes, root_used, 0.0)
+        counter = itertools.count()
+        heap = [(-root_bound, 0, next(counter), 0, self._day_minutes, root_used, 0.0, None)]
+        memo: dict[tuple, float] = {}
+        nodes = 0
+        stopped = False
+
+        while heap:
+            negative_bound, _, _, position, caps, used, score, chain = heapq.heappop(heap)
+            if -negative_bound <= best_score + _EPSILON:
+                heap.clear()
+                break
+            nodes += 1
+            if nodes >= node_limit or (nodes & 0xFF) == 0 and time.perf_counter() > deadline:
+                heapq.heappush(heap, (negative_bound, 0, 0, position, caps, used, score, chain))
+                stopped = True
+                break
+
+            largest = max(caps)
+            while position < len(self._order):
+                task = self._order[position]
+                if task.minutes <= largest and self._room(task.category, used) >= task.minutes:
+                    break
+                position += 1
+            if position == len(self._order):
+                if self._satisfied(used) and score > best_score:
+                    best_score, best_assignment = score, _unwind(chain)
+                continue
+            if nodes % _DIVE_EVERY == 0:
+                dive = self._greedy(position, caps, used, score)
+                if dive is not None and dive[0] > best_score + _EPSILON:
+                    best_score, best_assignment = dive[0], {**_unwind(chain), **dive[1]}
+
+            task = self._order[position]
+            children = []
+            seen_caps = set()
+            for day, cap in enumerate(caps):
+                if cap < task.minutes or cap in seen_caps:
+                    continue
+                seen_caps.add(cap)
+                child_caps = caps[:day] + (cap - task.minutes,) + caps[day + 1 :]
+                child_used = used
+                if task.category in self._slot:
+                    slot = self._slot[task.category]
+                    child_used = used[:slot] + (used[slot] + task.minutes,) + used[slot + 1 :]
+                children.append((child_caps, child_used, score + task.score(), (position, day, chain)))
+            children.append((caps, used, score, chain))
+
+            for child_caps, child_used, child_score, child_chain in children:
+                following = position + 1
+                if not self._feasible(following, child_caps, child_used):
+                    continue
+                key = (following, tuple(sorted(child_caps)), child_used)
+                if memo.get(key, float("-inf")) >= child_score:
+                    continue
+                if len(memo) < _MEMO_LIMIT:
+                    memo[key] = child_score
+                bound = self._bound(following, child_caps, child_used, child_score)
+                if bound > best_score + _EPSILON:
+                    entry = (-bound, -following, next(counter), following, child_caps, child_used)
+                    heapq.heappush(heap, (*entry, child_score, child_chain))
+
+        if best_assignment is None:
+            raise ValueError("No schedule satisfies the category minimums")
+        upper_bound = max(best_score, -heap[0][0]) if stopped and heap else best_score
+        days: list[list[Task]] = [[] for _ in self._day_minutes]
+        for position, day in sorted(best_assignment.items()):
+            days[day].append(self._order[position])
+        return WeeklyPlan(tuple(map(tuple, days)), best_score, upper_bound, nodes)
+
+
+def _unwind(chain: tuple | None) -> dict[int, int]:
+    """Turn a `(position, day, parent)` chain into `{position: day}`."""
+
+    assigned = {}
+    while chain is not None:
+        position, day, chain = chain
+        assigned[position] = day
+    return assigned
+
+
+def describe_week(plan: WeeklyPlan, day_minutes: Sequence[int]) -> str:
+    lines = [
+        f"总价值: {plan.score:.2f}（上界 {plan.upper_bound:.2f}，最优性差距 {plan.gap:.2%}，搜索 {plan.nodes} 个节点）"
+    ]
+    for number, (tasks, capacity) in enumerate(zip(plan.days, day_minutes), start=1):
+        used = sum(task.minutes for task in tasks)
+        lines.append(f"第 {number} 天: {used}/{capacity} 分钟")
+        lines.extend(f"  · {task.name} ({task.category}) - {task.minutes} 分钟" for task in tasks)
+        lines.extend(build_focus_blocks(tasks))
+    return "\n".join(lines)
+
+
+def _parse_limit(text: str) -> tuple[str, CategoryLimit]:
+    """Parse `类别:最少[:最多]`, e.g. `课程:120:600` or `运动:0:90`."""
+
+    parts = text.rsplit(":", 2) if text.count(":") >= 2 else text.rsplit(":", 1)
+    try:
+        category, minimum = parts[0], int(parts[1])
+        maximum = int(parts[2]) if len(parts) > 2 and parts[2] else None
+        return category, CategoryLimit(minimum, maximum)
+    except (IndexError, ValueError) as exc:
+        raise argparse.ArgumentTypeError(f"无效的类别约束: {text}") from exc
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="按天容量与类别约束生成一周学习计划（分支定界）")
+    parser.add_argument(
+        "--tasks",
+        type=Path,
+        default=Path(__file__).with_name("sample_tasks.json"),
+        help="任务定义 JSON 文件",
+    )
+    parser.add_argument(
+        "--days",
+        type=lambda text: [int(part) for part in text.split(",")],
+        default=[240] * 7,
+        help="每天可用分钟数，逗号分隔（默认 7 天各 240 分钟）",
+    )
+    parser.add_argument(
+        "--category",
+        type=_parse_limit,
+        action="append",
+        default=[],
+        help="类别每周分钟数约束 类别:最少[:最多]，可重复",
+    )
+    parser.add_argument(
+        "--time-limit", type=float, default=DEFAULT_TIME_LIMIT, help="搜索时间上限（秒），超时返回当前最优解与差距"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    args = parse_args(argv)
+    planner = WeeklyPlanner(load_tasks(args.tasks), args.days, dict(args.category))
+    plan = planner.optimize(args.time_limit)
+    print(describe_week(plan, args.days))
+
+
+if __name__ == "__main__":
+    main()
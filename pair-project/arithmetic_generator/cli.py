@@ -26,6 +26,13 @@ def build_parser() -> argparse.ArgumentParser:
         type=int,
         help="Upper bound (exclusive) for numbers and denominators.",
     )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for generation; output is reproducible per seed and worker count.",
+    )
     parser.add_argument("-e", "--exercises", help="Exercises file for grading.")
     parser.add_argument("-a", "--answers", help="Answers file for grading.")
     return parser
@@ -45,7 +52,7 @@ def main(argv: Sequence[str] | None = None) -> int:
         if args.range_limit is None:
             parser.error("missing -r/--range. Use --help for details.")
         count = args.count or 20
-        config = GeneratorConfig(count=count, range_limit=args.range_limit)
+        config = GeneratorConfig(count=count, range_limit=args.range_limit, workers=args.workers)
         generator = ProblemGenerator(config)
         problems = generator.generate()
 
@@ -13,13 +13,17 @@ class GeneratorConfig:
     max_attempts: int = 100_000
     allow_fraction_operands: bool = True
     seed: int | None = None
+    workers: int = 1
+    constructive: bool = True
 
     def __post_init__(self) -> None:
-        if self.count <= 0 or self.count > 10_000:
-            raise ValueError("count must be between 1 and 10000")
+        if self.count <= 0:
+            raise ValueError("count must be positive")
         if self.range_limit <= 0:
             raise ValueError("range_limit must be positive")
         if self.max_operators <= 0 or self.max_operators > 3:
             raise ValueError("max_operators must be within 1~3")
-        if self.max_attempts < self.count:
-            raise ValueError("max_attempts must not be smaller than count")
+        if self.max_attempts <= 0:
+            raise ValueError("max_attempts must be positive")
+        if self.workers <= 0:
+            raise ValueError("workers must be positive")
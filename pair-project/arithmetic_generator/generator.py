@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from fractions import Fraction
 import random
-from typing import List, Set
+from typing import List, Set, Tuple
 
 from .config import GeneratorConfig
 from .evaluator import format_fraction
@@ -11,6 +13,22 @@ from .models import ExpressionNode, Problem
 COMMUTATIVE = {"+", "*"}
 
 
+Keyed = List[Tuple[str, Problem]]
+
+
+def _shard_seed(base: int, round_number: int, shard: int) -> int:
+    """Derive an independent, reproducible seed for one shard of one round."""
+
+    return random.Random(f"{base}:{round_number}:{shard}").getrandbits(64)
+
+
+def _generate_shard(job: Tuple[GeneratorConfig, int, int]) -> Tuple[Keyed, int]:
+    """Worker entry point: generate up to `count` locally unique problems."""
+
+    config, count, attempt_limit = job
+    return ProblemGenerator(config)._generate_unique(count, attempt_limit)
+
+
 class ProblemGenerator:
     def __init__(self, config: GeneratorConfig) -> None:
         self.config = config
@@ -18,14 +36,33 @@ class ProblemGenerator:
         self._attempt_limit = max(config.max_attempts, config.count * 20)
 
     def generate(self) -> List[Problem]:
-        problems: List[Problem] = []
+        if self.config.workers > 1:
+            problems = self._generate_sharded()
+        else:
+            keyed, _ = self._generate_unique(self.config.count, self._attempt_limit)
+            problems = [problem for _, problem in keyed]
+
+        if len(problems) < self.config.count:
+            raise RuntimeError(
+                "Unable to generate enough unique problems; increase range or decrease count."
+            )
+        return problems
+
+    def _generate_unique(self, count: int, attempt_limit: int) -> Tuple[Keyed, int]:
+        """Return up to `count` problems unique by canonical key, and the attempts used."""
+
+        problems: Keyed = []
         seen: Set[str] = set()
         attempts = 0
-        while len(problems) < self.config.count and attempts < self._attempt_limit:
+        while len(problems) < count and attempts < attempt_limit:
             attempts += 1
             ops_count = self._rng.randint(1, self.config.max_operators)
-            node = self._build_tree(ops_count)
-            value = self._evaluate(node)
+            if self.config.constructive:
+                node = self._build_valid(ops_count)
+                value = node.value
+            else:
+                node = self._build_tree(ops_count)
+                value = self._evaluate(node)
             if value is None:
                 continue
 
@@ -33,15 +70,47 @@ class ProblemGenerator:
             if canonical in seen:
                 continue
 
-            problems.append(
-                Problem(expression=self._format_expression(node), answer=format_fraction(value))
-            )
+            problem = Problem(expression=self._format_expression(node), answer=format_fraction(value))
+            problems.append((canonical, problem))
             seen.add(canonical)
+        return problems, attempts
 
-        if len(problems) < self.config.count:
-            raise RuntimeError(
-                "Unable to generate enough unique problems; increase range or decrease count."
-            )
+    def _generate_sharded(self) -> List[Problem]:
+        """Generate across `config.workers` processes, one shard per worker.
+
+        Shard seeds derive from `config.seed` (or one draw of this generator's RNG),
+        the round number and the shard index, so the output only depends on the seed
+        and the worker count. Shards dedupe locally; the merge keeps the first
+        occurrence of each canonical key in shard order. A shortfall caused by
+        cross-shard duplicates is topped up by further rounds with fresh seeds,
+        within the overall attempt limit.
+        """
+
+        count, workers = self.config.count, self.config.workers
+        base = self.config.seed if self.config.seed is not None else self._rng.getrandbits(64)
+        problems: List[Problem] = []
+        seen: Set[str] = set()
+        attempts = round_number = 0
+        with ProcessPoolExecutor(workers) as executor:
+            while len(problems) < count and attempts < self._attempt_limit:
+                shortfall = count - len(problems)
+                per_shard = -(-shortfall // workers)
+                attempt_share = -(-(self._attempt_limit - attempts) // workers)
+                jobs = []
+                for shard in range(workers):
+                    seed = _shard_seed(base, round_number, shard)
+                    shard_config = replace(self.config, count=per_shard, seed=seed, workers=1)
+                    jobs.append((shard_config, per_shard, attempt_share))
+                before = len(problems)
+                for keyed, used in executor.map(_generate_shard, jobs):
+                    attempts += used
+                    for canonical, problem in keyed:
+                        if len(problems) < count and canonical not in seen:
+                            seen.add(canonical)
+                            problems.append(problem)
+                if len(problems) == before:
+                    break
+                round_number += 1
         return problems
 
     def _build_tree(self, ops_remaining: int) -> ExpressionNode:
@@ -55,6 +124,53 @@ class ProblemGenerator:
         right = self._build_tree(right_ops)
         return ExpressionNode(op=op, left=left, right=right)
 
+    def _build_valid(self, ops_remaining: int) -> ExpressionNode:
+        """Build a tree that meets every constraint checked by `_evaluate`.
+
+        The operator is drawn first and both subtrees are built valid, with values
+        stored on every node. Subtraction puts the larger value on the left. Division
+        needs `0 < left < right`: operands are ordered that way, a zero or tied leaf is
+        redrawn as a positive operand, and if that is impossible another operator is
+        used. Every attempt therefore yields a valid tree; only duplicates are dropped.
+        """
+
+        if ops_remaining == 0:
+            return ExpressionNode(value=self._random_operand())
+
+        op = self._rng.choice(("+", "-", "*", "/"))
+        left_ops = self._rng.randint(0, ops_remaining - 1)
+        left = self._build_valid(left_ops)
+        right = self._build_valid(ops_remaining - 1 - left_ops)
+        if op == "/" and not self._make_divisible(left, right):
+            op = self._rng.choice(("+", "-", "*"))
+        assert left.value is not None and right.value is not None
+        if (op == "/" and left.value > right.value) or (op == "-" and left.value < right.value):
+            left, right = right, left
+
+        if op == "+":
+            value = left.value + right.value
+        elif op == "-":
+            value = left.value - right.value
+        elif op == "*":
+            value = left.value * right.value
+        else:
+            value = left.value / right.value
+        return ExpressionNode(value=value, op=op, left=left, right=right)
+
+    def _make_divisible(self, left: ExpressionNode, right: ExpressionNode) -> bool:
+        """Redraw zero or tied leaves until both values are positive and distinct."""
+
+        for _ in range(4):
+            if left.value and right.value and left.value != right.value:
+                return True
+            leaves = [node for node in (left, right) if node.is_leaf()]
+            if not leaves:
+                return False
+            zero_leaves = [node for node in leaves if not node.value]
+            for node in zero_leaves or [self._rng.choice(leaves)]:
+                node.value = self._random_operand(positive=True)
+        return bool(left.value and right.value and left.value != right.value)
+
     def _evaluate(self, node: ExpressionNode) -> Fraction | None:
         if node.is_leaf():
             assert node.value is not None
@@ -104,7 +220,7 @@ class ProblemGenerator:
             left, right = right, left
         return f"{node.op}[{left}][{right}]"
 
-    def _random_operand(self) -> Fraction:
+    def _random_operand(self, positive: bool = False) -> Fraction:
         should_use_fraction = (
             self.config.allow_fraction_operands
             and self.config.range_limit > 2
@@ -116,4 +232,4 @@ class ProblemGenerator:
             numerator = self._rng.randint(1, denominator - 1)
             return Fraction(numerator, denominator)
         upper = max(0, self.config.range_limit - 1)
-        return Fraction(self._rng.randint(0, upper))
+        return Fraction(self._rng.randint(1 if positive and upper else 0, upper))
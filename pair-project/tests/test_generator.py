@@ -2,12 +2,35 @@ import re
 import unittest
 
 from arithmetic_generator import GeneratorConfig, ProblemGenerator
+from arithmetic_generator import generator as generator_module
+from arithmetic_generator.evaluator import eval_expression
 
 
 def _extract_numbers(expr: str) -> list[str]:
     return re.findall(r"\d+/\d+|\d+", expr)
 
 
+def _divisions(expr: str) -> list[tuple[str, str]]:
+    """Return the (left, right) operand texts of every division in a generated expression."""
+
+    found = []
+    stack = []
+    for index, char in enumerate(expr):
+        if char == "(":
+            stack.append(index)
+        elif char == ")":
+            group = expr[stack.pop() + 1 : index]
+            depth = 0
+            for position, inner in enumerate(group):
+                depth += inner == "("
+                depth -= inner == ")"
+                if depth == 0 and group[position : position + 3] in (" + ", " - ", " * ", " / "):
+                    if group[position + 1] == "/":
+                        found.append((group[:position], group[position + 3 :]))
+                    break
+    return found
+
+
 class GeneratorTests(unittest.TestCase):
     def test_generate_basics(self) -> None:
         config = GeneratorConfig(count=20, range_limit=10, seed=42, max_operators=3)
@@ -37,7 +60,7 @@ class GeneratorTests(unittest.TestCase):
                 self.assertGreaterEqual(int(answer), 0)
 
     def test_division_results_proper_fraction(self) -> None:
-        config = GeneratorConfig(count=30, range_limit=8, seed=7, max_operators=3)
+        config = GeneratorConfig(count=30, range_limit=8, seed=7, max_operators=3, constructive=False)
         generator = ProblemGenerator(config)
         problems = generator.generate()
         for prob in problems:
@@ -45,6 +68,64 @@ class GeneratorTests(unittest.TestCase):
                 n, d = map(int, prob.answer.split("/"))
                 self.assertLess(n, d)
 
+    def test_division_operands_are_proper(self) -> None:
+        config = GeneratorConfig(count=30, range_limit=8, seed=7, max_operators=3)
+        generator = ProblemGenerator(config)
+        problems = generator.generate()
+        for prob in problems:
+            for left, right in _divisions(prob.expression):
+                self.assertLess(0, eval_expression(left))
+                self.assertLess(eval_expression(left), eval_expression(right))
+
+    def test_parallel_generation_is_reproducible(self) -> None:
+        config = GeneratorConfig(count=300, range_limit=10, seed=11, workers=3)
+        first = ProblemGenerator(config).generate()
+        second = ProblemGenerator(config).generate()
+        self.assertEqual(first, second)
+        self.assertEqual(len({p.expression for p in first}), 300)
+
+    def test_parallel_merge_tops_up_cross_shard_duplicates(self) -> None:
+        rounds = set()
+        original = generator_module._shard_seed
+
+        def tracking_seed(base: int, round_number: int, shard: int) -> int:
+            rounds.add(round_number)
+            return original(base, round_number, shard)
+
+        generator_module._shard_seed = tracking_seed
+        try:
+            problems = ProblemGenerator(GeneratorConfig(count=200, range_limit=4, seed=3, workers=4)).generate()
+        finally:
+            generator_module._shard_seed = original
+        self.assertEqual(len({p.expression for p in problems}), 200)
+        self.assertGreater(len(rounds), 1)
+
+    def test_count_is_not_capped(self) -> None:
+        config = GeneratorConfig(count=12_000, range_limit=60, seed=2, workers=2)
+        self.assertEqual(len(ProblemGenerator(config).generate()), 12_000)
+        with self.assertRaises(ValueError):
+            GeneratorConfig(workers=0)
+
+    def test_constructive_trees_are_always_valid(self) -> None:
+        for range_limit in (1, 2, 3, 10):
+            generator = ProblemGenerator(GeneratorConfig(range_limit=range_limit, seed=range_limit))
+            for _ in range(500):
+                node = generator._build_valid(generator._rng.randint(1, 3))
+                with self.subTest(range_limit=range_limit, expression=generator._format_expression(node)):
+                    self.assertIsNotNone(node.value)
+                    self.assertEqual(generator._evaluate(node), node.value)
+
+    def test_constructive_builder_wastes_fewer_attempts(self) -> None:
+        ratios = {}
+        for constructive in (False, True):
+            config = GeneratorConfig(count=500, range_limit=5, seed=4, constructive=constructive)
+            generator = ProblemGenerator(config)
+            problems, attempts = generator._generate_unique(500, 100_000)
+            self.assertEqual(len(problems), 500)
+            ratios[constructive] = attempts / len(problems)
+        self.assertLess(ratios[True], 1.5)
+        self.assertLess(ratios[True] * 1.5, ratios[False])
+
 
 if __name__ == "__main__":
     unittest.main()